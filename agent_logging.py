@@ -0,0 +1,226 @@
+"""
+Logging Setup for Python Tip Agent
+Queue-based logging: callers only enqueue records; a listener thread formats them as JSON lines (or text) and writes them
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+
+# INFO, DEBUG, ... for everything not listed in LOG_LEVELS
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-module overrides, e.g. "git_handler=DEBUG,approval_server=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# "json" (one object per line), "text", or "auto" (text on a terminal, JSON otherwise)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "auto").lower()
+# Write to this file instead of stderr
+LOG_FILE = os.getenv("LOG_FILE", "")
+# false writes from the calling thread (for comparison and debugging)
+LOG_QUEUE = os.getenv("LOG_QUEUE", "True").lower() == "true"
+
+# Correlation fields attached to every record logged in the current context
+run_id_var = contextvars.ContextVar("run_id", default=None)
+token_var = contextvars.ContextVar("token", default=None)
+stage_var = contextvars.ContextVar("stage", default=None)
+_CONTEXT_VARS = {"run_id": run_id_var, "token": token_var, "stage": stage_var}
+
+# Token prefix length in logs; full approval tokens are credentials
+TOKEN_PREFIX = 8
+
+# Attributes every LogRecord has; anything else came from extra= and is emitted
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _context_value(name: str, value):
+    if name == "token" and value:
+        return str(value)[:TOKEN_PREFIX]
+    return value
+
+
+def set_context(**fields) -> Dict[str, contextvars.Token]:
+    """
+    Set run_id/token/stage for records logged from here on in this context
+
+    Returns:
+        Reset tokens for reset_context()
+    """
+    return {name: _CONTEXT_VARS[name].set(_context_value(name, value)) for name, value in fields.items()}
+
+
+def reset_context(tokens: Dict[str, contextvars.Token]):
+    """Undo a set_context()"""
+    for name, token in tokens.items():
+        _CONTEXT_VARS[name].reset(token)
+
+
+def clear_context():
+    """Drop all correlation fields (e.g. when a server thread finishes a request)"""
+    for var in _CONTEXT_VARS.values():
+        var.set(None)
+
+
+@contextmanager
+def log_context(**fields):
+    """Correlation fields for the duration of a with block"""
+    tokens = set_context(**fields)
+    try:
+        yield
+    finally:
+        reset_context(tokens)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the context variables onto the record in the calling thread, before it is queued"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, var in _CONTEXT_VARS.items():
+            if not hasattr(record, name):
+                setattr(record, name, var.get())
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, context and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in _CONTEXT_VARS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in _CONTEXT_VARS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """The console style the CLI always had: bare progress lines, [WARNING]/[ERROR] prefixes"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.levelno >= logging.ERROR:
+            message = f"[ERROR] {message}"
+        elif record.levelno >= logging.WARNING:
+            message = f"[WARNING] {message}"
+        elif record.levelno < logging.INFO:
+            message = f"[DEBUG] {record.name}: {message}"
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        return message
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener
+
+    The stock prepare() formats the message in the calling thread; records
+    stay in this process, so they can be enqueued as they are.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+_configured = False
+
+
+def _output_handler() -> logging.Handler:
+    handler = logging.FileHandler(LOG_FILE, encoding="utf-8") if LOG_FILE else logging.StreamHandler(sys.stderr)
+    use_json = LOG_FORMAT == "json" or (LOG_FORMAT == "auto" and not (LOG_FILE == "" and sys.stderr.isatty()))
+    handler.setFormatter(JsonFormatter() if use_json else TextFormatter())
+    return handler
+
+
+def _start_listener(log_queue: queue.SimpleQueue, handler: logging.Handler):
+    global _listener
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=False)
+    _listener.start()
+
+
+def _stop_listener():
+    """Flush what is queued; registered with atexit"""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Parse a LOG_LEVELS spec into {logger name: level}; unknown level names are skipped"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        level = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+def setup_logging(level: Optional[str] = None, levels: Optional[str] = None):
+    """
+    Configure the root logger once per process (later calls are no-ops)
+
+    Records go through a queue to a listener thread that formats and
+    writes them, so logging from a request thread never waits on stderr.
+    The listener is restarted in forked children (gunicorn with preload).
+    """
+    global _configured
+    with _setup_lock:
+        if _configured:
+            return
+        root = logging.getLogger()
+        root.setLevel(logging.getLevelName((level or LOG_LEVEL).upper()))
+        for name, module_level in parse_levels(LOG_LEVELS if levels is None else levels).items():
+            logging.getLogger(name).setLevel(module_level)
+
+        handler = _output_handler()
+        if LOG_QUEUE:
+            log_queue = queue.SimpleQueue()
+            front = _DeferredQueueHandler(log_queue)
+            _start_listener(log_queue, handler)
+            atexit.register(_stop_listener)
+            if hasattr(os, "register_at_fork"):
+                # The listener thread does not survive fork; children need their own
+                os.register_at_fork(after_in_child=lambda: _start_listener(log_queue, handler))
+        else:
+            front = handler
+        front.addFilter(ContextFilter())
+        root.addHandler(front)
+        _configured = True
+
+
+if __name__ == "__main__":
+    import time
+    setup_logging()
+    log = logging.getLogger("agent_logging")
+    with log_context(run_id="demo", token="abcdefghijklmnop", stage="bench"):
+        log.info("Logging configured (%s)", "queue" if LOG_QUEUE else "direct")
+        count = 20000
+        started = time.perf_counter()
+        for i in range(count):
+            log.debug("debug %d", i)
+        filtered = time.perf_counter() - started
+        started = time.perf_counter()
+        for i in range(count):
+            log.info("benchmark record %d", i, extra={"n": i})
+        emitted = time.perf_counter() - started
+    log.warning("%.2f us per filtered call, %.2f us per emitted call (caller side)",
+                filtered / count * 1e6, emitted / count * 1e6)
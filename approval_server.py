@@ -3,52 +3,58 @@ Flask Web Server for Tip Approval
 Provides endpoints for approving/rejecting tips via email links
 """
 
-from flask import Flask, render_template_string, request, redirect
-import json
+from flask import Flask, request, redirect, g
+import logging
 import secrets
-from pathlib import Path
+import time
 from datetime import datetime
 from git_handler import GitHandler
 from dotenv import load_dotenv
 import os
+import metrics
+from pending_store import (
+    PENDING_FILE,
+    load_pending,
+    save_pending,
+    add_pending_approval,
+    claim_pending,
+    set_status,
+    lookup_token,
+    lookup_entry,
+    is_expired,
+    find_archived,
+    archived_count,
+    start_pruner,
+)
+from rate_limit import KeyedRateLimiter, SharedRateLimiter
+from pipeline import refill_in_background
+from tip_paths import resolve_tip_path
+from agent_logging import clear_context, set_context, setup_logging
 
 load_dotenv()
+setup_logging()
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(16))
 
-# Storage for pending approvals
-PENDING_FILE = Path("pending_approvals.json")
-
-
-def load_pending():
-    """Load pending approvals from file"""
-    if PENDING_FILE.exists():
-        with open(PENDING_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-
-def save_pending(data):
-    """Save pending approvals to file"""
-    with open(PENDING_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
-
-
-def add_pending_approval(tip_data: dict) -> str:
-    """
-    Add a tip to pending approvals
-    Returns: approval token
-    """
-    token = secrets.token_urlsafe(32)
-    pending = load_pending()
-    pending[token] = {
-        "tip_data": tip_data,
-        "created_at": datetime.now().isoformat(),
-        "status": "pending"
-    }
-    save_pending(pending)
-    return token
+# Per-client limit on token routes (0 disables). With RATE_LIMIT_DIR set (gunicorn.conf.py
+# does) the buckets are files shared by all workers instead of per-process memory.
+RATE_LIMIT_DIR = os.getenv('RATE_LIMIT_DIR', '')
+if RATE_LIMIT_DIR:
+    rate_limiter = SharedRateLimiter(
+        RATE_LIMIT_DIR,
+        per_minute=float(os.getenv('RATE_LIMIT_PER_MINUTE', '30')),
+        burst=float(os.getenv('RATE_LIMIT_BURST', '10'))
+    )
+else:
+    rate_limiter = KeyedRateLimiter(
+        per_minute=float(os.getenv('RATE_LIMIT_PER_MINUTE', '30')),
+        burst=float(os.getenv('RATE_LIMIT_BURST', '10'))
+    )
+RATE_LIMITED_ENDPOINTS = {'approve', 'approve_all', 'reject', 'preview'}
+TRUST_PROXY_HEADERS = os.getenv('TRUST_PROXY_HEADERS', 'False').lower() == 'true'
 
 
 SUCCESS_TEMPLATE = """
@@ -134,11 +140,111 @@ SUCCESS_TEMPLATE = """
 """
 
 
+_status_page = None
+
+
+def _render_status_page(**context) -> str:
+    """Render SUCCESS_TEMPLATE, compiling it once per process"""
+    global _status_page
+    if _status_page is None:
+        _status_page = app.jinja_env.from_string(SUCCESS_TEMPLATE)
+    return _status_page.render(**context)
+
+
+def _client_key() -> str:
+    if TRUST_PROXY_HEADERS and request.headers.get('X-Forwarded-For'):
+        return request.headers['X-Forwarded-For'].split(',')[0].strip()
+    return request.remote_addr or "unknown"
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+    # Request-scoped log fields; token is cut to a prefix by set_context
+    set_context(
+        run_id=secrets.token_hex(4),
+        token=(request.view_args or {}).get('token'),
+        stage=request.endpoint,
+    )
+
+
+@app.teardown_request
+def _clear_log_context(exc):
+    # Server threads are reused, so don't let one request's fields leak into the next
+    clear_context()
+
+
+@app.before_request
+def _rate_limit():
+    if request.endpoint not in RATE_LIMITED_ENDPOINTS:
+        return None
+    client = _client_key()
+    if rate_limiter.allow(client):
+        return None
+    return _render_status_page(
+        action="Error",
+        status_class="error",
+        icon="⏳",
+        title="Too Many Requests",
+        message="Please wait a moment before trying again.",
+        tip_name=None,
+        filename=None,
+        github_url=None
+    ), 429, {"Retry-After": str(rate_limiter.retry_after(client))}
+
+
+def _invalid_token_response(message: str):
+    logger.info("Unknown or expired token")
+    return _render_status_page(
+        action="Error",
+        status_class="error",
+        icon="⚠️",
+        title="Invalid or Expired Token",
+        message=message,
+        tip_name=None,
+        filename=None,
+        github_url=None
+    ), 404
+
+
+def _already_processed_response(approval_data: dict):
+    if approval_data['status'] == 'processing':
+        message = "This tip is currently being pushed by another request."
+    else:
+        message = f"This tip has already been {approval_data['status']}."
+    return _render_status_page(
+        action="Already Processed",
+        status_class="error",
+        icon="⚠️",
+        title="Already Processed",
+        message=message,
+        tip_name=approval_data['tip_data']['headline'],
+        filename=approval_data['tip_data']['filename'],
+        github_url=None
+    )
+
+
+@app.after_request
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by route template, not raw path, so tokens don't explode cardinality
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            route=route,
+            method=request.method,
+            status=str(response.status_code)
+        )
+    return response
+
+
 @app.route('/')
 def index():
     """Home page showing pending approvals"""
     pending = load_pending()
     pending_count = sum(1 for v in pending.values() if v['status'] == 'pending')
+    archived = archived_count()
     
     html = f"""
     <!DOCTYPE html>
@@ -196,9 +302,13 @@ def index():
                 <div class="stat-label">Pending Approvals</div>
             </div>
             <div class="stat-card">
-                <div class="stat-number">{len(pending)}</div>
+                <div class="stat-number">{len(pending) + archived}</div>
                 <div class="stat-label">Total Requests</div>
             </div>
+            <div class="stat-card">
+                <div class="stat-number">{archived}</div>
+                <div class="stat-label">Archived</div>
+            </div>
         </div>
         <p style="text-align: center; color: #666;">
             Check your email for approval links when new tips are generated.
@@ -212,35 +322,26 @@ def index():
 @app.route('/approve/<token>')
 def approve(token):
     """Approve a tip and push to GitHub"""
-    pending = load_pending()
+    invalid_message = "This approval link is invalid or has already been used."
     
-    if token not in pending:
-        return render_template_string(
-            SUCCESS_TEMPLATE,
-            action="Error",
-            status_class="error",
-            icon="⚠️",
-            title="Invalid or Expired Token",
-            message="This approval link is invalid or has already been used.",
-            tip_name=None,
-            filename=None,
-            github_url=None
-        ), 404
+    # Unknown and expired tokens are answered from the in-memory index
+    indexed = lookup_token(token)
+    if indexed is None:
+        archived = find_archived(token)
+        if archived is not None:
+            return _already_processed_response(archived)
+        return _invalid_token_response(invalid_message)
+    if indexed[0] == 'pending' and is_expired(indexed[1]):
+        return _invalid_token_response(invalid_message)
     
-    approval_data = pending[token]
-    
-    if approval_data['status'] != 'pending':
-        return render_template_string(
-            SUCCESS_TEMPLATE,
-            action="Already Processed",
-            status_class="error",
-            icon="⚠️",
-            title="Already Processed",
-            message=f"This tip has already been {approval_data['status']}.",
-            tip_name=approval_data['tip_data']['headline'],
-            filename=approval_data['tip_data']['filename'],
-            github_url=None
-        )
+    # Claim first so concurrent workers can't push the same tip twice
+    approval_data = claim_pending(token)
+    if approval_data is None:
+        existing = load_pending().get(token)
+        # Still pending after a failed claim means it expired in between
+        if existing is None or existing['status'] == 'pending':
+            return _invalid_token_response(invalid_message)
+        return _already_processed_response(existing)
     
     tip_data = approval_data['tip_data']
     
@@ -251,8 +352,8 @@ def approve(token):
             remote_url=os.getenv("GITHUB_REPO_URL", "https://github.com/Sheidashaban/Python_Tips")
         )
         
-        # Get the tip file path
-        tip_filepath = Path("tips") / tip_data['filename']
+        # Get the tip file path (flat or sharded layout)
+        tip_filepath = resolve_tip_path(tip_data)
         
         if not tip_filepath.exists():
             raise Exception(f"Tip file not found: {tip_filepath}")
@@ -263,17 +364,15 @@ def approve(token):
         
         if success:
             # Update status
-            approval_data['status'] = 'approved'
-            approval_data['approved_at'] = datetime.now().isoformat()
-            pending[token] = approval_data
-            save_pending(pending)
+            set_status(token, 'approved', approved_at=datetime.now().isoformat())
+            metrics.TIP_DECISIONS.inc(decision="approved")
+            refill_in_background()
             
             # Construct GitHub URL
             repo_url = os.getenv("GITHUB_REPO_URL", "https://github.com/Sheidashaban/Python_Tips")
-            github_url = f"{repo_url}/blob/{branch}/tips/{tip_data['filename']}"
+            github_url = f"{repo_url}/blob/{branch}/{tip_filepath.as_posix()}"
             
-            return render_template_string(
-                SUCCESS_TEMPLATE,
+            return _render_status_page(
                 action="Approved",
                 status_class="success",
                 icon="✅",
@@ -287,8 +386,9 @@ def approve(token):
             raise Exception("Git push failed")
             
     except Exception as e:
-        return render_template_string(
-            SUCCESS_TEMPLATE,
+        # Release the claim so the link can be retried
+        set_status(token, 'pending')
+        return _render_status_page(
             action="Error",
             status_class="error",
             icon="❌",
@@ -300,41 +400,117 @@ def approve(token):
         ), 500
 
 
-@app.route('/reject/<token>')
-def reject(token):
-    """Reject a tip"""
-    pending = load_pending()
+@app.route('/approve-all/<tokens>')
+def approve_all(tokens):
+    """Approve every tip of a digest that is still pending and push them together"""
+    from email_digest import DIGEST_MAX_TIPS
     
-    if token not in pending:
-        return render_template_string(
-            SUCCESS_TEMPLATE,
-            action="Error",
+    claimed = []
+    for token in list(dict.fromkeys(tokens.split(',')))[:DIGEST_MAX_TIPS]:
+        indexed = lookup_token(token)
+        if indexed is None or (indexed[0] == 'pending' and is_expired(indexed[1])):
+            continue
+        approval_data = claim_pending(token)
+        if approval_data is not None:
+            claimed.append((token, approval_data['tip_data']))
+    
+    if not claimed:
+        return _render_status_page(
+            action="Already Processed",
             status_class="error",
             icon="⚠️",
-            title="Invalid or Expired Token",
-            message="This rejection link is invalid or has already been used.",
+            title="Nothing to Approve",
+            message="Every tip in this digest has already been processed or has expired.",
             tip_name=None,
             filename=None,
             github_url=None
-        ), 404
+        )
     
-    approval_data = pending[token]
-    tip_data = approval_data['tip_data']
+    branch = os.getenv("GITHUB_BRANCH", "master")
+    tips = [(resolve_tip_path(tip_data), tip_data) for _, tip_data in claimed]
+    committed, pushed = [False] * len(tips), False
+    try:
+        git_handler = GitHandler(
+            repo_path=".",
+            remote_url=os.getenv("GITHUB_REPO_URL", "https://github.com/Sheidashaban/Python_Tips")
+        )
+        present = [tip for tip in tips if tip[0].exists()]
+        results, pushed = git_handler.commit_tips_and_push(present, branch) if present else ([], False)
+        by_path = dict(zip((tip_filepath for tip_filepath, _ in present), results))
+        committed = [by_path.get(tip_filepath, False) for tip_filepath, _ in tips]
+    except Exception as e:
+        logger.error("Approve-all failed: %s", e)
+    
+    approved = 0
+    for (token, _), ok in zip(claimed, committed):
+        if ok and pushed:
+            set_status(token, 'approved', approved_at=datetime.now().isoformat())
+            metrics.TIP_DECISIONS.inc(decision="approved")
+            approved += 1
+        else:
+            # Release the claim so the tip's own link can be retried
+            set_status(token, 'pending')
+    if approved:
+        refill_in_background()
+    
+    if approved == len(claimed):
+        return _render_status_page(
+            action="Approved",
+            status_class="success",
+            icon="✅",
+            title="Tips Approved & Pushed!",
+            message=f"{approved} tip(s) were pushed to your GitHub repository.",
+            tip_name=None,
+            filename=None,
+            github_url=None
+        )
+    return _render_status_page(
+        action="Error",
+        status_class="error",
+        icon="❌",
+        title="Push Failed",
+        message=f"Pushed {approved} of {len(claimed)} tip(s). The rest are still pending; "
+                "retry this link or use the links for each tip.",
+        tip_name=None,
+        filename=None,
+        github_url=None
+    ), 500
+
+
+@app.route('/reject/<token>')
+def reject(token):
+    """Reject a tip"""
+    invalid_message = "This rejection link is invalid or has already been used."
+    
+    indexed = lookup_token(token)
+    if indexed is None:
+        archived = find_archived(token)
+        if archived is not None:
+            return _already_processed_response(archived)
+        return _invalid_token_response(invalid_message)
+    if indexed[0] == 'pending' and is_expired(indexed[1]):
+        return _invalid_token_response(invalid_message)
     
-    # Update status
-    approval_data['status'] = 'rejected'
-    approval_data['rejected_at'] = datetime.now().isoformat()
-    pending[token] = approval_data
-    save_pending(pending)
+    # Same compare-and-set as approval: a tip being pushed or already
+    # approved is never rejected (or its file deleted) underneath it
+    approval_data = claim_pending(token, 'rejected', rejected_at=datetime.now().isoformat())
+    if approval_data is None:
+        existing = load_pending().get(token)
+        if existing is None or existing['status'] == 'pending':
+            return _invalid_token_response(invalid_message)
+        return _already_processed_response(existing)
+    
+    tip_data = approval_data['tip_data']
+    metrics.TIP_DECISIONS.inc(decision="rejected")
+    refill_in_background()
     
     # Optionally delete the tip file
-    tip_filepath = Path("tips") / tip_data['filename']
+    tip_filepath = resolve_tip_path(tip_data)
     if tip_filepath.exists():
         tip_filepath.unlink()
-        print(f"🗑️ Deleted rejected tip: {tip_filepath}")
+        logger.info("Deleted rejected tip: %s", tip_filepath)
     
-    return render_template_string(
-        SUCCESS_TEMPLATE,
+    return _render_status_page(
         action="Rejected",
         status_class="rejected",
         icon="❌",
@@ -346,22 +522,88 @@ def reject(token):
     )
 
 
+# token -> tip_data for previews; a token's tip never changes, so this saves
+# re-reading the pending store on every view
+_preview_tips = {}
+
+
+def _preview_tip_data(token: str):
+    tip_data = _preview_tips.get(token)
+    if tip_data is None:
+        # Index first, so an unknown token never parses the store
+        approval_data = lookup_entry(token)
+        if approval_data is None:
+            return None
+        tip_data = approval_data['tip_data']
+        if len(_preview_tips) >= 1024:
+            _preview_tips.clear()
+        _preview_tips[token] = tip_data
+    return tip_data
+
+
+@app.route('/preview/<token>')
+def preview(token):
+    """Render the tip file behind a token, served precompressed from the content-hash cache"""
+    from preview_cache import choose_encoding, etag_matches, get_preview
+    invalid_message = "This preview link is invalid or has expired."
+    
+    indexed = lookup_token(token)
+    if indexed is not None and indexed[0] == 'pending' and is_expired(indexed[1]):
+        return _invalid_token_response(invalid_message)
+    tip_data = _preview_tip_data(token)
+    if tip_data is None:
+        return _invalid_token_response(invalid_message)
+    
+    tip_filepath = resolve_tip_path(tip_data)
+    try:
+        rendered = get_preview(tip_filepath, tip_data)
+    except (OSError, ValueError):
+        # Rejected tips are deleted; unreadable files get the same answer
+        return _render_status_page(
+            action="Error",
+            status_class="error",
+            icon="⚠️",
+            title="Tip File Not Found",
+            message="The tip file for this link no longer exists.",
+            tip_name=tip_data['headline'],
+            filename=tip_data['filename'],
+            github_url=None
+        ), 404
+    
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), rendered.bodies)
+    headers = {
+        "ETag": rendered.etag(encoding),
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "private, no-cache",
+    }
+    if etag_matches(request.headers.get('If-None-Match'), headers["ETag"]):
+        return "", 304, headers
+    headers["Content-Type"] = "text/html; charset=utf-8"
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return rendered.bodies[encoding], 200, headers
+
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
     return {"status": "healthy", "service": "python-tip-approval-server"}, 200
 
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    if PENDING_FILE.exists():
+        metrics.PENDING_STORE_BYTES.set(PENDING_FILE.stat().st_size)
+    return metrics.render_all(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+
 if __name__ == '__main__':
     port = int(os.getenv('FLASK_PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     
-    print(f"\n{'='*60}")
-    print(f"🚀 Python Tip Approval Server Starting")
-    print(f"{'='*60}")
-    print(f"📍 URL: http://localhost:{port}")
-    print(f"🔧 Debug Mode: {debug}")
-    print(f"{'='*60}\n")
+    logger.info("Python Tip Approval Server starting on http://localhost:%d (debug %s)", port, debug)
     
+    start_pruner()
     app.run(host='0.0.0.0', port=port, debug=debug)
 
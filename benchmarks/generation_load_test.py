@@ -0,0 +1,100 @@
+"""
+Tip Generation Load Test
+Generates and saves tips in a scratch directory using the offline or HTTP stub backend
+
+Usage:
+    python benchmarks/generation_load_test.py --backend offline --tips 2000
+    python benchmarks/generation_load_test.py --backend http --tips 1000 --latency-ms 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def run(backend: str, tips: int, output_format: str, candidates: int, latency_ms: float) -> dict:
+    """Generate and save `tips` tips; returns throughput and per-stage timings"""
+    workdir = Path(tempfile.mkdtemp(prefix="tip-load-"))
+    # Keep every side file out of the working tree (modules read these at import)
+    os.environ.update({
+        "TIP_BACKEND": backend,
+        "TIP_OUTPUT_FORMAT": output_format,
+        "TIP_CANDIDATES": str(candidates),
+        "GENERATION_STATS_FILE": str(workdir / "generation_stats.json"),
+        "USAGE_LEDGER_FILE": str(workdir / "usage_ledger.jsonl"),
+        "FALLBACK_STATE_FILE": str(workdir / "fallback_state.json"),
+    })
+
+    server = None
+    if backend == "http":
+        from benchmarks.stub_chat_server import make_server
+        server = make_server(latency_ms=latency_ms)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        os.environ["TIP_BACKEND_URL"] = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+
+    from tip_generator import TipGenerator
+    generator = TipGenerator(tips_directory=str(workdir / "tips"), history_file=str(workdir / "tip_history.json"))
+
+    generate_s = save_s = 0.0
+    started = time.perf_counter()
+    for _ in range(tips):
+        t0 = time.perf_counter()
+        tip = generator.generate_tip()
+        t1 = time.perf_counter()
+        generator.save_tip(tip)
+        generate_s += t1 - t0
+        save_s += time.perf_counter() - t1
+    elapsed = time.perf_counter() - started
+
+    if server:
+        server.shutdown()
+    return {
+        "backend": backend,
+        "output_format": output_format,
+        "candidates": candidates,
+        "tips": tips,
+        "elapsed_s": round(elapsed, 2),
+        "tips_per_minute": round(tips / elapsed * 60),
+        "generate_ms_per_tip": round(generate_s / tips * 1000, 2),
+        "save_ms_per_tip": round(save_s / tips * 1000, 2),
+        "workdir": str(workdir),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test tip generation without network access")
+    parser.add_argument("--backend", choices=("offline", "http"), default="offline")
+    parser.add_argument("--tips", type=int, default=1000)
+    parser.add_argument("--format", choices=("json", "text"), default="json")
+    parser.add_argument("--candidates", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Stub server latency (http backend)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    results = run(args.backend, args.tips, args.format, args.candidates, args.latency_ms)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print(f"Generation load test: {results['tips']} tips, {results['backend']} backend, "
+          f"{results['output_format']} format, best of {results['candidates']}")
+    print(f"{'='*60}")
+    print(f"elapsed           {results['elapsed_s']} s")
+    print(f"throughput        {results['tips_per_minute']} tips/minute")
+    print(f"generate per tip  {results['generate_ms_per_tip']} ms")
+    print(f"save per tip      {results['save_ms_per_tip']} ms")
+    print(f"output            {results['workdir']}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Invalid Token Benchmark
+Compares the old full-parse membership test with the in-memory token index
+
+Usage:
+    python benchmarks/invalid_token_bench.py --entries 500 --requests 2000
+"""
+
+import argparse
+import json
+import os
+import secrets
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _fake_entry(i: int) -> dict:
+    """A pending entry roughly the size of a real one (notebook embedded)"""
+    code = "\n".join(f"value_{n} = {n} * 2  # example line" for n in range(40))
+    return {
+        "tip_data": {
+            "headline": f"Benchmark tip {i}",
+            "shortname": f"benchmark_tip_{i}",
+            "filename": f"Python_tip_benchmark_tip_{i}.ipynb",
+            "content": json.dumps({"cells": [{"source": code.split("\n")}]}, indent=2),
+            "date": datetime.now().isoformat(),
+            "code": code,
+            "explanation": "Synthetic entry used to size the pending store.",
+        },
+        "created_at": datetime.now().isoformat(),
+        "status": "approved" if i % 2 else "pending",
+    }
+
+
+def _throughput(func, tokens) -> float:
+    started = time.perf_counter()
+    for token in tokens:
+        func(token)
+    return len(tokens) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark invalid-token lookups")
+    parser.add_argument("--entries", type=int, default=500, help="Entries in the pending store")
+    parser.add_argument("--requests", type=int, default=2000, help="Invalid-token lookups per mode")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="tip_bench_")
+    os.chdir(workdir)
+    os.environ["PENDING_FILE"] = str(Path(workdir) / "pending_approvals.json")
+    os.environ["RATE_LIMIT_PER_MINUTE"] = "0"
+
+    import pending_store
+    from approval_server import app
+
+    pending_store.save_pending({secrets.token_urlsafe(32): _fake_entry(i) for i in range(args.entries)})
+    size_kb = pending_store.PENDING_FILE.stat().st_size / 1024
+    bogus = [secrets.token_urlsafe(32) for _ in range(args.requests)]
+
+    def before(token):
+        # What every request used to pay: parse the whole file to test membership
+        return token in pending_store.load_pending()
+
+    def after(token):
+        return pending_store.lookup_token(token)
+
+    client = app.test_client()
+
+    def http_after(token):
+        return client.get(f"/approve/{token}").status_code
+
+    results = {
+        "entries": args.entries,
+        "store_kb": round(size_kb, 1),
+        "before_lookups_per_sec": round(_throughput(before, bogus), 1),
+        "after_lookups_per_sec": round(_throughput(after, bogus), 1),
+        "after_http_requests_per_sec": round(_throughput(http_after, bogus), 1),
+    }
+    results["speedup"] = round(results["after_lookups_per_sec"] / results["before_lookups_per_sec"], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
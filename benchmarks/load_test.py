@@ -0,0 +1,128 @@
+"""
+Load Test for the Approval Server
+Fires concurrent /, /approve and /reject requests and reports latency
+
+Usage:
+    python benchmarks/load_test.py --url http://localhost:5000 --requests 2000 --concurrency 32
+"""
+
+import argparse
+import http.client
+import json
+import secrets
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+
+_local = threading.local()
+
+
+def _connection(host: str, port: int) -> http.client.HTTPConnection:
+    """One keep-alive connection per client thread"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        _local.conn = conn
+    return conn
+
+
+def _request(host: str, port: int, path: str):
+    started = time.perf_counter()
+    conn = _connection(host, port)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        status = response.status
+    except (http.client.HTTPException, OSError):
+        conn.close()
+        _local.conn = None
+        status = 0
+    return path.split("/")[1] or "index", status, time.perf_counter() - started
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load_test(url: str, total: int, concurrency: int) -> dict:
+    """
+    Run the load test and return a summary
+
+    Approve/reject requests use random tokens so the run never pushes or
+    deletes real tips; they exercise the full token lookup path.
+    """
+    parsed = urlparse(url)
+    host, port = parsed.hostname, parsed.port or 80
+
+    paths = []
+    for i in range(total):
+        kind = i % 3
+        if kind == 0:
+            paths.append("/")
+        elif kind == 1:
+            paths.append(f"/approve/{secrets.token_urlsafe(32)}")
+        else:
+            paths.append(f"/reject/{secrets.token_urlsafe(32)}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda p: _request(host, port, p), paths))
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        "url": url,
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+        "errors": sum(1 for _, status, _ in results if status == 0 or status >= 500),
+        "routes": {},
+    }
+    for route in sorted({route for route, _, _ in results}):
+        latencies = [latency for r, _, latency in results if r == route]
+        summary["routes"][route] = {
+            "count": len(latencies),
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+            "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        }
+    all_latencies = [latency for _, _, latency in results]
+    summary["p50_ms"] = round(_percentile(all_latencies, 50) * 1000, 2)
+    summary["p99_ms"] = round(_percentile(all_latencies, 99) * 1000, 2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the approval server")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    summary = run_load_test(args.url, args.requests, args.concurrency)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print(f"Load test: {summary['requests']} requests, concurrency {summary['concurrency']}")
+    print(f"{'='*60}")
+    print(f"Throughput: {summary['requests_per_second']} req/s ({summary['errors']} errors)")
+    print(f"Overall:    p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms")
+    for route, stats in summary["routes"].items():
+        print(f"  /{route:<8} n={stats['count']:<6} p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
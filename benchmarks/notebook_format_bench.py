@@ -0,0 +1,127 @@
+"""
+Notebook Format Benchmark
+Compares repository pack size and clone time for tips stored in the legacy layout vs canonical nbformat
+
+Usage:
+    python benchmarks/notebook_format_bench.py [--tips 3000] [--repeat-every 10] [--json]
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _legacy_notebook(headline: str, explanation: str, code: str, date: str) -> str:
+    """What _build_tip wrote before canonical serialization"""
+    return json.dumps({
+        "cells": [
+            {"cell_type": "markdown", "metadata": {}, "source": [
+                f"# Python Tip: {headline}\n", "\n", f"{explanation}\n", "\n", f"**Generated on:** {date}"]},
+            {"cell_type": "code", "execution_count": None, "metadata": {}, "outputs": [], "source": code.split('\n')},
+        ],
+        "metadata": {
+            "kernelspec": {"display_name": "Python 3", "language": "python", "name": "python3"},
+            "language_info": {"name": "python", "version": "3.12.0"},
+        },
+        "nbformat": 4,
+        "nbformat_minor": 4,
+    }, indent=2)
+
+
+def _corpus(count: int, repeat_every: int):
+    """(path, headline, explanation, code, date) tuples; every Nth tip regenerates an earlier one"""
+    catalog = [json.loads(line) for line in (ROOT / "fallback_tips.jsonl").read_text().splitlines()[1:] if line.strip()]
+    for i in range(count):
+        date = (datetime(2020, 1, 1) + timedelta(days=i)).strftime("%Y-%m-%d")
+        source = i - 1 if repeat_every and i and i % repeat_every == 0 else i
+        entry = catalog[source % len(catalog)]
+        headline = f"{entry['headline']} (variation {source // len(catalog)})"
+        path = f"tips/{date[:4]}/{date[5:7]}/{date.replace('-', '')}_Python_tip_{source}.ipynb"
+        yield path, headline, entry["explanation"], entry["code"], date
+
+
+def _build_repo(directory: Path, files) -> Path:
+    """One commit per tip via fast-import, then a full gc so pack sizes are comparable"""
+    subprocess.run(["git", "init", "-q", "-b", "master", str(directory)], check=True)
+    chunks = []
+    for i, (path, text) in enumerate(files):
+        data = text.encode()
+        message = f"Add Python Tip {i}".encode()
+        chunks.append(b"commit refs/heads/master\n")
+        chunks.append(f"committer bench <bench@localhost> {1577836800 + i * 86400} +0000\n".encode())
+        chunks.append(f"data {len(message)}\n".encode() + message + b"\n")
+        chunks.append(f"M 100644 inline {path}\ndata {len(data)}\n".encode() + data + b"\n\n")
+    subprocess.run(["git", "fast-import", "--quiet"], cwd=directory, input=b"".join(chunks), check=True)
+    subprocess.run(["git", "gc", "-q", "--aggressive", "--prune=now"], cwd=directory, check=True)
+    return directory
+
+
+def _measure(repo: Path, clones: int = 5) -> dict:
+    counts = dict(
+        line.split(": ", 1) for line in
+        subprocess.run(["git", "count-objects", "-v"], cwd=repo, capture_output=True, text=True).stdout.splitlines()
+    )
+    blobs = subprocess.run(
+        "git rev-list --objects --all | cut -d' ' -f1 | git cat-file --batch-check='%(objecttype)' | grep -c blob",
+        shell=True, cwd=repo, capture_output=True, text=True,
+    ).stdout.strip()
+    samples = []
+    # Bare clones time the object transfer rather than the checkout; the
+    # first one warms the page cache and is not counted
+    target = repo.parent / f"{repo.name}-clone"
+    for n in range(clones + 1):
+        started = time.perf_counter()
+        subprocess.run(["git", "clone", "-q", "--bare", "--no-local", str(repo), str(target)], check=True)
+        if n:
+            samples.append(time.perf_counter() - started)
+        shutil.rmtree(target)
+    return {
+        "pack_kib": int(counts["size-pack"]),
+        "unique_blobs": int(blobs),
+        "clone_seconds": round(statistics.median(samples), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legacy vs canonical notebook serialization")
+    parser.add_argument("--tips", type=int, default=3000)
+    parser.add_argument("--repeat-every", type=int, default=10, help="Every Nth tip regenerates the previous one (0 = never)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    from notebook_format import build_notebook, serialize_notebook
+
+    corpus = list(_corpus(args.tips, args.repeat_every))
+    layouts = {
+        "legacy": [(path, _legacy_notebook(h, e, c, d)) for path, h, e, c, d in corpus],
+        "canonical": [(path, serialize_notebook(build_notebook(h, e, c), minify=False)) for path, h, e, c, _ in corpus],
+        "minified": [(path, serialize_notebook(build_notebook(h, e, c), minify=True)) for path, h, e, c, _ in corpus],
+    }
+    results = {"tips": args.tips, "layouts": {}}
+    with tempfile.TemporaryDirectory(prefix="nb-format-") as tmp:
+        for name, files in layouts.items():
+            print(f"[..] building {name} repo", file=sys.stderr)
+            repo = _build_repo(Path(tmp) / name, files)
+            results["layouts"][name] = {"raw_kib": sum(len(text.encode()) for _, text in files) // 1024, **_measure(repo)}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"\nNotebook serialization over {args.tips:,} tips (one commit each)")
+    print(f"{'layout':<12} {'raw KiB':>9} {'pack KiB':>9} {'blobs':>7} {'clone s':>8}")
+    for name, row in results["layouts"].items():
+        print(f"{name:<12} {row['raw_kib']:>9} {row['pack_kib']:>9} {row['unique_blobs']:>7} {row['clone_seconds']:>8}")
+
+
+if __name__ == "__main__":
+    main()
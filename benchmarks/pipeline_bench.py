@@ -0,0 +1,325 @@
+"""
+End-to-End Pipeline Benchmark
+Runs the full PythonTipAgent flow against local stand-ins and reports per-stage latency,
+throughput and memory at several history sizes
+
+Stand-ins: the stub chat server (TIP_BACKEND=http), a local SMTP sink, a bare git
+remote, and the Flask test client for approvals. Each history size runs in its own
+subprocess and scratch workspace, so nothing touches the working tree.
+
+Usage:
+    python benchmarks/pipeline_bench.py [--sizes 10,10000,100000] [--tips 20] [--approvals 20]
+                                        [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_SIZES = (10, 10_000, 100_000)
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summarize(samples):
+    """Latency summary in milliseconds"""
+    ms = [s * 1000 for s in samples]
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 2),
+        "p50_ms": round(_percentile(ms, 50), 2),
+        "p95_ms": round(_percentile(ms, 95), 2),
+        "max_ms": round(max(ms), 2),
+    }
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _git(*args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def _seed_history(size: int) -> dict:
+    """Synthetic history spread over the topic taxonomy, one tip per day"""
+    from topic_planner import TAXONOMY
+    labels = [re.sub(r"[^a-z0-9]+", " ", label.lower()).strip() for label, _ in TAXONOMY.values()]
+    start = datetime(2020, 1, 1)
+    tips = []
+    for i in range(size):
+        headline = f"Using {labels[i % len(labels)]} trick {i}"
+        shortname = headline.lower().replace(" ", "_")
+        tips.append({
+            "headline": headline,
+            "shortname": shortname,
+            "filename": f"Python_tip_{shortname}.ipynb",
+            "date": (start + timedelta(hours=i)).isoformat(),
+        })
+    return {"tips": tips}
+
+
+def _prepare_workspace(workdir: Path, history_size: int):
+    """Working repo with seeded history, pushed to a local bare remote"""
+    remote = workdir / "remote.git"
+    repo = workdir / "repo"
+    _git("init", "--quiet", "--bare", str(remote), cwd=workdir)
+    _git("init", "--quiet", "-b", "master", str(repo), cwd=workdir)
+    (repo / "tips").mkdir()
+    (repo / "tips" / ".gitkeep").write_text("")
+    with open(repo / "tip_history.json", "w") as f:
+        json.dump(_seed_history(history_size), f, indent=2)
+    for key, value in (("user.name", "bench"), ("user.email", "bench@localhost")):
+        _git("config", key, value, cwd=repo)
+    _git("add", ".", cwd=repo)
+    _git("commit", "--quiet", "-m", "Seed history", cwd=repo)
+    _git("remote", "add", "origin", str(remote), cwd=repo)
+    _git("push", "--quiet", "origin", "master", cwd=repo)
+    return repo, remote
+
+
+def run_worker(history_size: int, tips: int, approvals: int, workdir: Path) -> dict:
+    """Benchmark one history size; must run in a fresh process"""
+    sys.path.insert(0, str(ROOT))
+    sys.path.insert(0, str(ROOT / "benchmarks"))
+
+    setup_started = time.perf_counter()
+    repo, remote = _prepare_workspace(workdir, history_size)
+    setup_s = time.perf_counter() - setup_started
+
+    from stub_chat_server import make_server
+    from smtp_sink import start_sink
+    import threading
+
+    chat = make_server()
+    threading.Thread(target=chat.serve_forever, daemon=True).start()
+    sink = start_sink()
+
+    os.chdir(repo)
+    os.environ.update({
+        "TIP_BACKEND": "http",
+        "TIP_BACKEND_URL": f"http://127.0.0.1:{chat.server_port}/v1/chat/completions",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(sink.port),
+        "SMTP_STARTTLS": "false",
+        "SENDER_EMAIL": "bench@localhost",
+        "SENDER_PASSWORD": "bench",
+        "RECIPIENT_EMAIL": "reviewer@localhost",
+        "GITHUB_REPO_URL": str(remote),
+        "GITHUB_BRANCH": "master",
+        "RATE_LIMIT_PER_MINUTE": "0",
+        "PIPELINE_DEPTH": "0",
+        "RUN_LEASE_BACKEND": "none",
+        "PENDING_FILE": str(repo / "pending_approvals.json"),
+        "GENERATION_STATS_FILE": str(workdir / "generation_stats.json"),
+        "USAGE_LEDGER_FILE": str(workdir / "usage_ledger.jsonl"),
+        "FALLBACK_STATE_FILE": str(workdir / "fallback_state.json"),
+    })
+
+    import pending_store
+    from git_handler import GitHandler
+    from main_agent import PythonTipAgent
+
+    timings = defaultdict(list)
+
+    def timed(owner, name, stage):
+        original = getattr(owner, name)
+
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timings[stage].append(time.perf_counter() - started)
+        setattr(owner, name, wrapper)
+
+    memory = {"after_setup_mb": _peak_rss_mb()}
+
+    agent = PythonTipAgent()
+    started = time.perf_counter()
+    generator = agent.tip_generator
+    timings["load_history"].append(time.perf_counter() - started)
+    memory["after_load_history_mb"] = _peak_rss_mb()
+
+    timed(generator, "generate_tip", "generate")
+    timed(generator, "save_tip", "save")
+    timed(pending_store, "add_pending_approval", "register")
+    timed(agent.email_handler, "send_approval_email", "email")
+    timed(GitHandler, "commit_and_push", "git_commit_push")
+
+    # Batch generation: one resumable run per tip
+    started = time.perf_counter()
+    for i in range(tips):
+        run_started = time.perf_counter()
+        if not agent.generate_and_send_daily_tip(run_date=f"bench-{i:05d}"):
+            raise RuntimeError(f"run {i} failed")
+        timings["run_total"].append(time.perf_counter() - run_started)
+    generation_s = time.perf_counter() - started
+    memory["after_generation_mb"] = _peak_rss_mb()
+
+    # Bulk approvals through the Flask app: commit + push to the bare remote
+    from approval_server import app
+    client = app.test_client()
+    tokens = [token for token, entry in pending_store.load_pending().items()
+              if entry["status"] == "pending"][:approvals]
+    started = time.perf_counter()
+    for token in tokens:
+        request_started = time.perf_counter()
+        response = client.get(f"/approve/{token}")
+        timings["approve_request"].append(time.perf_counter() - request_started)
+        if response.status_code != 200:
+            raise RuntimeError(f"approve returned {response.status_code}")
+    approval_s = time.perf_counter() - started
+    memory["after_approvals_mb"] = _peak_rss_mb()
+
+    remote_commits = int(subprocess.run(
+        ["git", "rev-list", "--count", "master"], cwd=remote, capture_output=True, text=True
+    ).stdout.strip())
+
+    chat.shutdown()
+    sink.shutdown()
+    return {
+        "history_size": history_size,
+        "workspace_setup_s": round(setup_s, 2),
+        "stages": {stage: _summarize(samples) for stage, samples in timings.items()},
+        "generation": {
+            "tips": tips,
+            "elapsed_s": round(generation_s, 3),
+            "tips_per_s": round(tips / generation_s, 2) if generation_s else 0.0,
+        },
+        "approvals": {
+            "approvals": len(tokens),
+            "elapsed_s": round(approval_s, 3),
+            "approvals_per_s": round(len(tokens) / approval_s, 2) if approval_s else 0.0,
+        },
+        "memory": memory,
+        "checks": {
+            "emails_received": sink.received,
+            "remote_commits": remote_commits,
+            "history_file_bytes": (repo / "tip_history.json").stat().st_size,
+        },
+    }
+
+
+def _flatten(result: dict) -> dict:
+    """Comparable scalar metrics for one history size"""
+    flat = {
+        "generation.tips_per_s": result["generation"]["tips_per_s"],
+        "approvals.approvals_per_s": result["approvals"]["approvals_per_s"],
+        "memory.peak_rss_mb": max(result["memory"].values()),
+    }
+    for stage, summary in result["stages"].items():
+        flat[f"{stage}.p50_ms"] = summary["p50_ms"]
+        flat[f"{stage}.p95_ms"] = summary["p95_ms"]
+    return flat
+
+
+def compare(previous: dict, current: dict):
+    """Print metric deltas between two result files"""
+    old_by_size = {r["history_size"]: _flatten(r) for r in previous["results"]}
+    print(f"\nComparison with {previous.get('commit', '?')[:10]} (current {current.get('commit', '?')[:10]}):")
+    for result in current["results"]:
+        size = result["history_size"]
+        if size not in old_by_size:
+            continue
+        print(f"\n  history {size}:")
+        for metric, new in _flatten(result).items():
+            old = old_by_size[size].get(metric)
+            if old is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"    {metric:<28} {old:>10} -> {new:>10}  ({change:+.1f}%)")
+
+
+def _print_results(results: dict):
+    for result in results["results"]:
+        print(f"\n{'='*72}")
+        print(f"History size {result['history_size']:,} "
+              f"(tip_history.json {result['checks']['history_file_bytes'] / 1e6:.1f} MB after run)")
+        print(f"{'='*72}")
+        print(f"  {'stage':<18} {'count':>6} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+        for stage, s in result["stages"].items():
+            print(f"  {stage:<18} {s['count']:>6} {s['mean_ms']:>10} {s['p50_ms']:>10} {s['p95_ms']:>10} {s['max_ms']:>10}")
+        print(f"  generation: {result['generation']['tips_per_s']} tips/s, "
+              f"approvals: {result['approvals']['approvals_per_s']} approvals/s, "
+              f"peak RSS {max(result['memory'].values())} MB")
+        print(f"  checks: {result['checks']['emails_received']} emails, "
+              f"{result['checks']['remote_commits']} commits on remote")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated history sizes")
+    parser.add_argument("--tips", type=int, default=20, help="Tips to generate per size")
+    parser.add_argument("--approvals", type=int, default=20, help="Tips to approve per size")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of tables")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        result = run_worker(args.worker, args.tips, args.approvals, Path(args.workdir))
+        Path(args.result_file).write_text(json.dumps(result))
+        return
+
+    commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"tips": args.tips, "approvals": args.approvals},
+        "results": [],
+    }
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory(prefix=f"pipeline-bench-{size}-") as tmp:
+            result_file = Path(tmp) / "result.json"
+            print(f"[..] history size {size:,}", file=sys.stderr)
+            worker = subprocess.run(
+                [sys.executable, __file__, "--worker", str(size), "--tips", str(args.tips),
+                 "--approvals", str(args.approvals), "--workdir", tmp, "--result-file", str(result_file)],
+                capture_output=True, text=True
+            )
+            if worker.returncode != 0:
+                print(worker.stdout[-2000:], worker.stderr[-4000:], file=sys.stderr)
+                raise SystemExit(f"[ERROR] worker for history size {size} failed")
+            results["results"].append(json.loads(result_file.read_text()))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_results(results)
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), results)
+
+
+if __name__ == "__main__":
+    main()
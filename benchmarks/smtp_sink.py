@@ -0,0 +1,102 @@
+"""
+Local SMTP Sink
+Accepts and counts messages over plain SMTP (AUTH PLAIN, no TLS) for benchmarks
+
+Usage:
+    python benchmarks/smtp_sink.py --port 8025
+    SMTP_SERVER=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=false python main_agent.py
+"""
+
+import argparse
+import socketserver
+import threading
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Minimal SMTP server that keeps received messages in memory"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, keep_messages: bool = False):
+        super().__init__((host, port), _SMTPHandler)
+        self.keep_messages = keep_messages
+        self.messages = []
+        self.received = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def deliver(self, sender: str, recipients, data: bytes):
+        with self._count_lock:
+            self.received += 1
+            if self.keep_messages:
+                self.messages.append((sender, recipients, data))
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def _reply(self, line: str):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self._reply("220 smtp-sink ready")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250-smtp-sink")
+                self._reply("250 AUTH PLAIN")
+            elif verb == "AUTH":
+                self._reply("235 authenticated")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip(), []
+                self._reply("250 ok")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip())
+                self._reply("250 ok")
+            elif verb == "DATA":
+                self._reply("354 end with <CRLF>.<CRLF>")
+                chunks = []
+                for data_line in self.rfile:
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    chunks.append(data_line)
+                self.server.deliver(sender, recipients, b"".join(chunks))
+                self._reply("250 queued")
+            elif verb == "QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("250 ok")
+
+
+def start_sink(host: str = "127.0.0.1", port: int = 0, keep_messages: bool = False) -> SMTPSink:
+    """Start a sink on a background thread; port 0 picks a free port"""
+    sink = SMTPSink(host, port, keep_messages)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    return sink
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port)
+    print(f"SMTP sink on {args.host}:{sink.port} (set SMTP_STARTTLS=false)")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nReceived {sink.received} message(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+CLI Startup Benchmark
+Measures wall-clock startup and `-X importtime` cost of the CLI entry points
+
+Usage:
+    python benchmarks/startup_bench.py [--runs 5] [--json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COMMANDS = {
+    "status": ["main_agent.py", "status"],
+    "search": ["main_agent.py", "search", "enumerate"],
+    "tokens": ["main_agent.py", "tokens"],
+    "help": ["main_agent.py", "--help"],
+    "manual_approve --list": ["manual_approve.py", "--list"],
+}
+
+# Modules that should never be imported by the quick commands above
+HEAVY_MODULES = ("openai", "git", "flask", "smtplib")
+
+
+def _importtime(argv):
+    """Run once under -X importtime; return (total import µs, top modules, heavy hits)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        # Nesting is shown as two extra spaces of indentation per level
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        modules.append((raw_name.strip(), int(cumulative_us), depth))
+    top_level = [(name, us) for name, us, depth in modules if depth == 0]
+    total = sum(us for _, us in top_level)
+    heavy = sorted({name.split(".")[0] for name, _, _ in modules if name.split(".")[0] in HEAVY_MODULES})
+    top = sorted(top_level, key=lambda item: item[1], reverse=True)[:5]
+    return total, top, heavy
+
+
+def _wall_time(argv, runs: int):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *argv], cwd=ROOT, capture_output=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    baseline = _wall_time(["-c", "pass"], args.runs)
+    results = {"python_baseline_ms": round(statistics.median(baseline) * 1000, 1), "commands": {}}
+
+    for label, argv in COMMANDS.items():
+        timings = _wall_time(argv, args.runs)
+        total_us, top, heavy = _importtime(argv)
+        results["commands"][label] = {
+            "median_ms": round(statistics.median(timings) * 1000, 1),
+            "min_ms": round(min(timings) * 1000, 1),
+            "import_ms": round(total_us / 1000, 1),
+            "heavy_imports": heavy,
+            "top_imports": [{"module": name, "ms": round(us / 1000, 1)} for name, us in top],
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print(f"CLI startup ({args.runs} runs, bare interpreter {results['python_baseline_ms']} ms)")
+    print(f"{'='*60}")
+    for label, stats in results["commands"].items():
+        heavy = ", ".join(stats["heavy_imports"]) or "none"
+        print(f"{label:<24} median {stats['median_ms']:>7} ms  imports {stats['import_ms']:>6} ms  heavy: {heavy}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Static Site Benchmark
+Times full, no-op and one-approval incremental builds of the static site over a synthetic corpus
+
+Usage:
+    python benchmarks/static_site_bench.py [--tips 10000] [--workers N] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+TOPICS = ["iterators", "strings", "dictionaries", "performance", "typing", "testing"]
+
+
+def _write_tip(tips_dir: Path, i: int) -> dict:
+    from tip_paths import tip_path
+    date = (datetime(2016, 1, 1) + timedelta(hours=i * 8)).isoformat()
+    headline = f"Synthetic tip {i}: use generators for lazy pipelines"
+    entry = {
+        "headline": headline, "shortname": f"synthetic_{i}",
+        "filename": f"Python_tip_synthetic_{i}.ipynb", "date": date,
+        "tags": [TOPICS[i % len(TOPICS)]], "topic": TOPICS[(i // 7) % len(TOPICS)],
+    }
+    code = "\n".join([
+        "def chunks(items, size):",
+        "    # Yield successive slices without building a list",
+        "    for start in range(0, len(items), size):",
+        f"        yield items[start:start + size]  # tip {i}",
+        "",
+        "print(list(chunks(list(range(10)), 3)))",
+    ])
+    notebook = {"cells": [
+        {"cell_type": "markdown", "metadata": {}, "source": [
+            f"# Python Tip: {headline}\n", "\n", "Generators produce values on demand, so `chunks` never copies the input.\n",
+            "\n", f"**Generated on:** {date[:10]}"]},
+        {"cell_type": "code", "execution_count": None, "metadata": {}, "outputs": [], "source": code.split("\n")},
+    ], "metadata": {}, "nbformat": 4, "nbformat_minor": 4}
+    path = tip_path(entry, tips_dir, "sharded")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(notebook, indent=2))
+    entry["path"] = path.as_posix()
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark static site builds")
+    parser.add_argument("--tips", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=0, help="Render processes (0 = one per core)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    from static_site import build_site
+
+    results = {"tips": args.tips, "cores": os.cpu_count()}
+    with tempfile.TemporaryDirectory(prefix="site-bench-") as tmp:
+        os.chdir(tmp)
+        tips_dir, history_file, site_dir = Path("tips"), Path("tip_history.json"), Path("site")
+        history = {"tips": [_write_tip(tips_dir, i) for i in range(args.tips)]}
+        history_file.write_text(json.dumps(history))
+
+        for label, workers in (("full_1_worker", 1), ("full_parallel", args.workers)):
+            result = build_site(site_dir, history_file, tips_dir, force=True, workers=workers)
+            results[f"{label}_seconds"] = result["seconds"]
+        results["noop_seconds"] = build_site(site_dir, history_file, tips_dir)["seconds"]
+
+        # One approval: a new tip file and history entry
+        history["tips"].append(_write_tip(tips_dir, args.tips))
+        history_file.write_text(json.dumps(history))
+        started = time.perf_counter()
+        result = build_site(site_dir, history_file, tips_dir)
+        results["incremental_seconds"] = round(time.perf_counter() - started, 3)
+        results["incremental_pages"] = result["rendered"]
+        results["pages_on_disk"] = sum(1 for _ in site_dir.rglob("*.html"))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"\nStatic site over {args.tips:,} tips ({results['cores']} core(s))")
+    print(f"  full build, 1 worker:     {results['full_1_worker_seconds']}s")
+    print(f"  full build, parallel:     {results['full_parallel_seconds']}s")
+    print(f"  no-op rebuild:            {results['noop_seconds']}s")
+    print(f"  after one approval:       {results['incremental_seconds']}s "
+          f"({results['incremental_pages']} pages re-rendered of {results['pages_on_disk']:,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Stub Chat Completion Server
+Serves OpenAI-compatible /v1/chat/completions responses from the offline backend
+
+Usage:
+    python benchmarks/stub_chat_server.py --port 8089 [--latency-ms 0]
+    TIP_BACKEND=http TIP_BACKEND_URL=http://127.0.0.1:8089/v1/chat/completions python main_agent.py
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tip_backends import OfflineBackend  # noqa: E402
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                seed: int = 0) -> ThreadingHTTPServer:
+    """Build (but don't start) a stub server; port 0 picks a free port"""
+    backend = OfflineBackend(seed=seed)
+    backend_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            json_mode = payload.get("response_format", {}).get("type") == "json_object"
+            with backend_lock:
+                result = backend.complete(payload["messages"], json_mode, n=payload.get("n", 1))
+            body = json.dumps({
+                "object": "chat.completion",
+                "model": payload.get("model", "stub"),
+                "choices": [
+                    {"index": i, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                    for i, content in enumerate(result.contents)
+                ],
+                "usage": {
+                    "prompt_tokens": result.prompt_tokens,
+                    "completion_tokens": result.completion_tokens,
+                    "total_tokens": sum(result.usage),
+                },
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Artificial latency per request")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency_ms, args.seed)
+    print(f"Stub chat server on http://{args.host}:{server.server_port}/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Tips Layout Benchmark
+Compares flat and sharded tips/ layouts at a large corpus size: directory scans,
+path resolution, and commit_tip (GitPython index vs git CLI staging vs the
+object database fast path)
+
+Usage:
+    python benchmarks/tips_layout_bench.py [--tips 50000] [--commits 10] [--json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+NOTEBOOK = '{"cells": [], "metadata": {}, "nbformat": 4, "nbformat_minor": 4}\n'
+
+
+def _git(*args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def _tip(i: int) -> dict:
+    # Spread the corpus over ten years so shards hold a few hundred files each
+    date = datetime(2016, 1, 1) + timedelta(minutes=i * 105)
+    return {"headline": f"Tip {i}", "filename": f"Python_tip_synthetic_{i}.ipynb", "date": date.isoformat()}
+
+
+def _build_repo(workdir: Path, layout: str, count: int) -> Path:
+    from tip_paths import tip_path
+    repo = workdir / layout
+    _git("init", "--quiet", "-b", "master", str(repo), cwd=workdir)
+    _git("config", "user.name", "bench", cwd=repo)
+    _git("config", "user.email", "bench@localhost", cwd=repo)
+    for i in range(count):
+        path = repo / tip_path(_tip(i), Path("tips"), layout)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(NOTEBOOK)
+    (repo / "tip_history.json").write_text('{"tips": []}\n')
+    _git("add", ".", cwd=repo)
+    _git("commit", "--quiet", "-m", "Seed corpus", cwd=repo)
+    return repo
+
+
+def _time(func, repeat: int = 5) -> float:
+    """Median wall time in ms"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def _scan_benchmarks(repo: Path, layout: str, count: int) -> dict:
+    from tip_paths import iter_tip_files, resolve_tip_path, shard_for
+    tips = repo / "tips"
+    newest = _tip(count - 1)
+    sample = [_tip(i) for i in range(0, count, max(1, count // 200))]
+    results = {
+        "iter_tip_files_ms": _time(lambda: sum(1 for _ in iter_tip_files(tips))),
+        "rglob_ms": _time(lambda: sum(1 for _ in tips.rglob("*_tip_*"))),
+        # What the old workflow step expanded
+        "glob_flat_ipynb_ms": _time(lambda: glob.glob(str(tips / "*.ipynb"))),
+        "resolve_200_paths_ms": _time(lambda: [resolve_tip_path(t, tips) for t in sample]),
+    }
+    if layout == "sharded":
+        shard = tips / shard_for(newest["date"])
+        results["list_current_shard_ms"] = _time(lambda: os.listdir(shard))
+    else:
+        results["list_current_shard_ms"] = _time(lambda: os.listdir(tips))
+    results["git_status_ms"] = _time(
+        lambda: subprocess.run(["git", "status", "--porcelain"], cwd=repo, capture_output=True), repeat=3
+    )
+    return results
+
+
+def _gitpython_commit(repo_obj, tip_filepath: Path, history_file: Path, message: str):
+    """commit_tip as it was before: GitPython index.add + index.commit"""
+    repo_obj.index.add([str(tip_filepath), str(history_file)])
+    repo_obj.index.commit(message)
+
+
+def _commit_benchmarks(repo: Path, layout: str, count: int, commits: int) -> dict:
+    from git import Repo
+    import git_handler
+    from git_handler import GitHandler
+    from tip_paths import tip_path
+
+    cwd = os.getcwd()
+    os.chdir(repo)
+    try:
+        handler = GitHandler(repo_path=".")
+        history_file = Path("tip_history.json")
+        results = {}
+        for offset, label in enumerate(("gitpython_index", "git_cli", "object_db")):
+            samples = []
+            repo_obj = Repo(".") if label == "gitpython_index" else None
+            git_handler.GIT_FAST_COMMIT = label == "object_db"
+            for n in range(commits):
+                tip = _tip(count + n + offset * commits)
+                path = tip_path(tip, Path("tips"), layout)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(NOTEBOOK)
+                history_file.write_text(json.dumps({"tips": [tip]}))
+                started = time.perf_counter()
+                if repo_obj is not None:
+                    _gitpython_commit(repo_obj, path, history_file, f"Add {tip['headline']}")
+                else:
+                    handler.commit_tip(path, tip)
+                samples.append(time.perf_counter() - started)
+            results[f"commit_{label}_ms"] = round(statistics.median(samples) * 1000, 2)
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark flat vs sharded tips/ layouts")
+    parser.add_argument("--tips", type=int, default=50_000)
+    parser.add_argument("--commits", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    results = {"tips": args.tips, "layouts": {}}
+    with tempfile.TemporaryDirectory(prefix="tips-layout-") as tmp:
+        for layout in ("flat", "sharded"):
+            print(f"[..] building {layout} repo with {args.tips:,} tips", file=sys.stderr)
+            repo = _build_repo(Path(tmp), layout, args.tips)
+            layout_results = _scan_benchmarks(repo, layout, args.tips)
+            layout_results.update(_commit_benchmarks(repo, layout, args.tips, args.commits))
+            results["layouts"][layout] = layout_results
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    metrics = list(results["layouts"]["flat"])
+    print(f"\n{'='*60}")
+    print(f"tips/ layout benchmark ({args.tips:,} tips, median ms)")
+    print(f"{'='*60}")
+    print(f"{'metric':<26} {'flat':>12} {'sharded':>12}")
+    for metric in metrics:
+        print(f"{metric:<26} {results['layouts']['flat'][metric]:>12} {results['layouts']['sharded'][metric]:>12}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Topic Planning Benchmark
+Compares duplicate rate and tokens per accepted tip with and without the topic planner
+
+The chat backend is a stand-in for a model that, left alone, keeps coming
+back to the same popular tips, and that follows the "Topic for this tip"
+line when the planner adds one. The numbers therefore show what the planner
+does for such a model; they are not a measurement of any real API.
+
+Usage:
+    python benchmarks/topic_planning_bench.py --tips 200
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tip_backends import ChatResult, OfflineBackend  # noqa: E402
+
+_TOPIC_LINE = re.compile(r"Topic for this tip: (.+)\.")
+_HEADLINE_TEMPLATES = ("Using {label}", "Getting more out of {label}", "Common mistakes with {label}")
+
+
+class RepeatProneBackend(OfflineBackend):
+    """
+    Offline stand-in with a popularity bias
+
+    Unprompted, it picks catalog tips with Zipf-like weights, so the same few
+    come back again and again. Given a topic, it writes about that topic: a
+    catalog tip on it if there is one, else one of a few headlines for it.
+    """
+
+    name = "repeat-prone"
+
+    def __init__(self, seed: int = 0):
+        super().__init__(seed=seed)
+        self.rng = random.Random(seed)
+
+    def _pick(self, topic_label):
+        from topic_planner import TAXONOMY, classify
+        entries = self._load_entries()
+        if topic_label:
+            topic = next((name for name, (label, _) in TAXONOMY.items() if label == topic_label), None)
+            on_topic = [entry for entry in entries if classify(entry["shortname"]) == topic]
+            if not on_topic:
+                template = self.rng.choice(_HEADLINE_TEMPLATES)
+                base = self.rng.choice(entries)
+                return {"headline": template.format(label=topic_label), "explanation": base["explanation"],
+                        "code": base["code"]}
+            entries = on_topic
+        weights = [1 / (rank + 1) for rank in range(len(entries))]
+        return self.rng.choices(entries, weights)[0]
+
+    def complete(self, messages, json_mode, n=1, max_tokens=500, temperature=0.8):
+        match = _TOPIC_LINE.search(messages[-1]["content"])
+        contents = []
+        for _ in range(n):
+            entry = self._pick(match.group(1) if match else None)
+            contents.append(json.dumps({
+                "headline": entry["headline"], "explanation": entry["explanation"], "code": entry["code"],
+                "tags": ["python"], "complexity": "intermediate",
+            }))
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        completion_tokens = sum(len(content) for content in contents) // 4
+        return ChatResult(contents, prompt_tokens, completion_tokens)
+
+
+def run(tips: int, planned: bool, seed: int) -> dict:
+    """Generate and save `tips` tips from a copy of the current history; returns the stats summary"""
+    workdir = Path(tempfile.mkdtemp(prefix="topic-bench-"))
+    try:
+        if (ROOT / "tips").exists():
+            shutil.copytree(ROOT / "tips", workdir / "tips")
+        if (ROOT / "tip_history.json").exists():
+            shutil.copy(ROOT / "tip_history.json", workdir / "tip_history.json")
+
+        import generation_stats
+        generation_stats.STATS_FILE = workdir / "generation_stats.json"
+        from tip_generator import TipGenerator
+        generator = TipGenerator(tips_directory=str(workdir / "tips"),
+                                 history_file=str(workdir / "tip_history.json"))
+        generator._backend = RepeatProneBackend(seed)
+        generator.candidates = 1
+        generator.output_format = "json"
+        generator.use_topic_planner = planned
+        for _ in range(tips):
+            generator.save_tip(generator.generate_tip())
+        return generation_stats.summarize_stats(generation_stats.load_stats())["planned" if planned else "unplanned"]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Duplicate rate with and without topic planning")
+    parser.add_argument("--tips", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    # Keep side files out of the working tree (modules read these at import)
+    scratch = Path(tempfile.mkdtemp(prefix="topic-bench-env-"))
+    os.environ.update({
+        "USAGE_LEDGER_FILE": str(scratch / "usage_ledger.jsonl"),
+        "FALLBACK_STATE_FILE": str(scratch / "fallback_state.json"),
+        "CODE_VALIDATION": "warn",
+    })
+    results = {mode: run(args.tips, mode == "planned", args.seed) for mode in ("unplanned", "planned")}
+    shutil.rmtree(scratch, ignore_errors=True)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print(f"Topic planning: {args.tips} tips per mode, seed {args.seed}")
+    print(f"{'='*60}")
+    for mode, entry in results.items():
+        print(f"{mode:<10} duplicate rate {entry['duplicate_rate']:.1%}  "
+              f"tokens/accepted tip {entry['tokens_per_accepted_tip']:.0f}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Code Validator for Python Tip Agent
+AST-based gate for generated tip code: syntax, risky calls, markdown fences, imports and minimum Python version
+"""
+
+import ast
+import json
+import os
+import re
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# "strict" rejects candidates with errors, "warn" only reports them, "off" skips validation
+CODE_VALIDATION = os.getenv("CODE_VALIDATION", "strict").lower()
+
+# Calls a tip must not make when a reader runs it, by resolved dotted name
+FORBIDDEN_CALLS = {
+    "file deletion": {
+        "os.remove", "os.unlink", "os.rmdir", "os.removedirs", "shutil.rmtree", "shutil.move",
+    },
+    "network": {
+        "socket.socket", "socket.create_connection", "urllib.request.urlopen", "urllib.request.urlretrieve",
+        "http.client.HTTPConnection", "http.client.HTTPSConnection", "ftplib.FTP", "smtplib.SMTP",
+        "smtplib.SMTP_SSL", "requests.get", "requests.post", "requests.put", "requests.delete",
+        "requests.patch", "requests.head", "requests.request", "httpx.get", "httpx.post", "httpx.Client",
+    },
+    "interactive input": {"input", "getpass.getpass"},
+    "process execution": {
+        "os.system", "os.popen", "os.execv", "os.execvp", "os.fork", "os.kill",
+        "subprocess.run", "subprocess.call", "subprocess.check_call", "subprocess.check_output", "subprocess.Popen",
+    },
+    "dynamic code execution": {"eval", "exec", "__import__"},
+}
+_CALL_CATEGORY = {name: category for category, names in FORBIDDEN_CALLS.items() for name in names}
+
+# Method names that delete files whatever object they are called on (pathlib and friends)
+_DELETING_METHODS = {"unlink", "rmdir", "rmtree"}
+
+_FENCE = re.compile(r"^\s*```[\w+-]*\s*$")
+
+# Syntax that sets a minimum Python version: ast node name -> (feature, version)
+_SYNTAX_FEATURES = {
+    "JoinedStr": ("f-string", (3, 6)),
+    "NamedExpr": ("assignment expression", (3, 8)),
+    "Match": ("match statement", (3, 10)),
+    "TryStar": ("except*", (3, 11)),
+    "TypeAlias": ("type statement", (3, 12)),
+}
+_FEATURE_NODES = {getattr(ast, node): info for node, info in _SYNTAX_FEATURES.items() if hasattr(ast, node)}
+_DEFINITION_NODES = {ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef}
+
+
+def strip_fences(code: str) -> str:
+    """
+    Remove markdown code fences a model left around (or inside) the code
+
+    When the text holds a fenced block, only the first block is kept;
+    stray fence lines are dropped.
+    """
+    lines = code.split("\n")
+    fences = [i for i, line in enumerate(lines) if _FENCE.match(line)]
+    if len(fences) >= 2:
+        lines = lines[fences[0] + 1:fences[1]]
+    else:
+        lines = [line for line in lines if not _FENCE.match(line)]
+    return "\n".join(lines).strip("\n")
+
+
+def _dotted(node: ast.AST) -> Optional[str]:
+    """'a.b.c' for a Name/Attribute chain, else None"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _resolve(name: str, aliases: Dict[str, str]) -> str:
+    head, _, rest = name.partition(".")
+    if head in aliases:
+        return f"{aliases[head]}.{rest}" if rest else aliases[head]
+    return name
+
+
+def validate_code(code: str, repair: bool = True) -> Dict:
+    """
+    Validate one tip's code
+
+    Parses once with ast and walks the tree once. Leftover markdown fences
+    are repaired (when repair is True) before parsing; everything else is
+    reported.
+
+    Returns:
+        Dictionary with ok, code (possibly repaired), errors, warnings,
+        repairs, imports, features and min_python ("3.x")
+    """
+    result = {"ok": True, "code": code, "errors": [], "warnings": [], "repairs": [],
+              "imports": [], "min_python": "3.0", "features": []}
+
+    if "```" in code:
+        if repair:
+            code = strip_fences(code)
+            result["code"] = code
+            result["repairs"].append("removed markdown fences")
+        else:
+            result["errors"].append("markdown fence in code")
+
+    if not code.strip():
+        result["errors"].append("empty code")
+        result["ok"] = False
+        return result
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            tree = ast.parse(code)
+    except SyntaxError as e:
+        result["errors"].append(f"syntax error: {e.msg} (line {e.lineno})")
+        result["ok"] = False
+        return result
+
+    # One walk collects imports, calls and syntax features; calls are
+    # resolved afterwards so an import below its use still counts
+    aliases = {}
+    calls = []
+    features = {}
+    for node in ast.walk(tree):
+        node_type = type(node)
+        if node_type is ast.Call:
+            calls.append(node)
+        elif node_type is ast.Import:
+            for alias in node.names:
+                top = alias.name.split(".")[0]
+                aliases[alias.asname or top] = alias.name if alias.asname else top
+        elif node_type is ast.ImportFrom and node.module and not node.level:
+            for alias in node.names:
+                aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+        elif node_type in _FEATURE_NODES:
+            feature, version = _FEATURE_NODES[node_type]
+            features[feature] = version
+        elif node_type in _DEFINITION_NODES:
+            if node_type is not ast.ClassDef and node.args.posonlyargs:
+                features["positional-only parameters"] = (3, 8)
+            if getattr(node, "type_params", None):
+                features["type parameters"] = (3, 12)
+
+    prints = False
+    for node in calls:
+        name = _dotted(node.func)
+        resolved = _resolve(name, aliases) if name is not None else None
+        category = _CALL_CATEGORY.get(resolved)
+        prints = prints or resolved == "print"
+        if category:
+            result["errors"].append(f"{category}: {resolved}() on line {node.lineno}")
+        elif isinstance(node.func, ast.Attribute) and node.func.attr in _DELETING_METHODS:
+            result["errors"].append(f"file deletion: .{node.func.attr}() on line {node.lineno}")
+
+    imports = {name.split(".")[0] for name in aliases.values()}
+    min_version = max(features.values(), default=(3, 0))
+    result["imports"] = sorted(imports)
+    result["min_python"] = f"{min_version[0]}.{min_version[1]}"
+    result["features"] = sorted(features, key=features.get)
+    if not prints:
+        result["warnings"].append("code prints nothing")
+    result["ok"] = not result["errors"]
+    return result
+
+
+def _rewrite_code(path: Path, original: str, code: str) -> bool:
+    """Replace a tip file's code with its repaired form; False when the file layout is unexpected"""
+    from file_lock import atomic_write_text
+    content = path.read_text(encoding="utf-8")
+    if path.suffix != ".ipynb":
+        if content.count(original) != 1:
+            return False
+        atomic_write_text(path, content.replace(original, code))
+        return True
+
+    from notebook_format import serialize_notebook, split_lines
+    notebook = json.loads(content)
+    code_cells = [cell for cell in notebook.get("cells", []) if cell.get("cell_type") == "code"]
+    if len(code_cells) != 1:
+        return False
+    code_cells[0]["source"] = split_lines(code)
+    atomic_write_text(path, serialize_notebook(notebook))
+    return True
+
+
+def _validate_file(path: str, repair: bool = False) -> Dict:
+    from tip_renderer import load_tip
+    try:
+        original = load_tip(Path(path))["code"]
+    except (OSError, ValueError) as e:
+        return {"path": path, "ok": False, "errors": [f"unreadable: {e}"], "warnings": [], "repairs": []}
+    result = validate_code(original)
+    code = result.pop("code")
+    result["path"] = path
+    result["rewritten"] = bool(repair and result["ok"] and result["repairs"]
+                               and _rewrite_code(Path(path), original, code))
+    return result
+
+
+def _validate_files(paths: List[str], repair: bool = False) -> List[Dict]:
+    return [_validate_file(path, repair) for path in paths]
+
+
+def validate_corpus(tips_dir: Path, workers: int = 0, repair: bool = False) -> List[Dict]:
+    """
+    Validate every tip file, in a process pool when there are many
+
+    Fixable problems (leftover fences) are reported as repairs rather than
+    errors; with repair=True the fixed code is written back to the file.
+
+    Args:
+        workers: Processes to use (0 = one per core)
+        repair: Rewrite files whose code only needed repairs
+
+    Returns:
+        One result per file, in path order
+    """
+    from tip_paths import iter_tip_files
+    paths = sorted(str(path) for path in iter_tip_files(tips_dir))
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(paths) < 256:
+        return _validate_files(paths, repair)
+    from concurrent.futures import ProcessPoolExecutor
+    size = -(-len(paths) // (workers * 4))
+    chunks = [paths[i:i + size] for i in range(0, len(paths), size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [result for chunk in pool.map(_validate_files, chunks, [repair] * len(chunks)) for result in chunk]
+
+
+def print_corpus_report(results: List[Dict]):
+    """Print the files that failed validation and a summary"""
+    failed = [result for result in results if not result["ok"]]
+    repairable = [result for result in results if result["ok"] and result["repairs"]]
+    for result in failed:
+        print(f"  [ERROR] {result['path']}: {'; '.join(result['errors'])}")
+    for result in repairable:
+        state = "repaired" if result.get("rewritten") else "repairable"
+        print(f"  [WARNING] {result['path']}: {state} ({'; '.join(result['repairs'])})")
+    versions = {}
+    for result in results:
+        if result.get("min_python"):
+            versions[result["min_python"]] = versions.get(result["min_python"], 0) + 1
+    rewritten = sum(1 for result in repairable if result.get("rewritten"))
+    print(f"Validated {len(results)} tip(s): {len(failed)} failed, {len(repairable)} needed repairs"
+          + (f" ({rewritten} rewritten)" if rewritten else ""))
+    if versions:
+        print("Minimum Python: " + ", ".join(f"{version} x{count}" for version, count in
+                                         sorted(versions.items(), key=lambda item: tuple(map(int, item[0].split("."))))))
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from tip_paths import TIPS_DIR
+    started = time.perf_counter()
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    results = validate_corpus(Path(paths[0]) if paths else TIPS_DIR, repair="--repair" in sys.argv)
+    print_corpus_report(results)
+    print(f"({time.perf_counter() - started:.2f}s)")
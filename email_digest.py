@@ -0,0 +1,196 @@
+"""
+Email Digest for Python Tip Agent
+Batches every tip queued since the last digest into one review email with per-tip links and an approve-all link
+"""
+
+import html
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# "single" sends one email per tip; "digest" queues tips for send_digest()
+EMAIL_MODE = os.getenv("EMAIL_MODE", "single").lower()
+# Tips per digest (and per approve-all link); the rest wait for the next one
+DIGEST_MAX_TIPS = int(os.getenv("DIGEST_MAX_TIPS", "25"))
+
+DIGEST_STYLE = """
+body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height: 1.6; color: #333;
+       max-width: 800px; margin: 0 auto; padding: 20px; background-color: #f5f5f5; }
+.header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px;
+          border-radius: 8px; margin-bottom: 25px; }
+.header h1 { margin: 0; font-size: 24px; }
+.tip { background-color: white; border-radius: 10px; padding: 20px 30px; margin-bottom: 20px;
+       box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+pre { background-color: #282c34; color: #abb2bf; padding: 16px; border-radius: 8px; overflow-x: auto;
+      font-family: 'Courier New', monospace; font-size: 14px; line-height: 1.5; }
+.button { display: inline-block; padding: 8px 20px; margin: 4px 8px 4px 0; text-decoration: none;
+          border-radius: 6px; font-weight: bold; color: white; }
+.approve { background-color: #28a745; }
+.reject { background-color: #dc3545; }
+.approve-all { background-color: #667eea; font-size: 18px; padding: 12px 30px; }
+.meta { color: #666; font-size: 14px; }
+"""
+
+
+def _urls(base_url: str, token: str) -> Dict[str, str]:
+    return {action: f"{base_url}/{action}/{token}" for action in ("approve", "reject", "preview")}
+
+
+def approve_all_url(base_url: str, tokens: List[str]) -> str:
+    """One link approving every listed token; each token already authorises its own tip"""
+    return f"{base_url}/approve-all/{','.join(tokens)}"
+
+
+def render_fragment(tip_data: Dict, token: str, base_url: str) -> Dict[str, str]:
+    """HTML and plain text section for one tip of a digest"""
+    urls = _urls(base_url, token)
+    code = tip_data.get("code", tip_data.get("content", ""))
+    explanation = tip_data.get("explanation", "")
+    scores_line = ""
+    if tip_data.get("scores"):
+        from tip_scoring import format_scores
+        scores_line = f"Quality: {format_scores(tip_data['scores'])}"
+
+    text = (
+        f"{tip_data['headline']}\n{'-' * len(tip_data['headline'])}\n\n"
+        + (f"{explanation}\n\n" if explanation else "")
+        + f"{code}\n\n"
+        + (f"{scores_line}\n" if scores_line else "")
+        + f"Preview: {urls['preview']}\nApprove: {urls['approve']}\nReject:  {urls['reject']}\n"
+    )
+    page = (
+        '<div class="tip">\n'
+        f"<h2>{html.escape(tip_data['headline'])}</h2>\n"
+        + (f"<p>{html.escape(explanation)}</p>\n" if explanation else "")
+        + f"<pre>{html.escape(code)}</pre>\n"
+        f'<p class="meta"><code>{html.escape(tip_data.get("filename", ""))}</code>'
+        + (f" · {html.escape(scores_line)}" if scores_line else "")
+        + f' · <a href="{urls["preview"]}">preview</a></p>\n'
+        f'<a href="{urls["approve"]}" class="button approve">✅ Approve</a>'
+        f'<a href="{urls["reject"]}" class="button reject">❌ Reject</a>\n'
+        "</div>"
+    )
+    return {"html": page, "text": text}
+
+
+def queue_tip(token: str):
+    """
+    Queue a registered tip for the next digest
+
+    Marks its pending entry with digest_queued_at, which is what the digest
+    collects; nothing is rendered until the digest is built.
+    """
+    from pending_store import update_pending
+
+    def _queue(pending):
+        entry = pending.get(token)
+        if entry is None or entry.get("digest_queued_at"):
+            return None
+        entry["digest_queued_at"] = datetime.now().isoformat()
+        return entry
+    update_pending(_queue)
+
+
+def digest_candidates(limit: int = DIGEST_MAX_TIPS) -> List[Tuple[str, Dict]]:
+    """Pending, unexpired tips queued since the last digest, oldest first"""
+    from pending_store import is_expired, load_pending
+    entries = [
+        (token, entry) for token, entry in load_pending().items()
+        if entry.get("status", "pending") == "pending"
+        and entry.get("digest_queued_at") and not entry.get("digest_sent_at")
+        and not is_expired(entry.get("created_at"))
+    ]
+    entries.sort(key=lambda item: item[1].get("created_at") or "")
+    return entries[:limit]
+
+
+def build_digest(entries: List[Tuple[str, Dict]], base_url: str) -> Tuple[str, str, str]:
+    """
+    Subject, plain text and HTML for a digest of (token, pending entry) pairs
+
+    Each tip's section is rendered once and shared by both bodies.
+    """
+    tokens = [token for token, _ in entries]
+    fragments = [render_fragment(entry["tip_data"], token, base_url) for token, entry in entries]
+    all_url = approve_all_url(base_url, tokens)
+    count = f"{len(entries)} tip{'s' if len(entries) != 1 else ''}"
+
+    if len(entries) == 1:
+        subject = f"🐍 Python Tip Digest: {entries[0][1]['tip_data']['headline']}"
+    else:
+        subject = f"🐍 Python Tip Digest: {count} to review"
+    text = (
+        f"Python Tip Digest\n=================\n\n{count} awaiting review.\n"
+        f"Approve all: {all_url}\n\n"
+        + "\n".join(fragment["text"] for fragment in fragments)
+        + "\n---\nGenerated by Python Tip Agent\n"
+    )
+    page = (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<style>{DIGEST_STYLE}</style>\n</head>\n<body>\n"
+        f'<div class="header"><h1>🐍 Python Tip Digest</h1><p>{count} awaiting review</p></div>\n'
+        f'<p><a href="{all_url}" class="button approve-all">✅ Approve all {count}</a></p>\n'
+        + "\n".join(fragment["html"] for fragment in fragments)
+        + '\n<p class="meta">Generated by Python Tip Agent</p>\n</body>\n</html>\n'
+    )
+    return subject, text, page
+
+
+def preview_digest(email_handler=None) -> Optional[Tuple[str, str]]:
+    """Subject and plain-text body of the next digest without sending it, or None when nothing is queued"""
+    if email_handler is None:
+        from email_handler import EmailHandler
+        email_handler = EmailHandler()
+    entries = digest_candidates()
+    if not entries:
+        return None
+    subject, text, _ = build_digest(entries, email_handler.approval_base_url)
+    return subject, text
+
+
+def send_digest(email_handler=None) -> Optional[int]:
+    """
+    Email every tip queued since the last digest as one message
+
+    Sent tips are marked with digest_sent_at in the pending store, so the
+    next digest starts after them.
+
+    Returns:
+        Number of tips in the digest (0 when nothing is queued), or None if
+        sending failed
+    """
+    if email_handler is None:
+        from email_handler import EmailHandler
+        email_handler = EmailHandler()
+    entries = digest_candidates()
+    if not entries:
+        logger.info("No tips waiting for a digest")
+        return 0
+
+    subject, text, page = build_digest(entries, email_handler.approval_base_url)
+    if not email_handler.send_message(subject, text, page):
+        return None
+    logger.info("Digest sent with %d tip(s)", len(entries))
+
+    from pending_store import update_pending
+    tokens = {token for token, _ in entries}
+    sent_at = datetime.now().isoformat()
+
+    def _mark(pending):
+        marked = [token for token in tokens if token in pending]
+        for token in marked:
+            pending[token]["digest_sent_at"] = sent_at
+        return marked or None
+    update_pending(_mark)
+    return len(entries)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    preview = preview_digest()
+    print("[OK] No tips waiting for a digest" if preview is None else "Subject: {}\n{}".format(*preview))
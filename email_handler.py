@@ -3,13 +3,30 @@ Email Handler for Python Tip Agent
 Sends email notifications with approval links
 """
 
-import smtplib
+import logging
 import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Dict
+from typing import Dict, Optional
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+# Outbound quota shared by every handler in the process (0 disables)
+EMAIL_RATE_PER_HOUR = float(os.getenv("EMAIL_RATE_PER_HOUR", "20"))
+EMAIL_BURST = float(os.getenv("EMAIL_BURST", "5"))
+# How long a send may wait for the quota before giving up
+EMAIL_RATE_TIMEOUT = float(os.getenv("EMAIL_RATE_TIMEOUT", "60"))
+
+_send_bucket = None
+
+
+def _email_bucket():
+    """The process-wide SMTP token bucket, or None when rate limiting is off"""
+    global _send_bucket
+    if _send_bucket is None and EMAIL_RATE_PER_HOUR > 0:
+        from rate_limit import TokenBucket
+        _send_bucket = TokenBucket(EMAIL_RATE_PER_HOUR / 3600.0, EMAIL_BURST)
+    return _send_bucket
+
 
 class EmailHandler:
     """Handles email notifications for tip approval"""
@@ -21,6 +38,8 @@ class EmailHandler:
         self.sender_password = os.getenv("SENDER_PASSWORD")
         self.recipient_email = os.getenv("RECIPIENT_EMAIL", "Sheida.shaban18@gmail.com")
         self.approval_base_url = os.getenv("APPROVAL_BASE_URL", "http://localhost:5000")
+        # Disable for local relays that don't offer TLS
+        self.use_starttls = os.getenv("SMTP_STARTTLS", "True").lower() == "true"
     
     def send_approval_email(self, tip_data: Dict[str, str], approval_token: str) -> bool:
         """
@@ -34,16 +53,10 @@ class EmailHandler:
             True if email sent successfully, False otherwise
         """
         if not self.sender_email or not self.sender_password:
-            print("Email credentials not configured. Skipping email.")
+            logger.warning("Email credentials not configured. Skipping email.")
             return False
         
         try:
-            # Create message
-            message = MIMEMultipart("alternative")
-            message["Subject"] = f"🐍 Daily Python Tip: {tip_data['headline']}"
-            message["From"] = self.sender_email
-            message["To"] = self.recipient_email
-            
             # Read the tip content (either from 'code' key for new format or 'content' for old)
             if 'code' in tip_data and 'explanation' in tip_data:
                 # New format with separate code and explanation
@@ -55,9 +68,16 @@ class EmailHandler:
                 tip_code = tip_content
                 tip_explanation = ""
             
+            # Candidate scores from best-of-N generation, if any
+            scores_line = ""
+            if tip_data.get('scores'):
+                from tip_scoring import format_scores
+                scores_line = f"Quality: {format_scores(tip_data['scores'])}"
+            
             # Create approve and reject URLs
             approve_url = f"{self.approval_base_url}/approve/{approval_token}"
             reject_url = f"{self.approval_base_url}/reject/{approval_token}"
+            preview_url = f"{self.approval_base_url}/preview/{approval_token}"
             
             # Create plain text version
             text_content = f"""
@@ -70,9 +90,12 @@ Daily Python Tip
 
 {tip_code if 'code' in tip_data else tip_content}
 
+{scores_line}
+
 ---
 
 ACTIONS:
+Preview the notebook: {preview_url}
 Approve and push to GitHub: {approve_url}
 Reject this tip: {reject_url}
 
@@ -188,13 +211,15 @@ Generated by Python Tip Agent
         
         <div class="actions">
             <h3>Review this tip:</h3>
-            <p>Click below to approve and push to GitHub, or reject this tip:</p>
+            <p>Click below to approve and push to GitHub, or reject this tip
+               (<a href="{preview_url}">preview the notebook</a>):</p>
             <a href="{approve_url}" class="button approve">✅ Approve & Push to GitHub</a>
             <a href="{reject_url}" class="button reject">❌ Reject</a>
         </div>
         
         <div class="footer">
             <p><strong>Filename:</strong> <code>{tip_data['filename']}</code></p>
+            {f'<p>{scores_line}</p>' if scores_line else ''}
             <p>Generated by Python Tip Agent on {tip_data['date'][:10]}</p>
         </div>
     </div>
@@ -202,30 +227,70 @@ Generated by Python Tip Agent
 </html>
             """
             
-            # Attach both versions
-            part1 = MIMEText(text_content, "plain")
-            part2 = MIMEText(html_content, "html")
-            message.attach(part1)
-            message.attach(part2)
+        except Exception as e:
+            logger.error("Error building email: %s", e)
+            return False
+        
+        return self.send_message(f"🐍 Daily Python Tip: {tip_data['headline']}", text_content, html_content)
+    
+    def send_message(self, subject: str, text_content: str, html_content: str,
+                     timeout: Optional[float] = None) -> bool:
+        """
+        Send a plain text + HTML message to the recipient
+        
+        Waits for the outbound quota (EMAIL_RATE_PER_HOUR, EMAIL_BURST) so
+        bursts of tips don't trip the provider's limits.
+        
+        Args:
+            timeout: Longest wait for the quota in seconds (default EMAIL_RATE_TIMEOUT)
+            
+        Returns:
+            True if the message was sent, False otherwise
+        """
+        if not self.sender_email or not self.sender_password:
+            logger.warning("Email credentials not configured. Skipping email.")
+            return False
+        
+        bucket = _email_bucket()
+        if bucket is not None:
+            timeout = EMAIL_RATE_TIMEOUT if timeout is None else timeout
+            if not bucket.acquire(timeout=timeout):
+                logger.warning("Email rate limit reached; next send possible in %.0fs", bucket.wait_time())
+                return False
+        
+        # Imported here so CLI commands that never send mail skip the cost
+        import smtplib
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        
+        try:
+            message = MIMEMultipart("alternative")
+            message["Subject"] = subject
+            message["From"] = self.sender_email
+            message["To"] = self.recipient_email
+            message.attach(MIMEText(text_content, "plain"))
+            message.attach(MIMEText(html_content, "html"))
             
-            # Send email
             with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
+                if self.use_starttls:
+                    server.starttls()
                 server.login(self.sender_email, self.sender_password)
                 server.send_message(message)
             
-            print(f"[OK] Email sent successfully to {self.recipient_email}")
+            logger.info("Email sent successfully to %s", self.recipient_email)
             return True
             
         except Exception as e:
-            print(f"[ERROR] Error sending email: {e}")
+            logger.error("Error sending email: %s", e)
             return False
 
 
 if __name__ == "__main__":
     # Test the email handler
     from dotenv import load_dotenv
+    from agent_logging import setup_logging
     load_dotenv()
+    setup_logging()
     
     handler = EmailHandler()
     
@@ -0,0 +1,114 @@
+"""
+Fallback Tip Catalog for Python Tip Agent
+Serves offline tips from a versioned JSONL catalog using a persisted read cursor
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+from file_lock import atomic_write_text
+
+
+CATALOG_FILE = Path(os.getenv("FALLBACK_CATALOG_FILE", Path(__file__).with_name("fallback_tips.jsonl")))
+STATE_FILE = Path(os.getenv("FALLBACK_STATE_FILE", "fallback_state.json"))
+
+
+class FallbackCatalog:
+    """
+    Offline tip catalog
+
+    The catalog is a JSONL file: a header line with "catalog_version", then
+    one tip per line (shortname, headline, explanation, code). Nothing is
+    parsed up front; a cursor (byte offset of the first entry not yet known
+    to be used) is persisted in STATE_FILE, so each call seeks straight to
+    it and each entry is skipped at most once over the catalog's lifetime.
+    Bumping catalog_version resets the cursor.
+    """
+
+    def __init__(self, catalog_file: Path = CATALOG_FILE, state_file: Path = STATE_FILE):
+        self.catalog_file = Path(catalog_file)
+        self.state_file = Path(state_file)
+
+    def _load_state(self) -> Dict:
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _save_state(self, version, offset: int):
+        atomic_write_text(self.state_file, json.dumps({"catalog_version": version, "offset": offset}))
+
+    def next_unused(self, is_used: Callable[[str], bool]) -> Optional[Dict[str, str]]:
+        """
+        Return the first catalog entry whose shortname is not used yet
+
+        The cursor is left pointing at the returned entry, so a tip that is
+        generated but never saved is offered again on the next call.
+
+        Returns:
+            Entry dict, or None if the catalog is missing or exhausted
+        """
+        if not self.catalog_file.exists():
+            return None
+
+        with open(self.catalog_file, 'rb') as f:
+            header_line = f.readline()
+            version = json.loads(header_line).get("catalog_version")
+            size = os.fstat(f.fileno()).st_size
+
+            state = self._load_state()
+            start = state.get("offset", 0)
+            if state.get("catalog_version") != version or not len(header_line) <= start <= size:
+                start = len(header_line)
+
+            offset = start
+            f.seek(offset)
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if not is_used(entry["shortname"]):
+                        if offset != start:
+                            self._save_state(version, offset)
+                        return entry
+                offset += len(line)
+
+        if offset != start:
+            self._save_state(version, offset)
+        return None
+
+    def iter_entries(self) -> Iterator[Dict[str, str]]:
+        """Yield every catalog entry in file order"""
+        with open(self.catalog_file, 'rb') as f:
+            f.readline()
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def stats(self) -> Dict:
+        """Catalog version, entry count and cursor position (scans the whole file)"""
+        with open(self.catalog_file, 'rb') as f:
+            version = json.loads(f.readline()).get("catalog_version")
+            offsets = []
+            position = f.tell()
+            for line in f:
+                if line.strip():
+                    offsets.append(position)
+                position += len(line)
+        state = self._load_state()
+        cursor = state.get("offset", 0) if state.get("catalog_version") == version else 0
+        return {
+            "catalog_version": version,
+            "entries": len(offsets),
+            "consumed": sum(1 for offset in offsets if offset < cursor),
+        }
+
+
+if __name__ == "__main__":
+    info = FallbackCatalog().stats()
+    print(f"Fallback catalog v{info['catalog_version']}: "
+          f"{info['entries']} entries, {info['consumed']} consumed")
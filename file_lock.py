@@ -0,0 +1,105 @@
+"""
+Inter-process File Lock for Python Tip Agent
+Serializes access to shared files across worker processes
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class LockTimeout(Exception):
+    """Raised when a lock could not be acquired in time"""
+
+
+class FileLock:
+    """
+    Exclusive advisory lock backed by a lock file
+
+    Works across processes (gunicorn workers, the scheduler, CLI scripts)
+    as well as threads, since every acquire opens its own file handle.
+    """
+
+    def __init__(self, path, timeout: Optional[float] = 30.0, poll_interval: float = 0.01):
+        """
+        Args:
+            path: Lock file path (created if missing)
+            timeout: Seconds to wait before raising LockTimeout (None waits forever)
+            poll_interval: Sleep between non-blocking attempts
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd = None
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Acquire the lock, returning False if non-blocking and held elsewhere"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._try_lock(fd):
+            if not blocking:
+                os.close(fd)
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                raise LockTimeout(f"Timed out waiting for lock: {self.path}")
+            time.sleep(self.poll_interval)
+        self._fd = fd
+        return True
+
+    def release(self):
+        """Release the lock if held"""
+        if self._fd is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def atomic_write_text(path, text: str, encoding: str = "utf-8"):
+    """Write a file via a temp file and os.replace so readers never see a partial write"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'w', encoding=encoding) as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
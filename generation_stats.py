@@ -0,0 +1,115 @@
+"""
+Generation Statistics for Python Tip Agent
+Tracks duplicate rates, response parsing and code validation outcomes for paid completions
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict
+
+
+STATS_FILE = Path(os.getenv("GENERATION_STATS_FILE", "generation_stats.json"))
+
+
+def load_stats() -> Dict:
+    if STATS_FILE.exists():
+        with open(STATS_FILE, 'r') as f:
+            return json.load(f)
+    return {"generation": {}, "parsing": {}}
+
+
+def _save_stats(stats: Dict):
+    with open(STATS_FILE, 'w') as f:
+        json.dump(stats, f, indent=2)
+
+
+def record_generation(mode: str, duplicate: bool, prompt_tokens: int = 0, completion_tokens: int = 0):
+    """Record one paid completion under `mode` ('planned' or 'unplanned')"""
+    stats = load_stats()
+    entry = stats["generation"].setdefault(
+        mode, {"completions": 0, "duplicates": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    )
+    entry["completions"] += 1
+    entry["duplicates"] += int(duplicate)
+    entry["prompt_tokens"] += prompt_tokens
+    entry["completion_tokens"] += completion_tokens
+    _save_stats(stats)
+
+
+def record_parse(output_format: str, failed: bool, repaired: bool = False, repair_tokens: int = 0):
+    """Record how a response parsed, and what any repair call cost"""
+    stats = load_stats()
+    entry = stats["parsing"].setdefault(
+        output_format, {"responses": 0, "parse_failures": 0, "repaired": 0, "repair_tokens": 0}
+    )
+    entry["responses"] += 1
+    entry["parse_failures"] += int(failed)
+    entry["repaired"] += int(repaired)
+    entry["repair_tokens"] += repair_tokens
+    _save_stats(stats)
+
+
+def record_validation(result: Dict):
+    """Record one candidate's code validation outcome and its error categories"""
+    stats = load_stats()
+    entry = stats.setdefault("validation", {"candidates": 0, "rejected": 0, "repaired": 0, "errors": {}})
+    entry["candidates"] += 1
+    entry["rejected"] += int(bool(result["errors"]))
+    entry["repaired"] += int(bool(result["repairs"]))
+    for error in result["errors"]:
+        category = error.split(":", 1)[0]
+        entry["errors"][category] = entry["errors"].get(category, 0) + 1
+    _save_stats(stats)
+
+
+def summarize_stats(stats: Dict) -> Dict[str, Dict[str, float]]:
+    """Duplicate-rejection rate and tokens per accepted tip for each mode"""
+    summary = {}
+    for mode, entry in stats["generation"].items():
+        completions = entry["completions"]
+        accepted = completions - entry["duplicates"]
+        tokens = entry["prompt_tokens"] + entry["completion_tokens"]
+        summary[mode] = {
+            "completions": completions,
+            "duplicate_rate": entry["duplicates"] / completions if completions else 0.0,
+            "tokens_per_accepted_tip": tokens / accepted if accepted else float(tokens),
+        }
+    return summary
+
+
+def print_stats():
+    """Print generation and parsing stats"""
+    stats = load_stats()
+    summary = summarize_stats(stats)
+    if not summary and not stats["parsing"] and not stats.get("validation"):
+        print("No API generations recorded yet")
+        return
+
+    if summary:
+        print("Generation stats:")
+    for mode, entry in summary.items():
+        print(f"  {mode:<10} completions {entry['completions']:<5} "
+              f"duplicate rate {entry['duplicate_rate']:.0%}  "
+              f"tokens/accepted tip {entry['tokens_per_accepted_tip']:.0f}")
+
+    if stats["parsing"]:
+        print("\nResponse parsing:")
+        for output_format, entry in stats["parsing"].items():
+            responses = entry["responses"]
+            failure_rate = entry["parse_failures"] / responses if responses else 0.0
+            print(f"  {output_format:<10} responses {responses:<5} "
+                  f"parse failure rate {failure_rate:.0%}  "
+                  f"repaired {entry['repaired']}  repair tokens {entry['repair_tokens']}")
+
+    validation = stats.get("validation")
+    if validation:
+        print("\nCode validation:")
+        print(f"  candidates {validation['candidates']:<5} rejected {validation['rejected']}  "
+              f"repaired {validation['repaired']}")
+        for category, count in sorted(validation["errors"].items()):
+            print(f"    {category:<24} {count}")
+
+
+if __name__ == "__main__":
+    print_stats()
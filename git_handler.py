@@ -3,10 +3,30 @@ Git Handler for Python Tip Agent
 Manages Git operations: commit and push
 """
 
+import logging
 import os
+import subprocess
+import time
 from pathlib import Path
-from git import Repo, GitCommandError
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+import metrics
+from file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+# Commit tips straight into the object database instead of through the index.
+# "auto" enables it for the sharded layout only: a flat tips/ is one huge tree
+# that the fast path would have to rewrite on every commit.
+_FAST_COMMIT_SETTING = os.getenv("GIT_FAST_COMMIT", "auto").lower()
+if _FAST_COMMIT_SETTING == "auto":
+    from tip_paths import TIPS_LAYOUT
+    GIT_FAST_COMMIT = TIPS_LAYOUT == "sharded"
+else:
+    GIT_FAST_COMMIT = _FAST_COMMIT_SETTING == "true"
+
+
+class FastCommitUnavailable(Exception):
+    """The object database fast path cannot be used; fall back to git add + commit"""
 
 
 class GitHandler:
@@ -20,6 +40,8 @@ class GitHandler:
             repo_path: Path to the Git repository
             remote_url: Remote repository URL (e.g., GitHub URL)
         """
+        from git import Repo
+        
         self.repo_path = Path(repo_path)
         self.remote_url = remote_url or os.getenv("GITHUB_REPO_URL")
         
@@ -28,7 +50,7 @@ class GitHandler:
         except Exception:
             # Initialize repo if it doesn't exist
             self.repo = Repo.init(self.repo_path)
-            print(f"[OK] Initialized new Git repository at {self.repo_path}")
+            logger.info("Initialized new Git repository at %s", self.repo_path)
         
         # Set up remote if provided
         if self.remote_url:
@@ -41,17 +63,118 @@ class GitHandler:
                 origin = self.repo.remote('origin')
                 if origin.url != self.remote_url:
                     origin.set_url(self.remote_url)
-                    print(f"[OK] Updated remote origin to {self.remote_url}")
+                    logger.info("Updated remote origin to %s", self.remote_url)
             else:
                 self.repo.create_remote('origin', self.remote_url)
-                print(f"[OK] Added remote origin: {self.remote_url}")
+                logger.info("Added remote origin: %s", self.remote_url)
         except Exception as e:
-            print(f"[WARNING] Could not set up remote: {e}")
+            logger.warning("Could not set up remote: %s", e)
+    
+    def _git(self, *args: str, input: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> str:
+        """Run a git plumbing command in the repository and return its stripped stdout"""
+        result = subprocess.run(
+            ["git", *args], cwd=self.repo.working_tree_dir or self.repo.git_dir,
+            input=input, capture_output=True, text=True,
+            env={**os.environ, **env} if env else None,
+        )
+        if result.returncode != 0:
+            raise FastCommitUnavailable(f"git {args[0]}: {result.stderr.strip()}")
+        return result.stdout.strip()
+    
+    def _identity(self) -> Dict[str, str]:
+        """Author/committer environment with GitPython's identity fallback"""
+        from git import Actor
+        actor = Actor.committer(self.repo.config_reader())
+        return {
+            "GIT_AUTHOR_NAME": actor.name, "GIT_AUTHOR_EMAIL": actor.email,
+            "GIT_COMMITTER_NAME": actor.name, "GIT_COMMITTER_EMAIL": actor.email,
+        }
+    
+    def _write_tree(self, base_tree: Optional[str], changes: Dict[str, str]) -> str:
+        """
+        Write a tree that is base_tree with blobs replaced or added
+        
+        Only the trees along the changed paths are listed and rewritten
+        (ls-tree + mktree per level), so the cost follows the path depth and
+        the size of those directories rather than the whole corpus.
+        
+        Args:
+            base_tree: Tree object to start from, or None for an empty tree
+            changes: Blob object ids keyed by posix path relative to this tree
+        """
+        entries = {}
+        if base_tree:
+            for record in self._git("ls-tree", "-z", base_tree).split("\0"):
+                if record:
+                    info, name = record.split("\t", 1)
+                    entries[name] = info.split(" ")
+        
+        subtrees: Dict[str, Dict[str, str]] = {}
+        for path, blob in changes.items():
+            name, _, rest = path.partition("/")
+            if rest:
+                subtrees.setdefault(name, {})[rest] = blob
+            else:
+                mode = entries[name][0] if name in entries and entries[name][1] == "blob" else "100644"
+                entries[name] = [mode, "blob", blob]
+        for name, sub_changes in subtrees.items():
+            base = entries[name][2] if name in entries and entries[name][1] == "tree" else None
+            entries[name] = ["040000", "tree", self._write_tree(base, sub_changes)]
+        
+        listing = "".join(f"{mode} {kind} {oid}\t{name}\0" for name, (mode, kind, oid) in entries.items())
+        return self._git("mktree", "-z", input=listing)
+    
+    def _commit_objects(self, paths, commit_message: str) -> Optional[str]:
+        """
+        Commit files without touching the index or working tree
+        
+        Hashes the files into the object database, builds the new tree from
+        HEAD's tree, and moves the branch with update-ref's compare-and-swap,
+        so a branch that moved since we read it is never overwritten.
+        
+        Returns:
+            The new commit id, or None if the files already match HEAD
+            
+        Raises:
+            FastCommitUnavailable: detached HEAD, unborn branch, files outside
+                the repository, or the branch moved underneath us
+        """
+        ref = self._git("symbolic-ref", "-q", "HEAD")  # fails on a detached HEAD
+        parent = self._git("rev-parse", "-q", "--verify", f"{ref}^{{commit}}")
+        
+        root = Path(self.repo.working_tree_dir).resolve()
+        try:
+            relative = [Path(path).resolve().relative_to(root).as_posix() for path in paths]
+        except ValueError:
+            raise FastCommitUnavailable("file is outside the repository")
+        
+        blobs = self._git("hash-object", "-w", "--", *[str(Path(path).resolve()) for path in paths]).split()
+        parent_tree = self._git("rev-parse", f"{parent}^{{tree}}")
+        tree = self._write_tree(parent_tree, dict(zip(relative, blobs)))
+        if tree == parent_tree:
+            return None
+        
+        commit = self._git("commit-tree", tree, "-p", parent, "-F", "-",
+                           input=commit_message, env=self._identity())
+        self._git("update-ref", "-m", f"commit: {commit_message.splitlines()[0]}", ref, commit, parent)
+        
+        # HEAD now points at the new commit; record the files in the index too,
+        # or the next `git commit` from the checkout would revert them
+        index = "".join(f"100644 {blob}\t{path}\n" for path, blob in zip(relative, blobs))
+        try:
+            self._git("update-index", "--add", "--index-info", input=index)
+        except FastCommitUnavailable as e:
+            logger.warning("Committed %s but could not update the index: %s", commit[:8], e)
+        return commit
     
     def commit_tip(self, tip_filepath: Path, tip_data: dict) -> bool:
         """
         Commit a new tip file to the repository
         
+        Writes the commit through the object database when possible and
+        falls back to staging through the index (e.g. when the branch moved
+        while the commit was being built).
+        
         Args:
             tip_filepath: Path to the tip file
             tip_data: Dictionary containing tip metadata
@@ -60,26 +183,46 @@ class GitHandler:
             True if commit successful, False otherwise
         """
         try:
-            # Add the tip file
-            self.repo.index.add([str(tip_filepath)])
+            paths = [str(tip_filepath)]
             
             # Also add the history file if it exists
             history_file = self.repo_path / "tip_history.json"
             if history_file.exists():
-                self.repo.index.add([str(history_file)])
+                paths.append(str(history_file))
             
             # Create commit message
             commit_message = f"Add Python Tip: {tip_data['headline']}\n\n"
             commit_message += f"Filename: {tip_data['filename']}\n"
             commit_message += f"Generated: {tip_data['date'][:10]}"
             
-            # Commit
-            self.repo.index.commit(commit_message)
-            print(f"[OK] Committed: {tip_data['filename']}")
+            if GIT_FAST_COMMIT:
+                try:
+                    if self._commit_objects(paths, commit_message) is None:
+                        logger.info("Already committed: %s", tip_data['filename'])
+                    else:
+                        metrics.GIT_COMMITS.inc(path="objects")
+                        logger.info("Committed: %s", tip_data['filename'])
+                    return True
+                except FastCommitUnavailable as e:
+                    logger.warning("Fast commit unavailable (%s); staging through the index", e)
+            
+            # Stage with git itself; GitPython's index.add parses and rewrites
+            # every index entry in Python, which dominates on large corpora
+            self.repo.git.add("--", *paths)
+            if self.repo.git.diff("--cached", "--name-only", "--", *paths) == "":
+                # Already committed (e.g. a retry after a failed push)
+                logger.info("Already committed: %s", tip_data['filename'])
+                return True
+            
+            # Commit what is staged, as index.commit did, with the same identity fallback
+            with self.repo.git.custom_environment(**self._identity()):
+                self.repo.git.commit("-q", "--untracked-files=no", "-m", commit_message)
+            metrics.GIT_COMMITS.inc(path="index")
+            logger.info("Committed: %s", tip_data['filename'])
             return True
             
         except Exception as e:
-            print(f"[ERROR] Error committing file: {e}")
+            logger.error("Error committing file: %s", e)
             return False
     
     def push_to_remote(self, branch: str = "master") -> bool:
@@ -92,28 +235,37 @@ class GitHandler:
         Returns:
             True if push successful, False otherwise
         """
+        from git import GitCommandError
+        
+        started = time.perf_counter()
         try:
             if 'origin' not in [remote.name for remote in self.repo.remotes]:
-                print("[ERROR] No remote 'origin' configured")
+                logger.error("No remote 'origin' configured")
+                metrics.GIT_PUSH_FAILURES.inc()
                 return False
             
             origin = self.repo.remote('origin')
             
             # Try to push
             push_info = origin.push(branch)
+            metrics.GIT_PUSH_SECONDS.observe(time.perf_counter() - started)
             
             if push_info:
-                print(f"[OK] Successfully pushed to {branch} branch")
+                logger.info("Successfully pushed to %s branch", branch)
                 return True
             else:
-                print("[WARNING] Push completed but no info returned")
+                logger.warning("Push completed but no info returned")
                 return True
                 
         except GitCommandError as e:
-            print(f"[ERROR] Error pushing to remote: {e}")
+            metrics.GIT_PUSH_SECONDS.observe(time.perf_counter() - started)
+            metrics.GIT_PUSH_FAILURES.inc()
+            logger.error("Error pushing to remote: %s", e)
             return False
         except Exception as e:
-            print(f"[ERROR] Unexpected error during push: {e}")
+            metrics.GIT_PUSH_SECONDS.observe(time.perf_counter() - started)
+            metrics.GIT_PUSH_FAILURES.inc()
+            logger.error("Unexpected error during push: %s", e)
             return False
     
     def commit_and_push(self, tip_filepath: Path, tip_data: dict, branch: str = "master") -> bool:
@@ -128,10 +280,31 @@ class GitHandler:
         Returns:
             True if both operations successful, False otherwise
         """
-        if not self.commit_tip(tip_filepath, tip_data):
-            return False
+        # Serialize commit+push across server workers and CLI tools; the lock
+        # lives inside .git so it never shows up in the working tree
+        with FileLock(Path(self.repo.git_dir) / "tip-agent-push.lock", timeout=120):
+            if not self.commit_tip(tip_filepath, tip_data):
+                return False
+            
+            return self.push_to_remote(branch)
+    
+    def commit_tips_and_push(self, tips, branch: str = "master") -> Tuple[List[bool], bool]:
+        """
+        Commit several tips and push them together
+        
+        Used by approve-all: one push for the whole batch instead of one per tip.
         
-        return self.push_to_remote(branch)
+        Args:
+            tips: (tip_filepath, tip_data) pairs
+            branch: Branch name to push (default: master)
+            
+        Returns:
+            (whether each tip was committed, whether the push succeeded)
+        """
+        with FileLock(Path(self.repo.git_dir) / "tip-agent-push.lock", timeout=120):
+            committed = [self.commit_tip(tip_filepath, tip_data) for tip_filepath, tip_data in tips]
+            pushed = any(committed) and self.push_to_remote(branch)
+        return committed, pushed
     
     def get_status(self) -> str:
         """Get the current Git status"""
@@ -153,7 +326,9 @@ class GitHandler:
 if __name__ == "__main__":
     # Test the Git handler
     from dotenv import load_dotenv
+    from agent_logging import setup_logging
     load_dotenv()
+    setup_logging()
     
     handler = GitHandler()
     print("\n=== Git Status ===")
@@ -0,0 +1,59 @@
+"""
+Gunicorn Configuration for the Approval Server
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+
+Shared state lives outside worker memory: the pending store is a
+lock-protected file (pending_store.py), git commit/push is serialized with
+a lock inside .git (GitHandler.commit_and_push), rate-limit buckets are
+lock-protected files under RATE_LIMIT_DIR, and each worker writes a metrics
+snapshot to METRICS_MULTIPROC_DIR that /metrics merges. Any number of
+workers can serve approval links safely and share one limit.
+
+Graceful reload (finish in-flight requests, then swap workers):
+    kill -HUP $(cat gunicorn.pid)
+"""
+
+import multiprocessing
+import os
+from pathlib import Path
+
+bind = f"0.0.0.0:{os.getenv('FLASK_PORT', '5000')}"
+workers = int(os.getenv("APPROVAL_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("APPROVAL_THREADS", "2"))
+worker_class = "gthread"
+
+# Approvals block on git push, so allow slow requests before killing a worker
+timeout = int(os.getenv("APPROVAL_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = 1000
+max_requests_jitter = 100
+
+pidfile = os.getenv("APPROVAL_PIDFILE", "gunicorn.pid")
+
+# Rate limits and metrics shared by all workers (set before workers import the app)
+shared_dir = Path(os.getenv("APPROVAL_SHARED_DIR", ".approval_shared"))
+os.environ.setdefault("RATE_LIMIT_DIR", str(shared_dir / "rate_limit"))
+os.environ.setdefault("METRICS_MULTIPROC_DIR", str(shared_dir / "metrics"))
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Counters restart from zero with the server, as they would in one process
+    import metrics
+    metrics.reset_multiproc_dir()
+
+
+def worker_exit(server, worker):
+    # Runs in the worker: leave its final counts behind
+    import metrics
+    metrics.flush_snapshot()
+
+
+def child_exit(server, worker):
+    # Runs in the master once the worker is gone
+    import metrics
+    metrics.archive_worker(worker.pid)
@@ -0,0 +1,180 @@
+"""
+History Rebuild for Python Tip Agent
+Reconstructs tip_history.json entries from git history in a single log pass
+"""
+
+import json
+import logging
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+from notebook_format import tip_headline
+from tip_paths import TIPS_DIR, TIP_SUFFIXES, tip_shortname
+
+
+COMMIT_PREFIX = "Add Python Tip: "
+
+logger = logging.getLogger(__name__)
+
+
+def _committed_tips(repo_path: Path, tips_rel: str) -> Dict[str, Dict[str, str]]:
+    """
+    Tip files present at HEAD, each with the commit that added it
+
+    One `git log --reverse --name-status` stream covers the whole history;
+    renames (e.g. the move into YYYY/MM shards) keep the original commit,
+    and deleted files drop out.
+    """
+    command = [
+        "git", "-c", "core.quotePath=false", "log", "--reverse", "-M", "--name-status",
+        "--diff-filter=ADR", "--format=%x01%H%x09%aI%x09%s", "--", tips_rel,
+    ]
+    files = {}
+    commit = {}
+    with subprocess.Popen(command, cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          text=True, encoding="utf-8") as proc:
+        for line in proc.stdout:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            if line.startswith("\x01"):
+                sha, date, subject = line[1:].split("\t", 2)
+                commit = {"commit": sha, "date": date, "subject": subject}
+                continue
+            status, *paths = line.split("\t")
+            if not paths[-1].endswith(TIP_SUFFIXES):
+                continue
+            if status == "D":
+                files.pop(paths[0], None)
+            elif status.startswith("R"):
+                files[paths[1]] = files.pop(paths[0], None) or commit
+            else:
+                files[paths[0]] = commit
+        stderr = proc.stderr.read()
+    if proc.returncode != 0:
+        raise RuntimeError(f"git log failed: {stderr.strip()}")
+    return files
+
+
+def _read_headlines(repo_path: Path, paths: List[str]) -> Dict[str, str]:
+    """Headline from each file's "# Python Tip:" header, read from HEAD with one cat-file --batch"""
+    if not paths:
+        return {}
+    listing = subprocess.run(
+        ["git", "-c", "core.quotePath=false", "ls-tree", "-z", "HEAD", "--", *paths],
+        cwd=repo_path, capture_output=True, text=True, check=True,
+    ).stdout
+    blobs = {}
+    for record in listing.split("\0"):
+        if record:
+            info, path = record.split("\t", 1)
+            blobs[path] = info.split(" ")[2]
+
+    order = list(blobs.items())
+    output = subprocess.run(
+        ["git", "cat-file", "--batch"], cwd=repo_path, capture_output=True, check=True,
+        input="".join(f"{oid}\n" for _, oid in order).encode(),
+    ).stdout
+
+    headlines = {}
+    offset = 0
+    for path, _ in order:
+        header_end = output.index(b"\n", offset)
+        size = int(output[offset:header_end].split()[2])
+        content = output[header_end + 1:header_end + 1 + size].decode("utf-8", "replace")
+        offset = header_end + 1 + size + 1
+        headline = tip_headline(path, content)
+        if headline:
+            headlines[path] = headline
+    return headlines
+
+
+def rebuild_history(repo_path: str = ".", history_file: Path = Path("tip_history.json"),
+                    tips_dir: Path = TIPS_DIR, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Merge tips found in git history into the history file
+
+    Headlines come from `Add Python Tip:` commit subjects, or from the
+    notebook header for commits made another way (the workflow's own
+    commit). Existing entries keep their fields and gain `commit` and
+    `path`; committed tips missing from the file are appended, except
+    copies of a tip already listed under the same shortname; entries for
+    tips that were never committed are left alone. An unreadable history
+    file is kept as <name>.corrupt and rebuilt from scratch.
+
+    Returns:
+        Counts of committed tips found, entries added and entries updated
+    """
+    from file_lock import atomic_write_text
+
+    repo_path = Path(repo_path).resolve()
+    history_file = Path(history_file)
+    if not history_file.is_absolute():
+        history_file = repo_path / history_file
+    tips_dir = Path(tips_dir)
+    tips_rel = (tips_dir.relative_to(repo_path) if tips_dir.is_absolute() else tips_dir).as_posix()
+
+    history = {"tips": []}
+    corrupt = False
+    if history_file.exists():
+        try:
+            with open(history_file, 'r') as f:
+                history = json.load(f)
+            history.setdefault("tips", [])
+        except (ValueError, AttributeError):
+            corrupt = True
+            logger.warning("%s is unreadable; rebuilding it from git history", history_file)
+
+    committed = _committed_tips(repo_path, tips_rel)
+    need_header = [path for path, info in committed.items() if not info["subject"].startswith(COMMIT_PREFIX)]
+    headlines = _read_headlines(repo_path, need_header)
+
+    by_filename = {tip.get("filename"): tip for tip in history["tips"]}
+    shortnames = {tip.get("shortname") for tip in history["tips"]}
+    added = updated = 0
+    for path, info in sorted(committed.items(), key=lambda item: (item[1]["date"], item[0])):
+        filename = path.rsplit("/", 1)[-1]
+        entry = by_filename.get(filename)
+        if entry is not None:
+            changes = {key: value for key, value in (("commit", info["commit"]), ("path", path))
+                       if entry.get(key) != value}
+            if changes:
+                entry.update(changes)
+                updated += 1
+            continue
+        if tip_shortname(filename) in shortnames:
+            continue  # another copy of a listed tip (e.g. a date-prefixed duplicate)
+        if info["subject"].startswith(COMMIT_PREFIX):
+            headline = info["subject"][len(COMMIT_PREFIX):]
+        else:
+            headline = headlines.get(path) or tip_shortname(filename).replace("_", " ").capitalize()
+        entry = {
+            "headline": headline,
+            "shortname": tip_shortname(filename),
+            "filename": filename,
+            "path": path,
+            "date": info["date"],
+            "commit": info["commit"],
+        }
+        history["tips"].append(entry)
+        by_filename[filename] = entry
+        shortnames.add(entry["shortname"])
+        added += 1
+
+    if not dry_run and (added or updated or corrupt):
+        if corrupt:
+            history_file.replace(history_file.with_name(history_file.name + ".corrupt"))
+        atomic_write_text(history_file, json.dumps(history, indent=2))
+    return {"committed": len(committed), "added": added, "updated": updated}
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    started = time.perf_counter()
+    result = rebuild_history(dry_run="--apply" not in sys.argv)
+    print(f"[OK] {result['committed']} committed tip(s): {result['added']} to add, "
+          f"{result['updated']} to update ({time.perf_counter() - started:.2f}s)")
+    if "--apply" not in sys.argv:
+        print("Dry run; pass --apply to write tip_history.json")
@@ -3,83 +3,176 @@ Main Python Tip Agent
 Orchestrates daily tip generation, email approval, and GitHub push
 """
 
+import logging
 import os
 import sys
+import time
 from pathlib import Path
 from dotenv import load_dotenv
-from tip_generator import TipGenerator
-from email_handler import EmailHandler
-from git_handler import GitHandler
-from approval_server import add_pending_approval
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Heavy dependencies (openai, GitPython, smtplib, Flask) are imported on first
+# use so lightweight commands like `status` and `search` start quickly.
+
 
 class PythonTipAgent:
     """Main agent that orchestrates the daily tip workflow"""
     
     def __init__(self):
-        self.tip_generator = TipGenerator(tips_directory="tips")
-        self.email_handler = EmailHandler()
-        self.git_handler = GitHandler(
-            repo_path=".",
-            remote_url=os.getenv("GITHUB_REPO_URL")
-        )
+        self._tip_generator = None
+        self._email_handler = None
+        self._git_handler = None
+    
+    @property
+    def tip_generator(self):
+        if self._tip_generator is None:
+            from tip_generator import TipGenerator
+            self._tip_generator = TipGenerator(tips_directory="tips")
+        return self._tip_generator
+    
+    @property
+    def email_handler(self):
+        if self._email_handler is None:
+            from email_handler import EmailHandler
+            self._email_handler = EmailHandler()
+        return self._email_handler
     
-    def generate_and_send_daily_tip(self):
+    @property
+    def git_handler(self):
+        if self._git_handler is None:
+            from git_handler import GitHandler
+            self._git_handler = GitHandler(
+                repo_path=".",
+                remote_url=os.getenv("GITHUB_REPO_URL")
+            )
+        return self._git_handler
+    
+    def generate_and_send_daily_tip(self, run_date: str = None, lease=None):
         """
         Main workflow:
         1. Generate a new tip
         2. Save it to file
         3. Create approval token
         4. Send email with approval link
+        
+        Progress is recorded per run date (see run_state.py), so rerunning
+        after a failure resumes at the failed step and reuses the tip and
+        token instead of paying for a new generation.
+        
+        Args:
+            run_date: Run key, defaults to today
+            lease: Optional run lease (see run_lease.py); renewed before the
+                paid API call and the email, raising LeaseLost if another
+                instance has taken over
         """
-        print("\n" + "="*60)
-        print("Python Tip Agent - Daily Run")
-        print("="*60 + "\n")
+        from agent_logging import log_context
+        from run_state import DailyRun
+        run = DailyRun(run_date)
+        # Every record logged during the run carries its run ID, and the
+        # stage and token prefix once they are known
+        with log_context(run_id=run.run_date, stage=None, token=None):
+            return self._daily_run(run, lease)
+    
+    def _daily_run(self, run, lease=None) -> bool:
+        """The four steps of generate_and_send_daily_tip, resuming from run state"""
+        from agent_logging import set_context
         
-        # Step 1: Generate tip
-        print("[1/4] Generating new Python tip...")
-        tip_data = self.tip_generator.generate_tip()
+        logger.info("Python Tip Agent - Daily Run")
         
-        if not tip_data:
-            print("[WARNING] No new tips available (all predefined tips used)")
-            print("[TIP] Consider adding OpenAI API key for unlimited tips")
-            return False
+        if run.done("emailed"):
+            logger.info("Run for %s already completed (email sent %s)", run.run_date, run.get('emailed_at', '')[:19])
+            return True
+        attempt = run.start_attempt()
+        if run.step:
+            logger.info("Resuming run for %s after step '%s' (attempt %d)", run.run_date, run.step, attempt)
         
-        print(f"[OK] Generated: {tip_data['headline']}")
-        print(f"[OK] Filename: {tip_data['filename']}")
+        # Step 1: Generate tip
+        set_context(stage="generate")
+        logger.info("[1/4] Generating new Python tip...")
+        if run.done("generated"):
+            tip_data = run.get("tip_data")
+            logger.info("Reusing generated tip: %s", tip_data['headline'])
+        else:
+            if lease is not None:
+                lease.renew()
+            within_budget, reason = True, ""
+            if self.tip_generator.backend.billable:
+                from usage_ledger import check_budget
+                within_budget, reason = check_budget(self.tip_generator.estimated_call_tokens())
+            if not within_budget:
+                logger.warning("Skipping %s backend: %s", self.tip_generator.backend.name, reason)
+            tip_data = self.tip_generator.generate_tip(use_api=within_budget)
+            
+            if not tip_data:
+                logger.warning("No new tips available (all predefined tips used); "
+                               "consider adding an OpenAI API key for unlimited tips")
+                return False
+            
+            run.complete("generated", tip_data=tip_data)
+            logger.info("Generated: %s", tip_data['headline'])
+        logger.info("Filename: %s", tip_data['filename'])
         
         # Step 2: Save tip to file
-        print("\n[2/4] Saving tip to file...")
-        tip_filepath = self.tip_generator.save_tip(tip_data)
-        print(f"[OK] Saved to: {tip_filepath}")
+        set_context(stage="save")
+        logger.info("[2/4] Saving tip to file...")
+        if run.done("saved") and Path(run.get("tip_path")).exists():
+            tip_filepath = run.get("tip_path")
+            logger.info("Already saved: %s", tip_filepath)
+        elif run.done("saved"):
+            # Run state restored into a checkout that never got the tip committed
+            logger.warning("Saved tip file %s is missing; writing it again", run.get("tip_path"))
+            tip_filepath = str(self.tip_generator.save_tip(tip_data))
+        else:
+            tip_filepath = str(self.tip_generator.save_tip(tip_data))
+            run.complete("saved", tip_path=tip_filepath, tip_data=tip_data)
+            logger.info("Saved to: %s", tip_filepath)
         
         # Step 3: Create pending approval
-        print("\n[3/4] Creating approval token...")
-        approval_token = add_pending_approval(tip_data)
-        print(f"[OK] Token created: {approval_token[:16]}...")
+        set_context(stage="register")
+        logger.info("[3/4] Creating approval token...")
+        approval_token = run.approval_token()
+        set_context(token=approval_token)
+        import pending_store
+        if not run.done("registered"):
+            pending_store.add_pending_approval(tip_data, token=approval_token)
+            run.complete("registered")
+        elif pending_store.lookup_entry(approval_token) is None:
+            # The run state outlived the store (a fresh checkout, a reset
+            # pending file); recreate the entry so the email's links work
+            logger.warning("Approval token missing from the pending store; registering it again")
+            pending_store.add_pending_approval(tip_data, token=approval_token)
+        logger.info("Token created: %s...", approval_token[:16])
         
-        # Step 4: Send email
-        print("\n[4/4] Sending approval email...")
+        # Step 4: Send email (or queue the tip for the next digest)
+        set_context(stage="email")
+        from email_digest import EMAIL_MODE
+        if EMAIL_MODE == "digest":
+            logger.info("[4/4] Queueing tip for the review digest...")
+            from email_digest import queue_tip
+            queue_tip(approval_token)
+            run.complete("emailed", email_mode="digest")
+            logger.info("Queued; it will be sent with the next digest")
+            return True
+        
+        logger.info("[4/4] Sending approval email...")
+        if lease is not None:
+            lease.renew()
         email_sent = self.email_handler.send_approval_email(tip_data, approval_token)
         
         if email_sent:
-            print(f"[OK] Email sent to {self.email_handler.recipient_email}")
-            print("\n" + "="*60)
-            print("SUCCESS: Daily tip workflow completed!")
-            print("ACTION REQUIRED: Check your email to approve or reject the tip")
-            print("="*60 + "\n")
+            run.complete("emailed")
+            logger.info("Email sent to %s", self.email_handler.recipient_email)
+            logger.info("SUCCESS: Daily tip workflow completed! Check your email to approve or reject the tip")
             return True
         else:
-            print("[WARNING] Email not sent (credentials may not be configured)")
-            print("[TIP] The tip is saved and can be manually committed")
-            print("\nManual approval instructions:")
-            print(f"   1. Review the tip at: {tip_filepath}")
-            print(f"   2. To approve, run: python manual_approve.py {approval_token}")
-            print(f"   3. To reject, delete the file")
-            print("="*60 + "\n")
+            logger.warning("Email not sent (credentials may not be configured); the tip is saved "
+                           "and can be approved manually")
+            logger.info("Review the tip at %s, approve with: python manual_approve.py %s, "
+                        "or reject by deleting the file", tip_filepath, approval_token)
             return False
     
     def check_status(self):
@@ -88,14 +181,18 @@ class PythonTipAgent:
         print("Python Tip Agent Status")
         print("="*60 + "\n")
         
-        # Check Git status
+        # Check Git status from refs and a cached tips/ snapshot (no GitPython import needed)
+        from repo_status import format_status, repo_status
         print("Git Repository Status:")
-        print(self.git_handler.get_status())
+        print(format_status(repo_status(".")))
         print()
         
         # Check history
-        history = self.tip_generator.history
+        from tip_generator import load_history
+        history = load_history()
         print(f"Total tips generated: {len(history['tips'])}")
+        from pipeline import print_status
+        print_status()
         
         if history['tips']:
             print("\nRecent tips:")
@@ -105,25 +202,234 @@ class PythonTipAgent:
         print("\n" + "="*60 + "\n")
 
 
+def run_daily(agent: PythonTipAgent = None, slot: str = None) -> bool:
+    """
+    Run today's slot under the run lease
+    
+    The scheduler and the GitHub Action both call this; whichever takes the
+    lease (RUN_LEASE_BACKEND) runs, and the other skips the slot.
+    
+    Returns:
+        True if the run completed
+    """
+    from datetime import datetime
+    from pipeline import PIPELINE_DEPTH, fill, print_status
+    from run_lease import LeaseError, LeaseLost, create_lease_backend
+    
+    agent = agent or PythonTipAgent()
+    slot = slot or datetime.now().strftime("%Y-%m-%d")
+    lease = None
+    backend = create_lease_backend()
+    if backend is not None:
+        try:
+            lease, reason = backend.acquire(slot)
+        except LeaseError as e:
+            logger.error("Could not take the %s run lease for %s: %s", backend.name, slot, e)
+            return False
+        if lease is None:
+            logger.info("Skipping run: %s", reason)
+            return False
+        logger.info("Acquired %s run lease for %s (fencing token %s)", backend.name, slot, lease.token)
+    
+    completed = False
+    try:
+        if PIPELINE_DEPTH > 0:
+            # Pipelined mode: top up the review queue instead of generating one tip
+            prepared = fill(agent, PIPELINE_DEPTH, lease=lease)
+            logger.info("Prepared %d tip(s)", prepared)
+            print_status()
+            completed = True
+        else:
+            completed = agent.generate_and_send_daily_tip(run_date=slot, lease=lease)
+        from email_digest import EMAIL_MODE, send_digest
+        if EMAIL_MODE == "digest":
+            # Everything queued since the last digest, including tips refilled during the day
+            if lease is not None:
+                lease.renew()
+            if send_digest(agent.email_handler) is None:
+                logger.warning("Digest not sent; queued tips will go out with the next one "
+                               "(list their tokens with: python main_agent.py tokens)")
+    except (LeaseLost, LeaseError) as e:
+        logger.error("Stopping run: %s", e)
+        return False
+    finally:
+        if lease is not None:
+            try:
+                lease.release(completed=completed)
+            except LeaseError as e:
+                logger.warning("Could not release the run lease (it goes stale after RUN_LEASE_TTL): %s", e)
+    return completed
+
+
+def cmd_run(args):
+    """Generate a tip and send it for approval"""
+    run_daily()
+
+
+def cmd_status(args):
+    """Show git status and recent tips"""
+    PythonTipAgent().check_status()
+
+
+def cmd_search(args):
+    """Search tip history by keyword"""
+    if not args:
+        print("Usage: python main_agent.py search <keyword> [keyword ...]")
+        return
+    from tip_generator import load_history
+    terms = [term.lower() for term in args]
+    matches = [
+        tip for tip in load_history()['tips']
+        if all(term in f"{tip['headline']} {tip['shortname']}".lower() for term in terms)
+    ]
+    print(f"Found {len(matches)} tip(s) matching: {' '.join(args)}")
+    for tip in matches:
+        print(f"  - {tip['headline']} ({tip['date'][:10]}) -> {tip['filename']}")
+
+
+def cmd_tokens(args):
+    """List pending approval tokens"""
+    from manual_approve import list_pending_tokens
+    list_pending_tokens()
+
+
+def cmd_topics(args):
+    """Show topic coverage, duplicate and parse stats"""
+    from tip_generator import load_history
+    from topic_planner import print_report
+    from generation_stats import print_stats
+    print_report(load_history())
+    print_stats()
+
+
+def cmd_usage(args):
+    """Show OpenAI token usage, cost and budget"""
+    from usage_ledger import print_report
+    print_report()
+
+
+def cmd_archive(args):
+    """Archive processed approvals older than N days"""
+    from pending_store import archive_processed, ARCHIVE_AFTER_DAYS, ARCHIVE_DIR
+    days = float(args[0]) if args else ARCHIVE_AFTER_DAYS
+    archived = archive_processed(days)
+    print(f"[OK] Archived {archived} processed approval(s) older than {days:g} days to {ARCHIVE_DIR}/")
+
+
+def cmd_migrate(args):
+    """Move flat tips into tips/YYYY/MM/ shards (--dry-run to preview)"""
+    from tip_paths import TIPS_DIR, migrate_to_sharded
+    dry_run = "--dry-run" in args
+    moved = migrate_to_sharded(TIPS_DIR, dry_run=dry_run)
+    if dry_run:
+        print(f"[OK] Would move {moved} file(s); run without --dry-run to apply")
+    else:
+        print(f"[OK] Moved {moved} file(s) into {TIPS_DIR}/YYYY/MM/ and updated tip_history.json")
+        if moved:
+            print("[TIP] Commit the moves with: git add -A tips tip_history.json")
+
+
+def cmd_rebuild_history(args):
+    """Merge tips committed in git into tip_history.json (--dry-run to preview)"""
+    from history_rebuild import rebuild_history
+    dry_run = "--dry-run" in args
+    result = rebuild_history(dry_run=dry_run)
+    if dry_run:
+        print(f"[OK] {result['committed']} committed tip(s) found; would add {result['added']} "
+              f"and update {result['updated']} history entries")
+    else:
+        print(f"[OK] {result['committed']} committed tip(s) found; added {result['added']} "
+              f"and updated {result['updated']} history entries")
+
+
+def cmd_normalize(args):
+    """Rewrite tips/ notebooks in canonical nbformat (--dry-run, --minify)"""
+    from notebook_format import normalize_tips
+    from tip_paths import TIPS_DIR
+    dry_run = "--dry-run" in args
+    result = normalize_tips(TIPS_DIR, minify=True if "--minify" in args else None, dry_run=dry_run)
+    action = "Would rewrite" if dry_run else "Rewrote"
+    print(f"[OK] {action} {result['rewritten']} of {result['scanned']} notebook(s): "
+          f"{result['bytes_before']:,} -> {result['bytes_after']:,} bytes; "
+          f"history: {result['added']} new entries, {result['dated']} dated")
+
+
+def cmd_site(args):
+    """Build the static site and RSS/Atom feeds (--full to re-render everything)"""
+    from static_site import SITE_DIR, build_site
+    result = build_site(force="--full" in args)
+    print(f"[OK] {result['tips']} tips: rendered {result['rendered']} page(s), "
+          f"removed {result['removed']} in {result['seconds']}s -> {SITE_DIR}/")
+
+
+def cmd_validate(args):
+    """Check every tip's code with the AST validation gate (--repair, --workers N)"""
+    from code_validator import print_corpus_report, validate_corpus
+    from tip_paths import TIPS_DIR
+    workers = int(args[args.index("--workers") + 1]) if "--workers" in args else 0
+    started = time.perf_counter()
+    results = validate_corpus(TIPS_DIR, workers=workers, repair="--repair" in args)
+    print_corpus_report(results)
+    print(f"({time.perf_counter() - started:.2f}s)")
+    if any(not result["ok"] for result in results):
+        sys.exit(1)
+
+
+def cmd_digest(args):
+    """Email tips queued since the last digest now (--dry-run to print it)"""
+    from email_digest import preview_digest, send_digest
+    if "--dry-run" in args:
+        preview = preview_digest()
+        print("[OK] No tips waiting for a digest" if preview is None else "Subject: {}\n{}".format(*preview))
+        return
+    count = send_digest()
+    if count is None:
+        sys.exit(1)
+    print(f"[OK] Digest with {count} tip(s) sent" if count else "[OK] No tips waiting for a digest")
+
+
+COMMANDS = {
+    "run": cmd_run,
+    "status": cmd_status,
+    "search": cmd_search,
+    "tokens": cmd_tokens,
+    "topics": cmd_topics,
+    "usage": cmd_usage,
+    "archive": cmd_archive,
+    "migrate": cmd_migrate,
+    "rebuild-history": cmd_rebuild_history,
+    "normalize": cmd_normalize,
+    "site": cmd_site,
+    "validate": cmd_validate,
+    "digest": cmd_digest,
+}
+
+
+def print_usage():
+    print("Usage: python main_agent.py <command> [args]\n")
+    print("Commands:")
+    for name, handler in COMMANDS.items():
+        print(f"  {name:<16} {handler.__doc__}")
+
+
 def main():
     """Main entry point"""
-    agent = PythonTipAgent()
-    
+    from agent_logging import setup_logging
+    setup_logging()
     if len(sys.argv) > 1:
         command = sys.argv[1].lower()
         
-        if command == "status":
-            agent.check_status()
-        elif command == "run":
-            agent.generate_and_send_daily_tip()
+        if command in ("-h", "--help", "help"):
+            print_usage()
+        elif command in COMMANDS:
+            COMMANDS[command](sys.argv[2:])
         else:
             print(f"Unknown command: {command}")
-            print("Usage: python main_agent.py [run|status]")
+            print_usage()
     else:
         # Default: run the daily tip generation
-        agent.generate_and_send_daily_tip()
+        cmd_run([])
 
 
 if __name__ == "__main__":
     main()
-
@@ -4,33 +4,46 @@ For approving tips without clicking email link
 """
 
 import sys
-import json
-from pathlib import Path
-from git_handler import GitHandler
+from datetime import datetime
 from dotenv import load_dotenv
 import os
+from pending_store import PENDING_FILE, load_pending, claim_pending, set_status, find_archived
 
 load_dotenv()
 
 
+def _print_pending_tokens(pending: dict):
+    for t, data in pending.items():
+        if data['status'] == 'pending':
+            print(f"  - {t[:16]}... : {data['tip_data']['headline']}")
+
+
+def list_pending_tokens():
+    """Print every token that is still awaiting approval"""
+    pending = load_pending()
+    count = sum(1 for data in pending.values() if data['status'] == 'pending')
+    print(f"{count} pending approval(s)")
+    _print_pending_tokens(pending)
+
+
 def manual_approve(token: str):
     """Manually approve a tip using its token"""
     
-    pending_file = Path("pending_approvals.json")
-    
-    if not pending_file.exists():
+    if not PENDING_FILE.exists():
         print("[ERROR] No pending approvals found")
         return False
     
-    with open(pending_file, 'r') as f:
-        pending = json.load(f)
+    pending = load_pending()
     
     if token not in pending:
+        archived = find_archived(token)
+        if archived is not None:
+            print(f"[WARNING] This tip has already been {archived['status']} (archived)")
+            print(f"  {archived['tip_data']['headline']} ({archived['tip_data']['filename']})")
+            return False
         print(f"[ERROR] Token not found: {token}")
         print("\nAvailable tokens:")
-        for t, data in pending.items():
-            if data['status'] == 'pending':
-                print(f"  - {t[:16]}... : {data['tip_data']['headline']}")
+        _print_pending_tokens(pending)
         return False
     
     approval_data = pending[token]
@@ -40,18 +53,27 @@ def manual_approve(token: str):
         print(f"[WARNING] This tip has already been {approval_data['status']}")
         return False
     
+    if claim_pending(token) is None:
+        print("[WARNING] This tip is being processed by another request")
+        return False
+    
     print(f"\nApproving tip: {tip_data['headline']}")
     print(f"Filename: {tip_data['filename']}")
     
+    success = False
     try:
+        # GitPython is only needed once we know the token is valid
+        from git_handler import GitHandler
+        
         # Initialize Git handler
         git_handler = GitHandler(
             repo_path=".",
             remote_url=os.getenv("GITHUB_REPO_URL", "https://github.com/Sheidashaban/Python_Tips")
         )
         
-        # Get the tip file path
-        tip_filepath = Path("tips") / tip_data['filename']
+        # Get the tip file path (flat or sharded layout)
+        from tip_paths import resolve_tip_path
+        tip_filepath = resolve_tip_path(tip_data)
         
         if not tip_filepath.exists():
             print(f"[ERROR] Tip file not found: {tip_filepath}")
@@ -64,14 +86,7 @@ def manual_approve(token: str):
         
         if success:
             # Update status
-            from datetime import datetime
-            approval_data['status'] = 'approved'
-            approval_data['approved_at'] = datetime.now().isoformat()
-            pending[token] = approval_data
-            
-            with open(pending_file, 'w') as f:
-                json.dump(pending, f, indent=2)
-            
+            set_status(token, 'approved', approved_at=datetime.now().isoformat())
             print("[OK] Tip approved and pushed to GitHub!")
             return True
         else:
@@ -81,13 +96,22 @@ def manual_approve(token: str):
     except Exception as e:
         print(f"[ERROR] Error: {e}")
         return False
+    finally:
+        if not success:
+            # Release the claim so the tip can be approved again
+            set_status(token, 'pending')
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python manual_approve.py <approval_token>")
+        print("       python manual_approve.py --list")
         sys.exit(1)
     
+    if sys.argv[1] == "--list":
+        list_pending_tokens()
+        sys.exit(0)
+    
     token = sys.argv[1]
     success = manual_approve(token)
     sys.exit(0 if success else 1)
@@ -0,0 +1,499 @@
+"""
+Metrics for Python Tip Agent
+Minimal Prometheus-style counters, gauges and histograms
+"""
+
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from file_lock import FileLock, atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+
+# Latency buckets in seconds, tuned for a small Flask app and git pushes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a label set as {a="x",b="y"}"""
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value the way Prometheus expects"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for a named metric with an optional label set"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clone(self) -> "_Metric":
+        """Empty metric with the same name, labels and type"""
+        return type(self)(self.name, self.documentation, self.labelnames)
+
+    def dump(self) -> list:
+        """Raw values as JSON-friendly [labels, value] pairs"""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, items: list):
+        """Fold in values dumped by another process"""
+        raise NotImplementedError
+
+    def samples(self):
+        """Yield (suffix, label string, value) tuples"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def merge(self, items: list):
+        # Counts from every worker add up
+        with self._lock:
+            for key, value in items:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0.0) + value
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield "_total", _format_labels(self.labelnames, key), value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def merge(self, items: list):
+        # A gauge is a reading, not a count: the snapshot merged last wins
+        with self._lock:
+            for key, value in items:
+                self._values[tuple(key)] = value
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (non-cumulative) + overflow, sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = [[0] * (len(self.buckets) + 1), 0.0]
+                self._values[key] = entry
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def clone(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, self.labelnames, self.buckets)
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), [list(entry[0]), entry[1]]] for key, entry in self._values.items()]
+
+    def merge(self, items: list):
+        with self._lock:
+            for key, (counts, total) in items:
+                if len(counts) != len(self.buckets) + 1:
+                    continue  # written by a worker running different buckets
+                entry = self._values.setdefault(tuple(key), [[0] * (len(self.buckets) + 1), 0.0])
+                entry[0] = [mine + theirs for mine, theirs in zip(entry[0], counts)]
+                entry[1] += total
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(entry[0]), entry[1])) for key, entry in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield "_bucket", _format_labels(self.labelnames, key, le), cumulative
+            yield "_sum", _format_labels(self.labelnames, key), total
+            yield "_count", _format_labels(self.labelnames, key), cumulative
+
+
+class Registry:
+    """Collection of metrics rendered together for a scrape"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def dump(self) -> Dict[str, list]:
+        """Raw values of every metric, keyed by name"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.dump() for metric in metrics}
+
+    def merged(self, snapshots: Iterable[Dict[str, list]]) -> "Registry":
+        """New registry holding these snapshots folded together, in order"""
+        combined = Registry()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            combined.register(metric.clone())
+        for snapshot in snapshots:
+            for name, items in snapshot.items():
+                metric = combined.get(name)
+                if metric is not None:
+                    metric.merge(items)
+        return combined
+
+    def render(self) -> str:
+        """Render every metric in the text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+# Directory where each gunicorn worker leaves a snapshot of its metrics so a
+# scrape can add them up (gunicorn.conf.py sets it; empty = single process)
+MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+# Seconds between a worker's snapshot writes
+FLUSH_INTERVAL_SECONDS = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+
+# Counters and histograms of workers that have exited, so totals don't drop
+_ARCHIVE_NAME = "exited.json"
+
+_flusher_thread: Optional[threading.Thread] = None
+_flusher_stop = threading.Event()
+_flush_lock = threading.Lock()
+_last_flushed: Optional[str] = None
+
+
+def _snapshot_path(pid: int) -> Path:
+    return Path(MULTIPROC_DIR) / f"worker-{pid}.json"
+
+
+def _read_snapshot(path: Path) -> Dict[str, list]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("Skipping unreadable metrics snapshot %s: %s", path, e)
+        return {}
+
+
+def flush_snapshot():
+    """Write this process's metrics to the shared directory if they changed"""
+    global _last_flushed
+    if not MULTIPROC_DIR:
+        return
+    with _flush_lock:
+        text = json.dumps(REGISTRY.dump(), sort_keys=True)
+        if text == _last_flushed:
+            return
+        Path(MULTIPROC_DIR).mkdir(parents=True, exist_ok=True)
+        atomic_write_text(_snapshot_path(os.getpid()), text)
+        _last_flushed = text
+
+
+def _flush_loop(interval: float):
+    while not _flusher_stop.wait(interval):
+        try:
+            flush_snapshot()
+        except OSError as e:
+            logger.warning("Metrics snapshot failed: %s", e)
+
+
+def start_flusher(interval: float = FLUSH_INTERVAL_SECONDS) -> Optional[threading.Thread]:
+    """Start the background snapshot thread once per worker (no-op without MULTIPROC_DIR)"""
+    global _flusher_thread
+    if not MULTIPROC_DIR or interval <= 0:
+        return None
+    if _flusher_thread is None or not _flusher_thread.is_alive():
+        _flusher_stop.clear()
+        _flusher_thread = threading.Thread(
+            target=_flush_loop, args=(interval,), name="metrics-flusher", daemon=True
+        )
+        _flusher_thread.start()
+    return _flusher_thread
+
+
+def render_all() -> str:
+    """
+    Render metrics for a scrape
+
+    With MULTIPROC_DIR set, every worker's latest snapshot is merged:
+    counters and histograms are summed, gauges come from the newest
+    snapshot. Other workers' values can lag by FLUSH_INTERVAL_SECONDS.
+    """
+    if not MULTIPROC_DIR:
+        return REGISTRY.render()
+    flush_snapshot()
+    directory = Path(MULTIPROC_DIR)
+    # Hold the archive lock so an exiting worker is counted exactly once
+    with FileLock(directory / ".archive.lock"):
+        dated = []
+        for path in [directory / _ARCHIVE_NAME] + list(directory.glob("worker-*.json")):
+            if path.exists():
+                dated.append((path.stat().st_mtime, str(path)))
+        dated.sort()
+        snapshots = [_read_snapshot(Path(path)) for _, path in dated]
+    return REGISTRY.merged(snapshots).render()
+
+
+def archive_worker(pid: int):
+    """
+    Fold an exited worker's counters and histograms into the archive
+
+    Called from gunicorn's child_exit hook in the master. Its gauges are
+    dropped: they described a process that no longer exists.
+    """
+    if not MULTIPROC_DIR:
+        return
+    path = _snapshot_path(pid)
+    if not path.exists():
+        return
+    directory = Path(MULTIPROC_DIR)
+    with FileLock(directory / ".archive.lock"):
+        archive = directory / _ARCHIVE_NAME
+        combined = REGISTRY.merged([_read_snapshot(archive), _read_snapshot(path)])
+        counts = {
+            name: items for name, items in combined.dump().items()
+            if combined.get(name).metric_type != "gauge"
+        }
+        atomic_write_text(archive, json.dumps(counts, sort_keys=True))
+        path.unlink()
+
+
+def reset_multiproc_dir():
+    """Remove snapshots left by a previous server run (gunicorn on_starting hook)"""
+    if not MULTIPROC_DIR:
+        return
+    directory = Path(MULTIPROC_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in [directory / _ARCHIVE_NAME] + list(directory.glob("worker-*.json")):
+        if path.exists():
+            path.unlink()
+
+# Shared metrics used across modules
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "tip_http_request_duration_seconds",
+    "Approval server request latency by route",
+    ("route", "method", "status"),
+))
+TIP_DECISIONS = REGISTRY.register(Counter(
+    "tip_decisions",
+    "Approval decisions taken on pending tips",
+    ("decision",),
+))
+GIT_PUSH_SECONDS = REGISTRY.register(Histogram(
+    "tip_git_push_duration_seconds",
+    "Duration of git push operations",
+))
+GIT_PUSH_FAILURES = REGISTRY.register(Counter(
+    "tip_git_push_failures",
+    "Git push operations that failed",
+))
+GIT_COMMITS = REGISTRY.register(Counter(
+    "tip_git_commits",
+    "Tip commits by how they were written (objects = object database fast path, index = git add + commit)",
+    ("path",),
+))
+PENDING_STORE_BYTES = REGISTRY.register(Gauge(
+    "tip_pending_store_bytes",
+    "Size of the pending approvals file on disk",
+))
+PENDING_STORE_ENTRIES = REGISTRY.register(Gauge(
+    "tip_pending_store_entries",
+    "Entries in the pending approvals store by status",
+    ("status",),
+))
+PENDING_STORE_LOAD_SECONDS = REGISTRY.register(Histogram(
+    "tip_pending_store_load_duration_seconds",
+    "Time spent loading the pending approvals file",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+))
+PREVIEW_CACHE = REGISTRY.register(Counter(
+    "tip_preview_cache",
+    "Tip preview lookups by where the page came from (memory, disk or a fresh render)",
+    ("result",),
+))
+
+
+def parse_exposition(text: str) -> Dict[str, float]:
+    """
+    Parse text exposition output back into {sample: value}
+
+    Used by the scrape self-check; raises ValueError on malformed lines.
+    """
+    samples = {}
+    declared = set()
+    for line in text.splitlines():
+        if not line:
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, metric_type = line.split(" ", 3)
+            if metric_type not in ("counter", "gauge", "histogram", "untyped"):
+                raise ValueError(f"Unknown metric type: {line}")
+            declared.add(name)
+            continue
+        if line.startswith("#"):
+            continue
+        sample, _, value = line.rpartition(" ")
+        if not sample:
+            raise ValueError(f"Malformed sample line: {line}")
+        name = sample.split("{", 1)[0]
+        base = name
+        for suffix in ("_bucket", "_sum", "_count", "_total"):
+            if name.endswith(suffix) and name[:-len(suffix)] in declared:
+                base = name[:-len(suffix)]
+                break
+        if base not in declared:
+            raise ValueError(f"Sample without TYPE declaration: {line}")
+        samples[sample] = float(value)
+    return samples
+
+
+if __name__ == "__main__":
+    # Scrape self-check against a throwaway registry
+    registry = Registry()
+    requests = registry.register(Histogram("demo_seconds", "Demo latency", ("route",), buckets=(0.1, 1.0)))
+    decisions = registry.register(Counter("demo_decisions", "Demo decisions", ("decision",)))
+    size = registry.register(Gauge("demo_bytes", "Demo size"))
+
+    requests.observe(0.05, route="/approve/<token>")
+    requests.observe(0.5, route="/approve/<token>")
+    requests.observe(3.0, route="/approve/<token>")
+    decisions.inc(decision="approved")
+    decisions.inc(2, decision="rejected")
+    size.set(1234)
+
+    output = registry.render()
+    print(output)
+    parsed = parse_exposition(output)
+    assert parsed['demo_seconds_bucket{route="/approve/<token>",le="0.1"}'] == 1
+    assert parsed['demo_seconds_bucket{route="/approve/<token>",le="1"}'] == 2
+    assert parsed['demo_seconds_bucket{route="/approve/<token>",le="+Inf"}'] == 3
+    assert parsed['demo_seconds_count{route="/approve/<token>"}'] == 3
+    assert parsed['demo_decisions_total{decision="rejected"}'] == 2
+    assert parsed['demo_bytes'] == 1234
+    print("[OK] Exposition output parsed cleanly")
+
+    # Scrape the real approval server through Flask's test client
+    from approval_server import app
+
+    client = app.test_client()
+    client.get('/health')
+    client.get('/reject/not-a-real-token')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == CONTENT_TYPE
+    scraped = parse_exposition(response.get_data(as_text=True))
+    assert scraped['tip_http_request_duration_seconds_count{route="/health",method="GET",status="200"}'] == 1
+    assert scraped['tip_http_request_duration_seconds_count{route="/reject/<token>",method="GET",status="404"}'] == 1
+    print(f"[OK] Scraped {len(scraped)} samples from /metrics")
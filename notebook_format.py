@@ -0,0 +1,214 @@
+"""
+Notebook Format for Python Tip Agent
+Canonical nbformat serialization for tips: stable key order, standard line splitting, no volatile fields
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+# Write tips as single-line JSON instead of nbformat's indent=1 layout
+NOTEBOOK_MINIFY = os.getenv("NOTEBOOK_MINIFY", "False").lower() == "true"
+
+# Only stable metadata is kept; the generation date lives in tip_history.json
+NOTEBOOK_METADATA = {
+    "kernelspec": {"display_name": "Python 3", "language": "python", "name": "python3"},
+    "language_info": {"name": "python"},
+}
+
+_GENERATED = re.compile(r"^\s*\*\*Generated on:\*\*\s*(\S+)\s*$")
+_HEADER = re.compile(r"#\s*Python Tip:\s*(.+)")
+
+
+def split_lines(text: str) -> list:
+    """nbformat multiline string: every line but the last keeps its newline"""
+    return text.splitlines(keepends=True)
+
+
+def source_text(source) -> str:
+    """
+    A cell's source as one string
+
+    Older tips stored code cells as lines without newlines, which
+    "".join would run together, so those lists are joined with newlines.
+    """
+    if isinstance(source, str):
+        return source
+    if len(source) > 1 and not any(line.endswith("\n") for line in source[:-1]):
+        return "\n".join(source)
+    return "".join(source)
+
+
+def tip_headline(path: str, content: str) -> Optional[str]:
+    """The "# Python Tip: ..." header of a notebook's first cell or a script"""
+    if path.endswith(".ipynb"):
+        try:
+            cells = json.loads(content).get("cells") or [{}]
+            content = source_text(cells[0].get("source", ""))
+        except (ValueError, AttributeError):
+            return None
+    match = _HEADER.search(content)
+    return match.group(1).strip() if match else None
+
+
+def build_notebook(headline: str, explanation: str, code: str) -> Dict:
+    """The canonical notebook for a tip: a header/explanation cell and a code cell"""
+    return {
+        "cells": [
+            {"cell_type": "markdown", "metadata": {}, "source": split_lines(f"# Python Tip: {headline}\n\n{explanation}")},
+            {"cell_type": "code", "execution_count": None, "metadata": {}, "outputs": [], "source": split_lines(code)},
+        ],
+        "metadata": NOTEBOOK_METADATA,
+        "nbformat": 4,
+        "nbformat_minor": 4,
+    }
+
+
+def serialize_notebook(notebook: Dict, minify: Optional[bool] = None) -> str:
+    """
+    Canonical JSON text for a notebook
+
+    Matches what nbformat itself writes (sorted keys, indent=1, UTF-8 kept
+    as-is, trailing newline), so Jupyter saving the file is a no-op and
+    identical tips produce identical bytes. minify drops the indentation.
+    """
+    minify = NOTEBOOK_MINIFY if minify is None else minify
+    if minify:
+        return json.dumps(notebook, sort_keys=True, ensure_ascii=False, separators=(",", ":")) + "\n"
+    return json.dumps(notebook, sort_keys=True, ensure_ascii=False, indent=1) + "\n"
+
+
+def normalize_notebook(notebook: Dict) -> Tuple[Dict, Dict[str, str]]:
+    """
+    Canonical form of an existing tip notebook
+
+    Re-splits sources the nbformat way, reduces notebook metadata to
+    NOTEBOOK_METADATA and strips the "Generated on" line from markdown
+    cells. Outputs, execution counts, cell ids and cell metadata are content
+    (a hand-written tip may have been run) and are kept as they are.
+
+    Returns:
+        (notebook, volatile) where volatile holds what was stripped, e.g.
+        {"generated": "2025-11-02"}
+    """
+    volatile = {}
+    cells = []
+    for cell in notebook.get("cells", []):
+        text = source_text(cell.get("source", ""))
+        kept_cell = {"cell_type": cell.get("cell_type", "markdown"), "metadata": cell.get("metadata") or {}}
+        if "id" in cell:
+            kept_cell["id"] = cell["id"]
+        if kept_cell["cell_type"] == "code":
+            kept_cell.update(execution_count=cell.get("execution_count"), outputs=cell.get("outputs") or [],
+                             source=split_lines(text))
+            cells.append(kept_cell)
+            continue
+        kept = []
+        for line in text.splitlines():
+            match = _GENERATED.match(line)
+            if match:
+                volatile["generated"] = match.group(1)
+            else:
+                kept.append(line)
+        kept_cell["source"] = split_lines("\n".join(kept).rstrip("\n"))
+        cells.append(kept_cell)
+    return {
+        "cells": cells,
+        "metadata": NOTEBOOK_METADATA,
+        "nbformat": 4,
+        # 4.5 added cell ids; keep a newer minor version so they stay valid
+        "nbformat_minor": max(4, notebook.get("nbformat_minor", 4)),
+    }, volatile
+
+
+def _insert_by_date(tips: list, entry: Dict):
+    """Insert before the first entry dated later, so a backfilled tip lands where it was generated"""
+    for index, tip in enumerate(tips):
+        if tip.get("date", "") > entry["date"]:
+            tips.insert(index, entry)
+            return
+    tips.append(entry)
+
+
+def normalize_tips(tips_dir: Path, history_file: Path = Path("tip_history.json"),
+                   minify: Optional[bool] = None, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Rewrite every notebook under tips/ in canonical form
+
+    A stripped generation date is recorded as the history entry's "date"
+    when the entry has none; a tip with no history entry gets a new one
+    (headline, shortname, filename, path, date), so no date is lost. New
+    entries are inserted in date order, and copies of a tip (same
+    shortname, e.g. a date-prefixed duplicate file) get a single entry,
+    dated by the earliest copy. Files already canonical are not touched.
+
+    Returns:
+        Counts of notebooks scanned and rewritten, total bytes before/after,
+        and history entries dated and added
+    """
+    from file_lock import atomic_write_text
+    from tip_paths import iter_tip_files, tip_shortname
+
+    history_file = Path(history_file)
+    history = {"tips": []}
+    if history_file.exists():
+        with open(history_file, 'r') as f:
+            history = json.load(f)
+    by_filename = {tip.get("filename"): tip for tip in history["tips"]}
+    by_path = {tip.get("path") for tip in history["tips"] if tip.get("path")}
+    shortnames = {tip.get("shortname") for tip in history["tips"]}
+    # shortname -> entry for tips with no history entry, earliest copy wins
+    backfill = {}
+
+    stats = {"scanned": 0, "rewritten": 0, "bytes_before": 0, "bytes_after": 0, "dated": 0, "added": 0}
+    for path in sorted(iter_tip_files(tips_dir)):
+        if path.suffix != ".ipynb":
+            continue
+        original = path.read_text(encoding="utf-8")
+        notebook, volatile = normalize_notebook(json.loads(original))
+        canonical = serialize_notebook(notebook, minify)
+        stats["scanned"] += 1
+        stats["bytes_before"] += len(original.encode("utf-8"))
+        stats["bytes_after"] += len(canonical.encode("utf-8"))
+
+        date = volatile.get("generated")
+        entry = by_filename.get(path.name)
+        shortname = tip_shortname(path.name)
+        if date and entry is None:
+            known = path.as_posix() in by_path or shortname in shortnames
+            if not known and (shortname not in backfill or date < backfill[shortname]["date"]):
+                backfill[shortname] = {
+                    "headline": tip_headline(path.name, canonical) or shortname.replace("_", " ").capitalize(),
+                    "shortname": shortname,
+                    "filename": path.name,
+                    "path": path.as_posix(),
+                    "date": date,
+                }
+        elif date and not entry.get("date"):
+            entry["date"] = date
+            stats["dated"] += 1
+        if canonical != original:
+            stats["rewritten"] += 1
+            if not dry_run:
+                atomic_write_text(path, canonical)
+
+    for entry in sorted(backfill.values(), key=lambda entry: entry["date"]):
+        _insert_by_date(history["tips"], entry)
+    stats["added"] = len(backfill)
+    if (stats["dated"] or stats["added"]) and not dry_run:
+        atomic_write_text(history_file, json.dumps(history, indent=2))
+    return stats
+
+
+if __name__ == "__main__":
+    import sys
+    from tip_paths import TIPS_DIR
+    result = normalize_tips(TIPS_DIR, dry_run="--apply" not in sys.argv, minify="--minify" in sys.argv or None)
+    print(f"[OK] {result['rewritten']}/{result['scanned']} notebook(s) not canonical; "
+          f"{result['bytes_before']:,} -> {result['bytes_after']:,} bytes; "
+          f"history: {result['added']} new entries, {result['dated']} dated")
+    if "--apply" not in sys.argv:
+        print("Dry run; pass --apply to rewrite them")
@@ -0,0 +1,417 @@
+"""
+Pending Approval Store for Python Tip Agent
+File-backed token store shared by the approval server workers and CLI tools
+"""
+
+import gzip
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+import metrics
+from file_lock import FileLock, atomic_write_text
+
+# Paths below come from the environment, so .env must be loaded first
+load_dotenv()
+
+# Storage for pending approvals
+PENDING_FILE = Path(os.getenv("PENDING_FILE", "pending_approvals.json"))
+PENDING_LOCK_FILE = PENDING_FILE.with_name(PENDING_FILE.name + ".lock")
+
+# Pending tokens older than this are expired by the background pruner (0 disables)
+TOKEN_TTL_DAYS = float(os.getenv("PENDING_TOKEN_TTL_DAYS", "14"))
+PRUNE_INTERVAL_SECONDS = float(os.getenv("PENDING_PRUNE_INTERVAL", "3600"))
+# A 'processing' claim older than this was abandoned (its worker died mid-push)
+# and goes back to 'pending'; keep it above the worker timeout plus the push lock wait
+CLAIM_TTL_SECONDS = float(os.getenv("PENDING_CLAIM_TTL", "600"))
+
+# In-memory token index: token -> (status, created_at), keyed by the file's stat
+# signature so membership tests cost one stat() instead of a full JSON parse
+_index_lock = threading.Lock()
+_index_key: Optional[Tuple[int, int, int]] = None
+_index_tokens: Dict[str, Tuple[str, Optional[str]]] = {}
+
+# Processed (approved/rejected/expired) entries older than this move to the archive
+ARCHIVE_DIR = Path(os.getenv("APPROVAL_ARCHIVE_DIR", "approval_archive"))
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_INDEX_FILE = ARCHIVE_DIR / "tokens.idx"
+PROCESSED_STATUSES = ("approved", "rejected", "expired")
+# Every status an entry can have; each gets a gauge sample, zero when unused
+STATUSES = ("pending", "processing") + PROCESSED_STATUSES
+
+# Archived token index: token -> partition filename, keyed like the hot index
+_archive_key: Optional[Tuple[int, int, int]] = None
+_archive_tokens: Dict[str, str] = {}
+
+_pruner_thread: Optional[threading.Thread] = None
+_pruner_stop = threading.Event()
+
+logger = logging.getLogger(__name__)
+
+
+def _store_lock() -> FileLock:
+    return FileLock(PENDING_LOCK_FILE)
+
+
+def _record_store_entries(data: Dict):
+    """Update the per-status entry gauges from a loaded store"""
+    # Start every status at zero so a gauge drops back once its last entry leaves
+    counts = dict.fromkeys(STATUSES, 0)
+    for entry in data.values():
+        status = entry.get('status', 'pending')
+        counts[status] = counts.get(status, 0) + 1
+    for status, count in counts.items():
+        metrics.PENDING_STORE_ENTRIES.set(count, status=status)
+
+
+def _stat_key(path: Path = PENDING_FILE) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    # Atomic replaces change the inode, so this catches writes from any process
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _rebuild_index(data: Dict, key: Optional[Tuple[int, int, int]]):
+    global _index_key, _index_tokens
+    _index_tokens = {
+        token: (entry.get('status', 'pending'), entry.get('created_at'))
+        for token, entry in data.items()
+    }
+    _index_key = key
+
+
+def load_pending() -> Dict:
+    """Load pending approvals from file"""
+    if PENDING_FILE.exists():
+        started = time.perf_counter()
+        with open(PENDING_FILE, 'r') as f:
+            data = json.load(f)
+        metrics.PENDING_STORE_LOAD_SECONDS.observe(time.perf_counter() - started)
+        metrics.PENDING_STORE_BYTES.set(PENDING_FILE.stat().st_size)
+        _record_store_entries(data)
+        return data
+    return {}
+
+
+def save_pending(data: Dict):
+    """Save pending approvals to file"""
+    atomic_write_text(PENDING_FILE, json.dumps(data, indent=2))
+    with _index_lock:
+        _rebuild_index(data, _stat_key())
+
+
+def lookup_token(token: str) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Look up a token in the in-memory index
+
+    The index is only rebuilt when the store file changes on disk, so a
+    flood of unknown tokens costs a stat() and a dict lookup each.
+
+    Returns:
+        (status, created_at) or None if the token is unknown
+    """
+    key = _stat_key()
+    if key != _index_key:
+        with _index_lock:
+            if key != _index_key:
+                _rebuild_index(load_pending() if key else {}, key)
+    return _index_tokens.get(token)
+
+
+def is_expired(created_at: Optional[str], now: Optional[datetime] = None) -> bool:
+    """Check whether a pending token has outlived TOKEN_TTL_DAYS"""
+    if not TOKEN_TTL_DAYS or not created_at:
+        return False
+    now = now or datetime.now()
+    return datetime.fromisoformat(created_at) < now - timedelta(days=TOKEN_TTL_DAYS)
+
+
+def is_stale_claim(entry: Dict, now: Optional[datetime] = None) -> bool:
+    """True for a 'processing' entry whose claim is older than CLAIM_TTL_SECONDS"""
+    if entry.get('status') != 'processing' or not entry.get('claimed_at'):
+        return False
+    now = now or datetime.now()
+    return datetime.fromisoformat(entry['claimed_at']) < now - timedelta(seconds=CLAIM_TTL_SECONDS)
+
+
+def is_actionable(token: str) -> bool:
+    """True if the token exists, is pending and has not expired"""
+    entry = lookup_token(token)
+    return entry is not None and entry[0] == 'pending' and not is_expired(entry[1])
+
+
+def update_pending(mutate: Callable[[Dict], object]):
+    """
+    Read-modify-write the store under the inter-process lock
+
+    Args:
+        mutate: Called with the loaded store; may modify it in place.
+            Returning None signals that nothing changed and skips the write.
+
+    Returns:
+        Whatever mutate returns
+    """
+    with _store_lock():
+        pending = load_pending()
+        result = mutate(pending)
+        if result is not None:
+            save_pending(pending)
+        return result
+
+
+def add_pending_approval(tip_data: dict, token: Optional[str] = None) -> str:
+    """
+    Add a tip to pending approvals
+
+    Passing a previously issued token makes this idempotent: if the token is
+    already in the store (e.g. a resumed daily run), nothing is written.
+
+    Returns: approval token
+    """
+    token = token or secrets.token_urlsafe(32)
+
+    def _add(pending):
+        if token in pending:
+            return None
+        pending[token] = {
+            "tip_data": tip_data,
+            "created_at": datetime.now().isoformat(),
+            "status": "pending"
+        }
+        return token
+
+    update_pending(_add)
+    return token
+
+
+def claim_pending(token: str, status: str = 'processing', **fields) -> Optional[Dict]:
+    """
+    Atomically move a pending, unexpired entry to `status`
+
+    Only one worker can win the claim, so concurrent clicks on the same
+    approval link never push the same tip twice, and a tip that another
+    worker is pushing (or has approved) can't be rejected. An abandoned
+    'processing' claim (see is_stale_claim) can be claimed again.
+
+    Args:
+        status: 'processing' before a push, or a final status such as
+            'rejected' (with its timestamp in fields)
+
+    Returns:
+        The claimed entry, or None if the token is missing, expired or
+        not pending
+    """
+    def _claim(pending):
+        entry = pending.get(token)
+        if entry is None or is_expired(entry.get('created_at')):
+            return None
+        if entry['status'] != 'pending' and not is_stale_claim(entry):
+            return None
+        entry['status'] = status
+        entry.pop('claimed_at', None)
+        if status == 'processing':
+            entry['claimed_at'] = datetime.now().isoformat()
+        entry.update(fields)
+        return entry
+
+    return update_pending(_claim)
+
+
+def set_status(token: str, status: str, **fields) -> Optional[Dict]:
+    """Set the status (and any extra timestamp fields) of an entry"""
+    def _set(pending):
+        entry = pending.get(token)
+        if entry is None:
+            return None
+        entry['status'] = status
+        entry.pop('claimed_at', None)
+        entry.update(fields)
+        return entry
+
+    return update_pending(_set)
+
+
+def prune_expired(now: Optional[datetime] = None) -> int:
+    """
+    Mark pending tokens older than TOKEN_TTL_DAYS as 'expired'
+
+    Abandoned 'processing' claims (see is_stale_claim) go back to
+    'pending' first, so their links work again or expire normally.
+
+    Returns:
+        Number of entries expired
+    """
+    now = now or datetime.now()
+
+    def _prune(pending):
+        counts = {"expired": 0, "released": 0}
+        for entry in pending.values():
+            if is_stale_claim(entry, now):
+                entry['status'] = 'pending'
+                entry.pop('claimed_at', None)
+                counts["released"] += 1
+            if entry['status'] == 'pending' and is_expired(entry.get('created_at'), now):
+                entry['status'] = 'expired'
+                entry['expired_at'] = now.isoformat()
+                counts["expired"] += 1
+        return counts if any(counts.values()) else None
+
+    counts = update_pending(_prune) or {}
+    if counts.get("released"):
+        logger.warning("Released %d abandoned approval claim(s) back to pending", counts["released"])
+    return counts.get("expired", 0)
+
+
+def _decided_at(entry: Dict) -> datetime:
+    """When an entry reached its final status"""
+    stamp = (entry.get('approved_at') or entry.get('rejected_at')
+             or entry.get('expired_at') or entry.get('created_at'))
+    return datetime.fromisoformat(stamp)
+
+
+def _load_archive_index():
+    global _archive_key, _archive_tokens
+    key = _stat_key(ARCHIVE_INDEX_FILE)
+    if key == _archive_key:
+        return
+    with _index_lock:
+        if key == _archive_key:
+            return
+        tokens = {}
+        if key is not None:
+            with open(ARCHIVE_INDEX_FILE, 'r') as f:
+                for line in f:
+                    token, _, partition = line.rstrip("\n").partition(" ")
+                    if partition:
+                        tokens[token] = partition
+        _archive_tokens = tokens
+        _archive_key = key
+
+
+def archive_processed(days: float = ARCHIVE_AFTER_DAYS, now: Optional[datetime] = None) -> int:
+    """
+    Move processed entries older than `days` into the compressed archive
+
+    Entries are appended as JSON lines to approval_archive/approvals-YYYY-MM.jsonl.gz
+    (partitioned by decision month) and recorded in tokens.idx. The archive is
+    written before the hot store is rewritten, so a crash can only duplicate
+    an entry, never lose one.
+
+    Returns:
+        Number of entries archived
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=days)
+
+    def _archive(pending):
+        partitions: Dict[str, list] = {}
+        for token, entry in pending.items():
+            if entry.get('status') in PROCESSED_STATUSES and _decided_at(entry) < cutoff:
+                month = _decided_at(entry).strftime('%Y-%m')
+                partitions.setdefault(f"approvals-{month}.jsonl.gz", []).append(token)
+        if not partitions:
+            return None
+
+        ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        index_lines = []
+        for partition, tokens in sorted(partitions.items()):
+            # gzip members can be concatenated, so appending keeps the file valid
+            with gzip.open(ARCHIVE_DIR / partition, 'at', encoding='utf-8') as f:
+                for token in tokens:
+                    f.write(json.dumps({"token": token, **pending[token]}) + "\n")
+            index_lines.extend(f"{token} {partition}\n" for token in tokens)
+        with open(ARCHIVE_INDEX_FILE, 'a') as f:
+            f.writelines(index_lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+        for tokens in partitions.values():
+            for token in tokens:
+                del pending[token]
+        return len(index_lines)
+
+    return update_pending(_archive) or 0
+
+
+def find_archived(token: str) -> Optional[Dict]:
+    """
+    Look up an archived entry on demand
+
+    Unknown tokens are rejected from the in-memory archive index; known
+    ones only decompress their own monthly partition.
+    """
+    _load_archive_index()
+    partition = _archive_tokens.get(token)
+    if partition is None:
+        return None
+    needle = json.dumps(token)
+    with gzip.open(ARCHIVE_DIR / partition, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if needle in line:
+                record = json.loads(line)
+                if record.get('token') == token:
+                    record.pop('token')
+                    return record
+    return None
+
+
+def archived_count() -> int:
+    """Number of archived tokens"""
+    _load_archive_index()
+    return len(_archive_tokens)
+
+
+def lookup_entry(token: str) -> Optional[Dict]:
+    """Fetch an entry from the hot store, falling back to the archive"""
+    if lookup_token(token) is not None:
+        entry = load_pending().get(token)
+        if entry is not None:
+            return entry
+    return find_archived(token)
+
+
+def _prune_loop(interval: float):
+    while not _pruner_stop.wait(interval):
+        try:
+            expired = prune_expired()
+            if expired:
+                logger.info("Expired %d stale approval token(s)", expired)
+            archived = archive_processed() if ARCHIVE_AFTER_DAYS else 0
+            if archived:
+                logger.info("Archived %d processed approval(s)", archived)
+        except Exception as e:
+            logger.warning("Token pruning failed: %s", e)
+
+
+def start_pruner(interval: float = PRUNE_INTERVAL_SECONDS) -> Optional[threading.Thread]:
+    """
+    Start the background expiry and archiving thread once per process
+
+    Runs when either token expiry or archiving is enabled; each is
+    switched off on its own (PENDING_TOKEN_TTL_DAYS=0, ARCHIVE_AFTER_DAYS=0).
+    """
+    global _pruner_thread
+    if not (TOKEN_TTL_DAYS or ARCHIVE_AFTER_DAYS) or interval <= 0:
+        return None
+    if _pruner_thread is None or not _pruner_thread.is_alive():
+        _pruner_stop.clear()
+        _pruner_thread = threading.Thread(
+            target=_prune_loop, args=(interval,), name="pending-pruner", daemon=True
+        )
+        _pruner_thread.start()
+    return _pruner_thread
+
+
+def stop_pruner():
+    """Stop the background expiry thread"""
+    _pruner_stop.set()
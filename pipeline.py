@@ -0,0 +1,132 @@
+"""
+Pipelined Generation for Python Tip Agent
+Keeps PIPELINE_DEPTH tips generated and awaiting review, refilling in the background after each decision
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from file_lock import FileLock
+from run_state import RUN_STATE_DIR, DailyRun
+
+
+# Tips to keep awaiting review (0 = serial mode: one tip per daily run)
+PIPELINE_DEPTH = int(os.getenv("PIPELINE_DEPTH", "0"))
+
+PIPELINE_RUN_PREFIX = "pipeline-"
+
+# Attempts at one slot before it is set aside, so a tip whose email keeps
+# failing can't block every later slot
+PIPELINE_MAX_ATTEMPTS = int(os.getenv("PIPELINE_MAX_ATTEMPTS", "3"))
+# Set-aside slots; their tips stay registered and can be approved manually
+PIPELINE_FAILED_DIR = RUN_STATE_DIR / "failed"
+
+logger = logging.getLogger(__name__)
+
+
+def outstanding() -> int:
+    """Number of tips currently awaiting review (pending and not expired)"""
+    from pending_store import load_pending, is_expired
+    return sum(
+        1 for entry in load_pending().values()
+        if entry.get("status", "pending") == "pending" and not is_expired(entry.get("created_at"))
+    )
+
+
+def _next_run_key() -> str:
+    """
+    Run key for the next pipeline slot
+
+    An unfinished pipeline run (e.g. interrupted before its email) is
+    resumed before a new slot is started, so no generated tip is wasted.
+    Finished runs are deleted by fill(), so only unfinished ones are read
+    here; one that has used up PIPELINE_MAX_ATTEMPTS is moved to
+    PIPELINE_FAILED_DIR and skipped.
+    """
+    for path in sorted(RUN_STATE_DIR.glob(f"{PIPELINE_RUN_PREFIX}*.json")):
+        run = DailyRun(path.stem)
+        if run.done("emailed"):
+            # Left behind by an older version, or a crash before fill() cleaned up
+            path.unlink()
+            continue
+        if run.get("attempts", 0) >= PIPELINE_MAX_ATTEMPTS:
+            logger.warning("Setting aside pipeline slot %s after %d attempts (stopped after step '%s')",
+                           run.run_date, run.get("attempts"), run.step)
+            PIPELINE_FAILED_DIR.mkdir(parents=True, exist_ok=True)
+            os.replace(path, PIPELINE_FAILED_DIR / path.name)
+            continue
+        return run.run_date
+    return f"{PIPELINE_RUN_PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+
+
+def fill(agent=None, depth: int = PIPELINE_DEPTH, lease=None) -> int:
+    """
+    Prepare tips until `depth` are awaiting review
+
+    Only one process fills at a time; a caller that finds the lock held
+    returns immediately, since the holder re-checks the count before it
+    stops. A run lease, if given, is passed on to each run for fencing.
+
+    Returns:
+        Number of tips prepared by this call
+    """
+    if depth <= 0:
+        return 0
+    if agent is None:
+        from main_agent import PythonTipAgent
+        agent = PythonTipAgent()
+
+    RUN_STATE_DIR.mkdir(parents=True, exist_ok=True)
+    lock = FileLock(RUN_STATE_DIR / "pipeline.lock")
+    prepared = 0
+    while outstanding() < depth:
+        if not lock.acquire(blocking=False):
+            break
+        try:
+            while outstanding() < depth:
+                run_key = _next_run_key()
+                if not agent.generate_and_send_daily_tip(run_date=run_key, lease=lease):
+                    logger.warning("Pipeline refill stopped: tip could not be prepared")
+                    return prepared
+                # The tip is registered and emailed; its run state (a full
+                # notebook) is no longer needed
+                (RUN_STATE_DIR / f"{run_key}.json").unlink()
+                prepared += 1
+        finally:
+            lock.release()
+        # A decision made while we held the lock would have skipped its own
+        # refill, so loop around and check the count again
+    return prepared
+
+
+def refill_in_background(depth: int = PIPELINE_DEPTH) -> Optional[threading.Thread]:
+    """Start a daemon thread that tops the pipeline back up (no-op in serial mode)"""
+    if depth <= 0:
+        return None
+
+    def _refill():
+        try:
+            prepared = fill(depth=depth)
+            if prepared:
+                logger.info("Pipeline refilled with %d tip(s)", prepared)
+        except Exception as e:
+            logger.error("Pipeline refill failed: %s", e)
+
+    thread = threading.Thread(target=_refill, name="pipeline-refill", daemon=True)
+    thread.start()
+    return thread
+
+
+def print_status(depth: int = PIPELINE_DEPTH):
+    """Print how full the pipeline is"""
+    if depth <= 0:
+        print("Pipeline: off (set PIPELINE_DEPTH to keep tips ready for review)")
+    else:
+        print(f"Pipeline: {outstanding()}/{depth} tips awaiting review")
+
+
+if __name__ == "__main__":
+    print_status()
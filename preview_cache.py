@@ -0,0 +1,252 @@
+"""
+Preview Cache for Python Tip Agent
+Renders tip files to HTML for the approval server, cached by content hash in memory (LRU) and on disk, precompressed
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+import metrics
+
+
+PREVIEW_CACHE_DIR = Path(os.getenv("PREVIEW_CACHE_DIR", ".preview_cache"))
+PREVIEW_CACHE_ENTRIES = int(os.getenv("PREVIEW_CACHE_ENTRIES", "128"))
+PREVIEW_DISK_ENTRIES = int(os.getenv("PREVIEW_DISK_ENTRIES", "2000"))
+
+# Preferred first; "identity" is always available
+ENCODINGS = ("br", "gzip", "identity")
+_SUFFIXES = {"identity": ".html", "gzip": ".html.gz", "br": ".html.br"}
+
+logger = logging.getLogger(__name__)
+
+_brotli = None
+
+
+def _brotli_module():
+    """The brotli module if installed, else False"""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli
+
+
+class RenderedPreview:
+    """A rendered preview page and its precompressed encodings"""
+
+    def __init__(self, key: str, bodies: Dict[str, bytes]):
+        self.key = key
+        self.bodies = bodies
+
+    def etag(self, encoding: str) -> str:
+        """Strong ETag; each encoding is a different representation, so it gets its own tag"""
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.key[:32]}{suffix}"'
+
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, RenderedPreview]" = OrderedDict()
+# path -> ((size, mtime_ns), sha256 of the file), so unchanged files are not re-read
+_file_digests: Dict[str, tuple] = {}
+
+
+def _file_digest(path: Path) -> str:
+    stat = os.stat(path)
+    stat_key = (stat.st_size, stat.st_mtime_ns)
+    cached = _file_digests.get(str(path))
+    if cached is not None and cached[0] == stat_key:
+        return cached[1]
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    with _lock:
+        if len(_file_digests) >= PREVIEW_CACHE_ENTRIES * 4:
+            _file_digests.clear()
+        _file_digests[str(path)] = (stat_key, digest)
+    return digest
+
+
+def _page_meta(tip_data: Dict) -> Dict:
+    """The tip_data fields shown on the page, which are part of the cache key"""
+    validation = tip_data.get("validation") or {}
+    return {
+        "headline": tip_data.get("headline", ""),
+        "date": (tip_data.get("date") or "")[:10],
+        "tags": list(tip_data.get("tags") or ()),
+        "filename": tip_data.get("filename", ""),
+        "min_python": validation.get("min_python", ""),
+    }
+
+
+def preview_key(path: Path, tip_data: Dict) -> str:
+    """Cache key: the file's content hash, the page metadata and the renderer version"""
+    from tip_renderer import RENDERER_VERSION
+    meta = json.dumps(_page_meta(tip_data), sort_keys=True)
+    return hashlib.sha256(f"{RENDERER_VERSION}\0{meta}\0{_file_digest(path)}".encode()).hexdigest()
+
+
+def render_preview(path: Path, tip_data: Dict) -> bytes:
+    """Full HTML page for a tip file, with the styles inlined"""
+    import html
+    from tip_renderer import load_tip, render_page, render_tip
+    meta = _page_meta(tip_data)
+    doc = load_tip(path)
+    doc["headline"] = meta["headline"] or doc["headline"]
+    details = f"<code>{html.escape(meta['filename'])}</code>"
+    if meta["min_python"]:
+        details += f" · Python {html.escape(meta['min_python'])}+"
+    body = (
+        '<header class="site"><h1>Tip preview</h1>'
+        f'<p class="meta">{details}</p></header>\n'
+        + render_tip(doc, date=meta["date"], tags=meta["tags"])
+    )
+    return render_page(f"Preview: {doc['headline']}", body).encode("utf-8")
+
+
+def _compress(page: bytes) -> Dict[str, bytes]:
+    # mtime=0 keeps the gzip bytes a pure function of the page
+    bodies = {"identity": page, "gzip": gzip.compress(page, compresslevel=9, mtime=0)}
+    brotli = _brotli_module()
+    if brotli:
+        bodies["br"] = brotli.compress(page, quality=11)
+    return bodies
+
+
+def _disk_path(key: str, encoding: str) -> Path:
+    return PREVIEW_CACHE_DIR / key[:2] / f"{key}{_SUFFIXES[encoding]}"
+
+
+def _read_disk(key: str) -> Optional[Dict[str, bytes]]:
+    bodies = {}
+    for encoding in ENCODINGS:
+        try:
+            bodies[encoding] = _disk_path(key, encoding).read_bytes()
+        except FileNotFoundError:
+            continue
+    # The identity file is written last, so its presence means the entry is complete
+    return bodies if "identity" in bodies else None
+
+
+def _write_disk(key: str, bodies: Dict[str, bytes]):
+    """Best-effort: a failed write only costs a re-render later"""
+    try:
+        _disk_path(key, "identity").parent.mkdir(parents=True, exist_ok=True)
+        for encoding in sorted(bodies, key=lambda name: name == "identity"):
+            path = _disk_path(key, encoding)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(bodies[encoding])
+            os.replace(tmp_path, path)
+        _prune_disk()
+    except OSError as e:
+        logger.warning("Could not write preview cache entry: %s", e)
+
+
+def _prune_disk():
+    """Drop the least recently written entries once the disk cache grows past PREVIEW_DISK_ENTRIES"""
+    pages = [entry for shard in os.scandir(PREVIEW_CACHE_DIR) if shard.is_dir()
+             for entry in os.scandir(shard.path) if entry.name.endswith(".html")]
+    if len(pages) <= PREVIEW_DISK_ENTRIES:
+        return
+    pages.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in pages[:len(pages) - PREVIEW_DISK_ENTRIES]:
+        key = entry.name[:-len(".html")]
+        for encoding in ENCODINGS:
+            try:
+                os.remove(_disk_path(key, encoding))
+            except FileNotFoundError:
+                pass
+
+
+def get_preview(path: Path, tip_data: Dict) -> RenderedPreview:
+    """
+    Rendered preview for a tip file, from memory, disk or a fresh render
+
+    Raises:
+        OSError if the tip file cannot be read
+    """
+    key = preview_key(path, tip_data)
+    with _lock:
+        cached = _memory.get(key)
+        if cached is not None:
+            _memory.move_to_end(key)
+    if cached is not None:
+        metrics.PREVIEW_CACHE.inc(result="memory")
+        return cached
+
+    bodies = _read_disk(key)
+    if bodies is not None:
+        metrics.PREVIEW_CACHE.inc(result="disk")
+    else:
+        bodies = _compress(render_preview(path, tip_data))
+        _write_disk(key, bodies)
+        metrics.PREVIEW_CACHE.inc(result="render")
+
+    rendered = RenderedPreview(key, bodies)
+    with _lock:
+        _memory[key] = rendered
+        _memory.move_to_end(key)
+        while len(_memory) > PREVIEW_CACHE_ENTRIES:
+            _memory.popitem(last=False)
+    return rendered
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """
+    Best available encoding the client accepts (br, then gzip, then identity)
+
+    Honours q=0 exclusions and "*"; identity is the fallback.
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS[:-1]:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from tip_paths import TIPS_DIR, iter_tip_files
+    paths = [Path(arg) for arg in sys.argv[1:]] or sorted(iter_tip_files(TIPS_DIR))[:1]
+    for tip_path in paths:
+        started = time.perf_counter()
+        page = get_preview(tip_path, {"filename": tip_path.name})
+        first = time.perf_counter() - started
+        started = time.perf_counter()
+        get_preview(tip_path, {"filename": tip_path.name})
+        print(f"[OK] {tip_path}: {first * 1000:.1f} ms, cached {(time.perf_counter() - started) * 1e6:.0f} us, "
+              + ", ".join(f"{name} {len(body):,} B" for name, body in page.bodies.items()))
@@ -0,0 +1,175 @@
+"""
+Rate Limiting for Python Tip Agent
+Token buckets for per-client request limits and outbound quotas
+"""
+
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from file_lock import FileLock
+
+
+class TokenBucket:
+    """Classic token bucket: refills at `rate` tokens/second up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """Take tokens if available without waiting"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            return False
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens will be available"""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = amount - self.tokens
+            return 0.0 if missing <= 0 else missing / self.rate
+
+    def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available (or timeout expires)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire(amount):
+            delay = self.wait_time(amount)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                delay = min(delay, remaining)
+            time.sleep(max(delay, 0.001))
+        return True
+
+
+class KeyedRateLimiter:
+    """
+    One token bucket per key (e.g. client IP)
+
+    Buckets are kept in an LRU so an address-spraying client can't grow
+    memory without bound.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None, max_keys: int = 10000):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, per_minute)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _bucket(self, key: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.capacity)
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket
+
+    def allow(self, key: str) -> bool:
+        """Consume one request for `key`; False means the client is over its limit"""
+        if not self.enabled:
+            return True
+        return self._bucket(key).try_acquire()
+
+    def retry_after(self, key: str) -> int:
+        """Whole seconds the client should wait before retrying"""
+        if not self.enabled:
+            return 0
+        return max(1, int(self._bucket(key).wait_time() + 0.999))
+
+
+class SharedRateLimiter:
+    """
+    KeyedRateLimiter whose buckets live in files, for multi-process servers
+
+    Each gunicorn worker holding its own in-memory buckets would multiply
+    the limit by the worker count. Here keys hash into `shards` JSON files
+    under `directory`, each guarded by a FileLock, so all workers draw from
+    the same bucket. Full buckets are dropped from the file, and a shard
+    keeps at most max_keys / shards of the most recently used ones.
+    """
+
+    def __init__(self, directory, per_minute: float, burst: Optional[float] = None,
+                 max_keys: int = 10000, shards: int = 64):
+        self.directory = Path(directory)
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, per_minute)
+        self.shards = shards
+        self.max_keys_per_shard = max(1, max_keys // shards)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _shard(self, key: str) -> Path:
+        return self.directory / f"{zlib.crc32(key.encode('utf-8')) % self.shards:02d}.json"
+
+    def _tokens(self, state: dict, key: str, now: float) -> float:
+        tokens, updated = state.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def _update(self, key: str, amount: float) -> Tuple[bool, float]:
+        """Refill and try to take `amount` tokens; returns (taken, tokens left)"""
+        path = self._shard(key)
+        with FileLock(path.with_suffix(".lock")):
+            try:
+                state = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                state = {}  # missing, or cut short by a crash: start with full buckets
+            # Wall clock, since monotonic readings aren't comparable across processes
+            now = time.time()
+            tokens = self._tokens(state, key, now)
+            taken = tokens >= amount
+            if taken:
+                tokens -= amount
+            state.pop(key, None)
+            state = {
+                other: value for other, value in state.items()
+                if self._tokens(state, other, now) < self.capacity
+            }
+            if tokens < self.capacity:
+                state[key] = (tokens, now)
+            if len(state) > self.max_keys_per_shard:
+                newest = sorted(state.items(), key=lambda item: item[1][1])[-self.max_keys_per_shard:]
+                state = dict(newest)
+            if amount:
+                path.write_text(json.dumps(state), encoding="utf-8")
+            return taken, tokens
+
+    def allow(self, key: str) -> bool:
+        """Consume one request for `key`; False means the client is over its limit"""
+        if not self.enabled:
+            return True
+        return self._update(key, 1.0)[0]
+
+    def retry_after(self, key: str) -> int:
+        """Whole seconds the client should wait before retrying"""
+        if not self.enabled:
+            return 0
+        _, tokens = self._update(key, 0.0)
+        missing = 1.0 - tokens
+        return max(1, int((missing / self.rate if missing > 0 else 0.0) + 0.999))
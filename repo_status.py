@@ -0,0 +1,327 @@
+"""
+Repository Status for Python Tip Agent
+Structured git status (ahead/behind, untracked and unpushed tips) read from refs and cached between calls
+"""
+
+import json
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from tip_paths import TIPS_DIR, TIP_SUFFIXES
+
+
+# Cache file; defaults to .git/tip-agent-status.json so it never shows up in the working tree
+REPO_STATUS_CACHE = os.getenv("REPO_STATUS_CACHE")
+
+_SHARD_PART = re.compile(r"^\d{4}$|^\d{2}$")
+_OID = re.compile(r"^(?:[0-9a-f]{40}|[0-9a-f]{64})$")
+_SECTION = re.compile(r'^\s*\[\s*([^\s\]"]+)(?:\s+"([^"\\]*)")?\s*\]\s*$')
+_SETTING = re.compile(r"^\s*([A-Za-z][\w-]*)\s*=\s*(.*?)\s*$")
+# Config values safe to read without git: no quotes, escapes, comments or continuations
+_PLAIN_VALUE = re.compile(r'^[^"\\;#]*$')
+
+
+class _UnexpectedLayout(Exception):
+    """Something in .git the file readers don't handle; ask git instead of guessing"""
+
+
+def _git_dir(repo_path: Path) -> Optional[Path]:
+    """The repository's git directory, following a `gitdir:` file for worktrees"""
+    dot_git = repo_path / ".git"
+    if dot_git.is_file():
+        target = dot_git.read_text().strip()
+        if target.startswith("gitdir:"):
+            return (repo_path / target[7:].strip()).resolve()
+    return dot_git if dot_git.is_dir() else None
+
+
+def _common_dir(git_dir: Path) -> Path:
+    """Where shared refs and config live (differs from git_dir in linked worktrees)"""
+    common = git_dir / "commondir"
+    if common.exists():
+        return (git_dir / common.read_text().strip()).resolve()
+    return git_dir
+
+
+def read_ref(git_dir: Path, ref: str) -> Optional[str]:
+    """Object id a ref points at, from its loose file or packed-refs, without running git"""
+    for base in (git_dir, _common_dir(git_dir)):
+        loose = base / ref
+        if loose.is_file():
+            value = loose.read_text().strip()
+            if value.startswith("ref: "):
+                return read_ref(git_dir, value[5:])
+            if not _OID.match(value):
+                raise _UnexpectedLayout(f"{loose} does not hold an object id")
+            return value
+    packed = _common_dir(git_dir) / "packed-refs"
+    if packed.exists():
+        with open(packed, "r") as f:
+            for line in f:
+                if line.startswith(("#", "^")):
+                    continue  # header and peeled tag lines
+                oid, _, name = line.rstrip("\n").partition(" ")
+                if name == ref:
+                    if not _OID.match(oid):
+                        raise _UnexpectedLayout(f"Malformed packed-refs line for {ref}")
+                    return oid
+    return None
+
+
+def _head(git_dir: Path) -> Tuple[Optional[str], Optional[str]]:
+    """(branch name or None when detached, HEAD object id or None when unborn)"""
+    if (_common_dir(git_dir) / "reftable").exists():
+        raise _UnexpectedLayout("refs are stored in reftable")
+    value = (git_dir / "HEAD").read_text().strip()
+    if value.startswith("ref: "):
+        ref = value[5:]
+        branch = ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref
+        oid = read_ref(git_dir, ref)
+        if oid is None:
+            # Unborn, or a ref backend we can't see into: let git say which
+            raise _UnexpectedLayout(f"HEAD points at {ref}, which has no loose or packed entry")
+        return branch, oid
+    if not _OID.match(value):
+        raise _UnexpectedLayout("HEAD is neither a symbolic ref nor an object id")
+    return None, value
+
+
+def _upstream(git_dir: Path, branch: str) -> Optional[str]:
+    """Remote-tracking ref configured for a branch (branch.<name>.remote/merge)"""
+    settings = {}
+    in_section = False
+    config = _common_dir(git_dir) / "config"
+    if not config.exists():
+        return None
+    for line in config.read_text().splitlines():
+        if not line.strip() or line.lstrip().startswith(("#", ";")):
+            continue
+        section = _SECTION.match(line)
+        if section:
+            name = section.group(1).lower()
+            if name in ("include", "includeif") or "." in name:
+                # Included files and the legacy [branch.name] form can hold the upstream too
+                raise _UnexpectedLayout(f"Config section needs git's parser: {line.strip()}")
+            in_section = name == "branch" and section.group(2) == branch
+            continue
+        setting = _SETTING.match(line)
+        if setting is None or not _PLAIN_VALUE.match(setting.group(2)):
+            raise _UnexpectedLayout(f"Config line needs git's parser: {line.strip()}")
+        if in_section:
+            settings[setting.group(1).lower()] = setting.group(2)
+    remote, merge = settings.get("remote"), settings.get("merge")
+    if not remote or not merge:
+        return None
+    if remote == ".":
+        return merge
+    return f"refs/remotes/{remote}/{merge[len('refs/heads/'):] if merge.startswith('refs/heads/') else merge}"
+
+
+def _dir_snapshot(repo_path: Path, tips_dir: Path) -> Dict[str, int]:
+    """
+    mtimes of tips/ and its YYYY/MM shard directories, keyed by repo-relative path
+
+    Adding, removing or renaming a file changes its directory's mtime, so
+    comparing snapshots finds the directories to rescan without statting
+    any tip file.
+    """
+    snapshot = {}
+    if not tips_dir.exists():
+        return snapshot
+    prefix = len(str(repo_path)) + 1
+    stack = [(str(tips_dir), 0)]
+    while stack:
+        directory, depth = stack.pop()
+        snapshot[directory[prefix:].replace(os.sep, "/")] = os.stat(directory).st_mtime_ns
+        if depth < 2:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False) and _SHARD_PART.match(entry.name):
+                        stack.append((entry.path, depth + 1))
+    return snapshot
+
+
+def _git(repo_path: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=repo_path, capture_output=True, text=True, check=True
+    ).stdout
+
+
+def _tip_paths(paths: List[str]) -> List[str]:
+    return sorted({path for path in paths if path.endswith(TIP_SUFFIXES)})
+
+
+def _status_refs(repo_path: Path) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[Tuple[int, int]]]:
+    """
+    (branch, head, upstream, (ahead, behind)) from `git status --porcelain=v2 --branch`
+
+    The fallback when .git holds something the file readers don't handle.
+    Ahead/behind is None without an upstream or when it hasn't been fetched.
+    """
+    output = _git(repo_path, "status", "--porcelain=v2", "--branch", "--untracked-files=no",
+                  "--ignore-submodules")
+    headers = {}
+    for line in output.splitlines():
+        if line.startswith("# branch."):
+            key, _, value = line[len("# branch."):].partition(" ")
+            headers[key] = value
+    branch = headers.get("head")
+    head = headers.get("oid")
+    counts = None
+    if headers.get("ab"):
+        ahead, behind = headers["ab"].split()
+        counts = (int(ahead.lstrip("+")), int(behind.lstrip("-")))
+    return (None if branch == "(detached)" else branch, None if head == "(initial)" else head,
+            headers.get("upstream"), counts)
+
+
+def _ref_status(repo_path: Path, head: Optional[str], upstream_oid: Optional[str], tips_rel: str,
+                counts: Optional[Tuple[int, int]] = None) -> Dict:
+    """Ahead/behind counts and tips committed locally but not on the upstream"""
+    if not head or not upstream_oid:
+        return {"ahead": None, "behind": None, "unpushed_tips": None}
+    if counts is None:
+        counts = _git(repo_path, "rev-list", "--left-right", "--count", f"{head}...{upstream_oid}").split()
+    ahead, behind = int(counts[0]), int(counts[1])
+    unpushed = _git(repo_path, "log", "--format=", "--name-only", "--diff-filter=A",
+                    f"{upstream_oid}..{head}", "--", tips_rel) if ahead else ""
+    return {"ahead": ahead, "behind": behind, "unpushed_tips": _tip_paths(unpushed.splitlines())}
+
+
+def _untracked_tips(repo_path: Path, head: Optional[str], snapshot: Dict[str, int], previous: Dict) -> List[str]:
+    """
+    Tip files on disk that are not in HEAD's tree
+
+    Only directories whose mtime changed since the previous snapshot are
+    listed again; tips previously found untracked elsewhere are re-checked
+    against HEAD by path, so a commit does not force a full rescan.
+    """
+    old_dirs = previous.get("dirs", {})
+    changed = [directory for directory, mtime in snapshot.items() if old_dirs.get(directory) != mtime]
+    candidates = {
+        path for path in previous.get("untracked", [])
+        if path.rsplit("/", 1)[0] in snapshot and path.rsplit("/", 1)[0] not in changed
+    }
+    for directory in changed:
+        with os.scandir(repo_path / directory) as entries:
+            candidates.update(
+                f"{directory}/{entry.name}" for entry in entries
+                if entry.name.endswith(TIP_SUFFIXES) and entry.is_file()
+            )
+    if head and previous.get("head") and previous["head"] != head:
+        # Files dropped from HEAD but left on disk (e.g. `git rm --cached`) keep their directory's mtime
+        removed = _git(repo_path, "diff", "-z", "--name-only", "--diff-filter=D", previous["head"], head,
+                       "--", *snapshot)
+        candidates.update(path for path in removed.split("\0")
+                          if path.endswith(TIP_SUFFIXES) and (repo_path / path).is_file())
+    if head and candidates:
+        pathspecs = [f"{directory}/" for directory in changed]
+        pathspecs += [path for path in candidates if path.rsplit("/", 1)[0] not in changed]
+        listed = _git(repo_path, "ls-tree", "-z", "--name-only", head, "--", *pathspecs)
+        candidates -= set(listed.split("\0"))
+    return sorted(candidates)
+
+
+def repo_status(repo_path: str = ".", tips_dir: Path = TIPS_DIR, refresh: bool = False) -> Dict:
+    """
+    Structured repository status for the tips workflow
+
+    Refs are read straight from .git and tips/ is snapshotted by directory
+    mtimes; git is only run when HEAD, the upstream or a tips/ directory
+    changed since the cached result. Ahead/behind is relative to the last fetched
+    remote-tracking ref, so no network access is needed. If .git holds
+    anything the readers don't handle (reftable, config includes, quoted
+    values, ...), the refs come from one `git status --porcelain=v2 --branch`
+    instead, and the ref part of the result is not cached.
+
+    Returns:
+        Dictionary with branch, head, upstream, ahead, behind, untracked_tips
+        and unpushed_tips (ahead/behind/unpushed_tips are None without an upstream)
+    """
+    from file_lock import atomic_write_text
+
+    repo_path = Path(repo_path).resolve()
+    git_dir = _git_dir(repo_path)
+    if git_dir is None:
+        return {"error": f"{repo_path} is not a git repository"}
+    tips_dir = Path(tips_dir)
+    if not tips_dir.is_absolute():
+        tips_dir = repo_path / tips_dir
+    tips_rel = tips_dir.relative_to(repo_path).as_posix()
+
+    counts = None
+    try:
+        branch, head = _head(git_dir)
+        upstream = _upstream(git_dir, branch) if branch else None
+        upstream_oid = read_ref(git_dir, upstream) if upstream else None
+        refs_key = f"{head}..{upstream_oid}"
+    except (_UnexpectedLayout, OSError, UnicodeDecodeError):
+        try:
+            branch, head, upstream, counts = _status_refs(repo_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            return {"error": f"Error reading repository status: {e}"}
+        # The upstream's object id isn't known here, so the cached counts can't be checked
+        upstream_oid = upstream if counts is not None else None
+        refs_key = None
+    snapshot = _dir_snapshot(repo_path, tips_dir)
+
+    cache_file = Path(REPO_STATUS_CACHE) if REPO_STATUS_CACHE else git_dir / "tip-agent-status.json"
+    cache = {}
+    if not refresh and cache_file.exists():
+        try:
+            cache = json.loads(cache_file.read_text())
+        except ValueError:
+            cache = {}
+
+    refs = cache.get("refs") if refs_key is not None and cache.get("refs_key") == refs_key else None
+    tips = cache.get("tips") or {}
+    fresh = refs is None or tips.get("head") != head or tips.get("dirs") != snapshot
+    try:
+        if refs is None:
+            refs = _ref_status(repo_path, head, upstream_oid, tips_rel, counts)
+        if fresh:
+            tips = {"head": head, "dirs": snapshot, "untracked": _untracked_tips(repo_path, head, snapshot, tips)}
+    except (OSError, subprocess.CalledProcessError) as e:
+        return {"error": f"Error reading repository status: {e}"}
+    if fresh:
+        atomic_write_text(cache_file, json.dumps({"refs_key": refs_key, "refs": refs, "tips": tips}))
+
+    return {
+        "branch": branch,
+        "head": head,
+        "upstream": upstream[len("refs/remotes/"):] if upstream and upstream.startswith("refs/remotes/") else upstream,
+        **refs,
+        "untracked_tips": tips["untracked"],
+        "cached": not fresh,
+    }
+
+
+def format_status(status: Dict) -> str:
+    """Human-readable summary of repo_status()"""
+    if "error" in status:
+        return status["error"]
+    lines = [f"Branch: {status['branch'] or '(detached)'} at {(status['head'] or '(no commits)')[:8]}"]
+    if status["upstream"] is None:
+        lines.append("Upstream: none configured")
+    else:
+        lines.append(f"Upstream: {status['upstream']} "
+                     f"(ahead {status['ahead']}, behind {status['behind']})")
+    for label, key in (("Unpushed tips", "unpushed_tips"), ("Untracked tips", "untracked_tips")):
+        paths = status[key] or []
+        lines.append(f"{label}: {len(paths)}")
+        lines.extend(f"  - {path}" for path in paths[:10])
+        if len(paths) > 10:
+            lines.append(f"  ... and {len(paths) - 10} more")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import time
+    for attempt in ("refresh", "cached"):
+        started = time.perf_counter()
+        status = repo_status(refresh=attempt == "refresh")
+        print(f"[{attempt}: {(time.perf_counter() - started) * 1000:.1f} ms]")
+    print(format_status(status))
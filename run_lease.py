@@ -0,0 +1,386 @@
+"""
+Run Lease for Python Tip Agent
+Ensures exactly one instance (scheduler.py or the GitHub Action) runs each daily slot
+"""
+
+import json
+import os
+import socket
+import subprocess
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from file_lock import FileLock, atomic_write_text
+
+
+# "auto" uses the git backend when there is a remote to share (so the
+# scheduler and the GitHub Action see each other's leases), else files
+RUN_LEASE_BACKEND = os.getenv("RUN_LEASE_BACKEND", "auto").lower()
+RUN_LEASE_TTL_SECONDS = float(os.getenv("RUN_LEASE_TTL", "1800"))
+RUN_LEASE_DIR = Path(os.getenv("RUN_LEASE_DIR", "run_leases"))
+RUN_LEASE_REMOTE = os.getenv("RUN_LEASE_REMOTE", "origin")
+RUN_LEASE_REF_PREFIX = "refs/tip-agent/leases/"
+
+# git's well-known empty tree; lease commits carry their state in the message
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+# Push rejections that mean the compare-and-swap lost; anything else is an error
+_LOST_PUSH_MARKERS = ("(stale info)", "(non-fast-forward)", "(fetch first)",
+                      "incorrect old value", "failed to lock", "cannot lock ref")
+
+
+class LeaseLost(Exception):
+    """Raised when another instance has taken over (or finished) our slot"""
+    pass
+
+
+class LeaseError(Exception):
+    """Raised when the lease store can't be read or written (network, auth, missing remote)"""
+    pass
+
+
+def default_holder() -> str:
+    """Identifier for this process: host, pid and a random suffix"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease:
+    """
+    A held lease on one slot
+
+    `token` is the fencing token: it increases by one every time the slot
+    changes hands, so a holder that stalled past its TTL finds a larger
+    token on its next renew() and stops before doing anything irreversible.
+    """
+
+    def __init__(self, backend: "LeaseBackend", record: Dict, version):
+        self.backend = backend
+        self.record = record
+        self.version = version
+
+    @property
+    def slot(self) -> str:
+        return self.record["slot"]
+
+    @property
+    def token(self) -> int:
+        return self.record["token"]
+
+    def renew(self, ttl: Optional[float] = None):
+        """
+        Verify we still hold the lease and extend it
+
+        Call before each irreversible step (paid API call, email, push).
+
+        Raises:
+            LeaseLost if another holder has the slot now
+        """
+        record = dict(self.record, expires_at=time.time() + (ttl or self.backend.ttl))
+        self.version = self.backend._replace(self, record)
+        self.record = record
+
+    def release(self, completed: bool):
+        """
+        Give up the lease
+
+        A completed slot is never run again; an incomplete one can be taken
+        over immediately by the next instance (e.g. a retried Action).
+        """
+        record = dict(self.record, state="completed" if completed else "released",
+                      released_at=datetime.now().isoformat(timespec="seconds"))
+        try:
+            self.version = self.backend._replace(self, record)
+            self.record = record
+        except LeaseLost:
+            pass
+
+
+class LeaseBackend:
+    """
+    Compare-and-swap lease storage
+
+    Subclasses implement _read(slot) -> (record or None, version) and
+    _write(slot, record, expected_version) -> new version or None when the
+    stored version no longer matches.
+    """
+
+    def __init__(self, ttl: float = RUN_LEASE_TTL_SECONDS):
+        self.ttl = ttl
+
+    def _read(self, slot: str) -> Tuple[Optional[Dict], object]:
+        raise NotImplementedError
+
+    def _write(self, slot: str, record: Dict, expected_version) -> Optional[object]:
+        raise NotImplementedError
+
+    def acquire(self, slot: str, holder: Optional[str] = None) -> Tuple[Optional[Lease], str]:
+        """
+        Try to take the lease for `slot`
+
+        Returns:
+            (lease, "") on success, or (None, reason) if the slot is held by
+            a live instance, already completed, or was taken concurrently
+        """
+        holder = holder or default_holder()
+        current, version = self._read(slot)
+        now = time.time()
+        if current is not None:
+            if current["state"] == "completed":
+                return None, f"slot {slot} already completed by {current['holder']}"
+            if current["state"] == "held" and current["expires_at"] > now and current["holder"] != holder:
+                return None, f"slot {slot} held by {current['holder']} (token {current['token']})"
+        # Free, released, or stale (holder outlived its TTL): take it over
+        record = {
+            "slot": slot,
+            "holder": holder,
+            "token": (current["token"] if current else 0) + 1,
+            "state": "held",
+            "acquired_at": datetime.now().isoformat(timespec="seconds"),
+            "expires_at": now + self.ttl,
+        }
+        new_version = self._write(slot, record, version)
+        if new_version is None:
+            return None, f"slot {slot} was taken by another instance"
+        return Lease(self, record, new_version), ""
+
+    def _replace(self, lease: Lease, record: Dict):
+        """CAS-update a lease we hold; raises LeaseLost if someone else moved it"""
+        new_version = self._write(lease.slot, record, lease.version)
+        if new_version is None:
+            current, _ = self._read(lease.slot)
+            holder = current["holder"] if current else "nobody"
+            raise LeaseLost(f"lease for {lease.slot} (token {lease.token}) lost to {holder}")
+        return new_version
+
+    def current(self, slot: str) -> Optional[Dict]:
+        return self._read(slot)[0]
+
+
+class FileLeaseBackend(LeaseBackend):
+    """Lease per slot in RUN_LEASE_DIR/<slot>.json; for instances sharing a filesystem"""
+
+    name = "file"
+
+    def __init__(self, lease_dir: Path = RUN_LEASE_DIR, ttl: float = RUN_LEASE_TTL_SECONDS):
+        super().__init__(ttl)
+        self.lease_dir = Path(lease_dir)
+
+    def _path(self, slot: str) -> Path:
+        return self.lease_dir / f"{slot}.json"
+
+    def _read(self, slot):
+        path = self._path(slot)
+        if not path.exists():
+            return None, None
+        with open(path, 'r') as f:
+            record = json.load(f)
+        return record, (record["token"], record["state"], record["expires_at"])
+
+    def _write(self, slot, record, expected_version):
+        self.lease_dir.mkdir(parents=True, exist_ok=True)
+        with FileLock(self.lease_dir / f"{slot}.lock"):
+            _, version = self._read(slot)
+            if version != expected_version:
+                return None
+            atomic_write_text(self._path(slot), json.dumps(record, indent=2))
+            return (record["token"], record["state"], record["expires_at"])
+
+
+class GitRefLeaseBackend(LeaseBackend):
+    """
+    Lease per slot stored as a commit on refs/tip-agent/leases/<slot> in a git remote
+
+    Each state change is a new commit (parent = previous state) pushed with
+    --force-with-lease against the ref's current value, so the remote
+    performs the compare-and-swap and exactly one concurrent push wins.
+    Works anywhere the remote is reachable, e.g. a local scheduler and a
+    GitHub Actions runner sharing the GitHub repository.
+    """
+
+    name = "git"
+
+    def __init__(self, repo_path: str = ".", remote: str = RUN_LEASE_REMOTE,
+                 ttl: float = RUN_LEASE_TTL_SECONDS):
+        super().__init__(ttl)
+        self.repo_path = repo_path
+        self.remote = remote
+
+    def _git(self, *args, input_text: Optional[str] = None, check: bool = True) -> subprocess.CompletedProcess:
+        env = dict(os.environ,
+                   GIT_AUTHOR_NAME="tip-agent", GIT_AUTHOR_EMAIL="tip-agent@localhost",
+                   GIT_COMMITTER_NAME="tip-agent", GIT_COMMITTER_EMAIL="tip-agent@localhost",
+                   GIT_TERMINAL_PROMPT="0")
+        result = subprocess.run(["git", *args], cwd=self.repo_path, input=input_text,
+                                capture_output=True, text=True, env=env)
+        if check and result.returncode != 0:
+            raise LeaseError(f"git {args[0]} failed: {result.stderr.strip()}")
+        return result
+
+    def _ref(self, slot: str) -> str:
+        return RUN_LEASE_REF_PREFIX + slot
+
+    def _read(self, slot):
+        ref = self._ref(slot)
+        listed = self._git("ls-remote", self.remote, ref).stdout.split()
+        if not listed:
+            return None, ""
+        oid = listed[0]
+        if self._git("cat-file", "-e", oid, check=False).returncode != 0:
+            self._git("fetch", "--quiet", "--no-tags", self.remote, ref)
+        message = self._git("cat-file", "commit", oid).stdout.split("\n\n", 1)[1]
+        return json.loads(message), oid
+
+    def _write(self, slot, record, expected_version):
+        # Make sure the empty tree exists locally (it always does in a non-empty repo)
+        self._git("hash-object", "-t", "tree", "-w", "--stdin", input_text="")
+        parent = ["-p", expected_version] if expected_version else []
+        oid = self._git("commit-tree", EMPTY_TREE, *parent,
+                        input_text=json.dumps(record, sort_keys=True)).stdout.strip()
+        ref = self._ref(slot)
+        pushed = self._git("push", "--quiet", "--porcelain",
+                           f"--force-with-lease={ref}:{expected_version or ''}",
+                           self.remote, f"{oid}:{ref}", check=False)
+        if pushed.returncode == 0:
+            return oid
+        # Only a rejected compare-and-swap means another instance moved the
+        # slot; a network or auth failure must not quietly skip the day
+        if any(marker in pushed.stdout + pushed.stderr for marker in _LOST_PUSH_MARKERS):
+            return None
+        raise LeaseError(f"git push to {self.remote} failed: {(pushed.stderr or pushed.stdout).strip()}")
+
+
+def shared_remote(repo_path: str = ".") -> Optional[str]:
+    """
+    The remote the git backend would use: RUN_LEASE_REMOTE if this checkout
+    has it, else GITHUB_REPO_URL, else None
+    """
+    try:
+        configured = subprocess.run(["git", "remote", "get-url", RUN_LEASE_REMOTE], cwd=repo_path,
+                                    capture_output=True, text=True)
+    except OSError:
+        return None
+    if configured.returncode == 0:
+        return RUN_LEASE_REMOTE
+    return os.getenv("GITHUB_REPO_URL") or None
+
+
+def create_lease_backend(name: Optional[str] = None) -> Optional[LeaseBackend]:
+    """
+    Build the backend named by `name` or RUN_LEASE_BACKEND ("auto", "file", "git" or "none")
+
+    "auto" picks git when shared_remote() finds a remote, so a local
+    scheduler and the GitHub Action lease the same slot in the same place.
+
+    Raises:
+        ValueError for an unknown backend name
+    """
+    name = (name or RUN_LEASE_BACKEND).lower()
+    if name == "none":
+        return None
+    if name == "auto":
+        remote = shared_remote()
+        return GitRefLeaseBackend(remote=remote) if remote else FileLeaseBackend()
+    if name == "file":
+        return FileLeaseBackend()
+    if name == "git":
+        return GitRefLeaseBackend()
+    raise ValueError(f"Unknown RUN_LEASE_BACKEND '{name}' (expected auto, file, git or none)")
+
+
+def _demo_worker(args):
+    """Contend for a slot from a separate process; returns (holder, token or None)"""
+    backend_name, location, slot, work_seconds = args
+    if backend_name == "git":
+        backend = GitRefLeaseBackend(repo_path=location, remote="origin")
+    else:
+        backend = FileLeaseBackend(lease_dir=Path(location))
+    holder = default_holder()
+    lease, _ = backend.acquire(slot, holder)
+    if lease is None:
+        return holder, None
+    time.sleep(work_seconds)
+    lease.renew()
+    lease.release(completed=True)
+    return holder, lease.token
+
+
+def _self_check(workers: int = 6) -> bool:
+    """
+    Several processes race for the same slot through each backend (the git
+    backend through clones of one bare repo): exactly one may win. Then a
+    holder "crashes", its lease goes stale, a second instance takes over
+    with a higher fencing token, and the first one's renew() is refused.
+    Finally, an unreachable git remote must raise rather than skip the slot.
+    """
+    import multiprocessing
+    import shutil
+    import tempfile
+
+    workdir = Path(tempfile.mkdtemp(prefix="run-lease-check-"))
+    ok = True
+    try:
+        bare = workdir / "remote.git"
+        subprocess.run(["git", "init", "--quiet", "--bare", str(bare)], check=True)
+        clones = []
+        for i in range(workers):
+            clone = workdir / f"clone{i}"
+            subprocess.run(["git", "clone", "--quiet", str(bare), str(clone)],
+                           check=True, capture_output=True)
+            clones.append(str(clone))
+
+        for backend_name in ("file", "git"):
+            slot = "2026-01-01"
+            if backend_name == "git":
+                jobs = [("git", clone, slot, 0.2) for clone in clones]
+            else:
+                jobs = [("file", str(workdir / "leases"), slot, 0.2)] * workers
+            with multiprocessing.Pool(workers) as pool:
+                results = pool.map(_demo_worker, jobs)
+            winners = [token for _, token in results if token is not None]
+            passed = len(winners) == 1
+            ok &= passed
+            print(f"{'[OK]' if passed else '[ERROR]'} {backend_name}: {workers} processes, "
+                  f"{len(winners)} acquired slot {slot}")
+
+            # Stale takeover and fencing
+            if backend_name == "git":
+                first = GitRefLeaseBackend(clones[0], ttl=0.5)
+                second = GitRefLeaseBackend(clones[1], ttl=0.5)
+            else:
+                first = second = FileLeaseBackend(workdir / "leases", ttl=0.5)
+            slot = "2026-01-02"
+            stalled, _ = first.acquire(slot, "stalled-holder")
+            blocked, _ = second.acquire(slot, "second-holder")
+            time.sleep(0.7)
+            takeover, _ = second.acquire(slot, "second-holder")
+            try:
+                stalled.renew()
+                fenced = False
+            except LeaseLost:
+                fenced = True
+            passed = (stalled is not None and blocked is None and takeover is not None
+                      and takeover.token == stalled.token + 1 and fenced)
+            ok &= passed
+            print(f"{'[OK]' if passed else '[ERROR]'} {backend_name}: stale lease taken over "
+                  f"(token {stalled.token} -> {takeover.token if takeover else None}), "
+                  f"old holder {'fenced off' if fenced else 'NOT fenced'}")
+
+        # An unreachable remote is an error, not a slot taken by someone else
+        try:
+            GitRefLeaseBackend(clones[0], remote=str(workdir / "missing.git")).acquire("2026-01-03")
+            raised = False
+        except LeaseError:
+            raised = True
+        ok &= raised
+        print(f"{'[OK]' if raised else '[ERROR]'} git: unreachable remote "
+              f"{'raises LeaseError' if raised else 'was reported as a lost slot'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return ok
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if _self_check() else 1)
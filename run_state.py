@@ -0,0 +1,311 @@
+"""
+Daily Run State for Python Tip Agent
+Persists each day's run as a state machine so a failed or retried run resumes instead of starting over
+"""
+
+import json
+import os
+import secrets
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from file_lock import atomic_write_text
+
+
+RUN_STATE_DIR = Path(os.getenv("RUN_STATE_DIR", "run_state"))
+
+# Steps in order; a run's "step" is the last one that completed
+STEPS = ("generated", "saved", "registered", "emailed")
+
+
+class DailyRun:
+    """
+    State of one daily run, stored in RUN_STATE_DIR/<YYYY-MM-DD>.json
+
+    Each completed step is written atomically together with everything
+    later steps need (the generated tip, its file, the approval token), so
+    a rerun for the same date picks up at the first incomplete step and
+    never regenerates a tip that was already paid for.
+    """
+
+    def __init__(self, run_date: Optional[str] = None, state_dir: Path = RUN_STATE_DIR):
+        self.run_date = run_date or datetime.now().strftime("%Y-%m-%d")
+        self.path = Path(state_dir) / f"{self.run_date}.json"
+        self.state = self._load()
+
+    def _load(self) -> Dict:
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        return {"date": self.run_date, "step": None, "attempts": 0}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.path, json.dumps(self.state, indent=2))
+
+    @property
+    def step(self) -> Optional[str]:
+        return self.state["step"]
+
+    def done(self, step: str) -> bool:
+        """True if `step` (and therefore every step before it) has completed"""
+        return self.step is not None and STEPS.index(self.step) >= STEPS.index(step)
+
+    def start_attempt(self) -> int:
+        """Count an attempt at this run; returns the attempt number"""
+        self.state["attempts"] += 1
+        self._save()
+        return self.state["attempts"]
+
+    def approval_token(self) -> str:
+        """
+        Token for this run's pending approval, issued once and persisted
+
+        The token is saved before it is registered, so a crash between the
+        two can't leave an orphaned second token behind.
+        """
+        if not self.state.get("token"):
+            self.state["token"] = secrets.token_urlsafe(32)
+            self._save()
+        return self.state["token"]
+
+    def complete(self, step: str, **fields):
+        """Mark `step` done and persist any data later steps need"""
+        if step not in STEPS:
+            raise ValueError(f"Unknown run step '{step}'")
+        self.state.update(fields)
+        self.state["step"] = step
+        self.state[f"{step}_at"] = datetime.now().isoformat()
+        self._save()
+
+    def get(self, key: str, default=None):
+        return self.state.get(key, default)
+
+
+def redact_tokens(state_dir: Path = RUN_STATE_DIR) -> int:
+    """
+    Remove approval tokens from every state file under state_dir
+
+    For state carried somewhere less private than the checkout, such as the
+    GitHub Action's cache between attempts. A run resumed from a redacted
+    file reuses its tip and issues and registers a new token, so it still
+    never pays for the tip twice. Returns the number of files changed.
+    """
+    changed = 0
+    for path in Path(state_dir).rglob("*.json"):
+        state = json.loads(path.read_text())
+        if state.pop("token", None) is not None:
+            atomic_write_text(path, json.dumps(state, indent=2))
+            changed += 1
+    return changed
+
+
+def _self_check():
+    """
+    Crash-injection check: for every step, crash just before and just after
+    its side effect, rerun, and verify the day ends with exactly one tip
+    file, history entry, pending token and paid generation. Then retry
+    from a fresh checkout holding only the redacted run state, as the
+    GitHub Action does.
+    """
+    import shutil
+    import tempfile
+
+    root = Path(__file__).resolve().parent
+    workdir = Path(tempfile.mkdtemp(prefix="run-state-check-"))
+    original_cwd = os.getcwd()
+    os.chdir(workdir)
+    os.environ.update({
+        "TIP_BACKEND": "offline",
+        "PENDING_FILE": str(workdir / "pending_approvals.json"),
+        "GENERATION_STATS_FILE": str(workdir / "generation_stats.json"),
+        "USAGE_LEDGER_FILE": str(workdir / "usage_ledger.jsonl"),
+        "FALLBACK_STATE_FILE": str(workdir / "fallback_state.json"),
+    })
+
+    import sys
+    sys.path.insert(0, str(root))
+    import pending_store
+    from main_agent import PythonTipAgent
+
+    class SimulatedCrash(Exception):
+        pass
+
+    class FakeEmail:
+        recipient_email = "reviewer@example.com"
+
+        def __init__(self):
+            self.sent = []
+
+        def send_approval_email(self, tip_data, token):
+            self.sent.append(token)
+            return True
+
+    # step name -> (attribute owner name, method name)
+    targets = {
+        "generated": ("tip_generator", "generate_tip"),
+        "saved": ("tip_generator", "save_tip"),
+        "registered": ("pending_store", "add_pending_approval"),
+        "emailed": ("email_handler", "send_approval_email"),
+    }
+
+    counts = {}
+
+    def make_agent():
+        """Fresh agent, as a rerun in a new process would build, with counting fakes"""
+        agent = PythonTipAgent()
+        agent._email_handler = FakeEmail()
+        backend = agent.tip_generator.backend
+        original_complete = backend.complete
+        original_send = agent.email_handler.send_approval_email
+
+        def counting_complete(*args, **kwargs):
+            counts["backend"] += 1
+            return original_complete(*args, **kwargs)
+
+        def counting_send(*args, **kwargs):
+            counts["emails"] += 1
+            return original_send(*args, **kwargs)
+        backend.complete = counting_complete
+        agent.email_handler.send_approval_email = counting_send
+        return agent
+
+    failures = []
+    try:
+        for step, (owner, method) in targets.items():
+            for when in ("before", "after"):
+                case_dir = workdir / f"{step}-{when}"
+                case_dir.mkdir()
+                os.chdir(case_dir)
+                pending_store.PENDING_FILE = case_dir / "pending_approvals.json"
+                pending_store.PENDING_LOCK_FILE = case_dir / "pending_approvals.json.lock"
+                counts.update(backend=0, emails=0)
+
+                agent = make_agent()
+                target = pending_store if owner == "pending_store" else getattr(agent, owner)
+                original = getattr(target, method)
+
+                def crashing(*args, _original=original, _when=when, **kwargs):
+                    if _when == "before":
+                        raise SimulatedCrash()
+                    _original(*args, **kwargs)
+                    raise SimulatedCrash()
+                setattr(target, method, crashing)
+                try:
+                    agent.generate_and_send_daily_tip()
+                except SimulatedCrash:
+                    pass
+                finally:
+                    setattr(target, method, original)
+
+                make_agent().generate_and_send_daily_tip()
+                make_agent().generate_and_send_daily_tip()  # a third run must be a no-op
+
+                tip_files = list((case_dir / "tips").rglob("*.ipynb"))
+                history = json.loads((case_dir / "tip_history.json").read_text())["tips"]
+                pending = pending_store.load_pending()
+                # Crashing after a side effect but before it is recorded is the one
+                # case where that side effect must be repeated
+                repeated = (step, when) if when == "after" else None
+                checks = {
+                    "tip files": (len(tip_files), 1),
+                    "history entries": (len(history), 1),
+                    "pending tokens": (len(pending), 1),
+                    "backend calls": (counts["backend"], 2 if repeated == ("generated", "after") else 1),
+                    "emails": (counts["emails"], 2 if repeated == ("emailed", "after") else 1),
+                    "final step": (DailyRun().step, "emailed"),
+                }
+                problems = [f"{name} {got} != {want}" for name, (got, want) in checks.items() if got != want]
+                status = "[OK]" if not problems else "[ERROR]"
+                print(f"{status} crash {when:<6} {step:<10} {'; '.join(problems) or 'resumed cleanly'}")
+                if problems:
+                    failures.append((step, when))
+
+        # The pending store lost between runs (a fresh checkout): the resumed
+        # run must register its token again before emailing it
+        case_dir = workdir / "store-lost"
+        case_dir.mkdir()
+        os.chdir(case_dir)
+        pending_store.PENDING_FILE = case_dir / "pending_approvals.json"
+        pending_store.PENDING_LOCK_FILE = case_dir / "pending_approvals.json.lock"
+        counts.update(backend=0, emails=0)
+        agent = make_agent()
+        original = agent.email_handler.send_approval_email
+
+        def crash_before_email(*args, **kwargs):
+            raise SimulatedCrash()
+        agent.email_handler.send_approval_email = crash_before_email
+        try:
+            agent.generate_and_send_daily_tip()
+        except SimulatedCrash:
+            pass
+        pending_store.PENDING_FILE.unlink()
+        agent = make_agent()
+        agent.generate_and_send_daily_tip()
+        emailed = agent.email_handler.sent
+        registered = pending_store.load_pending()
+        if len(emailed) == 1 and list(registered) == emailed:
+            print("[OK] store lost before email  token registered again")
+        else:
+            print(f"[ERROR] store lost before email  emailed {emailed}, registered {list(registered)}")
+            failures.append(("registered", "store lost"))
+
+        # A retried Action attempt: a fresh checkout gets the tips the failed
+        # attempt committed (or not, if that step failed too) and the run
+        # state restored from the cache with its token redacted
+        for committed in (True, False):
+            failed_dir = workdir / f"attempt-1-{committed}"
+            failed_dir.mkdir()
+            os.chdir(failed_dir)
+            pending_store.PENDING_FILE = failed_dir / "pending_approvals.json"
+            pending_store.PENDING_LOCK_FILE = failed_dir / "pending_approvals.json.lock"
+            counts.update(backend=0, emails=0)
+            agent = make_agent()
+            agent.email_handler.send_approval_email = crash_before_email
+            try:
+                agent.generate_and_send_daily_tip()
+            except SimulatedCrash:
+                pass
+            redact_tokens(failed_dir / "run_state")
+
+            retry_dir = workdir / f"attempt-2-{committed}"
+            retry_dir.mkdir()
+            shutil.copytree(failed_dir / "run_state", retry_dir / "run_state")
+            if committed:
+                shutil.copytree(failed_dir / "tips", retry_dir / "tips")
+                shutil.copy(failed_dir / "tip_history.json", retry_dir / "tip_history.json")
+            os.chdir(retry_dir)
+            pending_store.PENDING_FILE = retry_dir / "pending_approvals.json"
+            pending_store.PENDING_LOCK_FILE = retry_dir / "pending_approvals.json.lock"
+            agent = make_agent()
+            agent.generate_and_send_daily_tip()
+            emailed = agent.email_handler.sent
+            checks = {
+                "backend calls": (counts["backend"], 1),
+                "tip files": (len(list((retry_dir / "tips").rglob("*.ipynb"))), 1),
+                "history entries": (len(json.loads((retry_dir / "tip_history.json").read_text())["tips"]), 1),
+                "emailed tokens registered": (list(pending_store.load_pending()) == emailed and len(emailed) == 1, True),
+                "final step": (DailyRun().step, "emailed"),
+            }
+            problems = [f"{name} {got} != {want}" for name, (got, want) in checks.items() if got != want]
+            label = "tips committed" if committed else "tips lost"
+            if problems:
+                print(f"[ERROR] retry from fresh checkout ({label})  {'; '.join(problems)}")
+                failures.append(("retry", label))
+            else:
+                print(f"[OK] retry from fresh checkout ({label})  tip reused, new token registered")
+    finally:
+        os.chdir(original_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return not failures
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:2] == ["redact"]:
+        directory = Path(sys.argv[2]) if len(sys.argv) > 2 else RUN_STATE_DIR
+        print(f"Redacted tokens from {redact_tokens(directory)} run state file(s) in {directory}")
+        raise SystemExit(0)
+    raise SystemExit(0 if _self_check() else 1)
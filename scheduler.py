@@ -3,36 +3,40 @@ Scheduler for Python Tip Agent
 Runs the agent daily at a specified time
 """
 
+import logging
 import schedule
 import time
 import os
 from datetime import datetime
 from dotenv import load_dotenv
-from main_agent import PythonTipAgent
+from main_agent import run_daily
+from agent_logging import setup_logging
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 def run_daily_tip():
     """Execute the daily tip generation"""
-    print(f"\n⏰ Scheduled run triggered at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    agent = PythonTipAgent()
-    agent.generate_and_send_daily_tip()
+    logger.info("Scheduled run triggered at %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    # With a git run lease this is a no-op if the GitHub Action already ran today's slot
+    run_daily()
 
 
 def start_scheduler():
     """Start the scheduler"""
     # Get schedule time from environment or use default (9:00 AM)
     schedule_time = os.getenv("DAILY_RUN_TIME", "09:00")
-    
-    print("="*60)
-    print("🕐 Python Tip Agent Scheduler")
-    print("="*60)
-    print(f"📅 Scheduled to run daily at: {schedule_time}")
-    print(f"🚀 Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("="*60)
-    print("\n⏳ Waiting for scheduled time...")
-    print("   (Press Ctrl+C to stop)\n")
+    setup_logging()
+    from run_lease import create_lease_backend
+    backend = create_lease_backend()
+    if backend is None or backend.name != "git":
+        logger.warning("Run lease backend is '%s', which the GitHub Action can't see: both may run the same "
+                       "day. Add an origin remote (or GITHUB_REPO_URL) with RUN_LEASE_BACKEND=auto, "
+                       "or set RUN_LEASE_BACKEND=git", backend.name if backend else "none")
+
+    logger.info("Python Tip Agent Scheduler started; running daily at %s (Ctrl+C to stop)", schedule_time)
     
     # Schedule the daily job
     schedule.every().day.at(schedule_time).do(run_daily_tip)
@@ -43,8 +47,7 @@ def start_scheduler():
             schedule.run_pending()
             time.sleep(60)  # Check every minute
     except KeyboardInterrupt:
-        print("\n\n⛔ Scheduler stopped by user")
-        print("="*60)
+        logger.info("Scheduler stopped by user")
 
 
 if __name__ == "__main__":
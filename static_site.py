@@ -0,0 +1,372 @@
+"""
+Static Site Publisher for Python Tip Agent
+Renders approved tips to HTML with index, tag and search pages plus RSS/Atom feeds, rebuilding only changed pages
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+from xml.sax.saxutils import escape
+
+from tip_paths import TIPS_DIR
+from tip_renderer import RENDERER_VERSION
+
+
+SITE_DIR = Path(os.getenv("SITE_DIR", "site"))
+SITE_TITLE = os.getenv("SITE_TITLE", "Daily Python Tips")
+# Absolute URL the site is served from; feeds need it for item links
+SITE_BASE_URL = os.getenv("SITE_BASE_URL", "").rstrip("/")
+# Processes for rendering tip pages (0 = one per core)
+SITE_WORKERS = int(os.getenv("SITE_WORKERS", "0"))
+
+PAGE_SIZE = 100
+FEED_ITEMS = 20
+# Below this many changed tip pages, render in-process rather than start a pool
+PARALLEL_THRESHOLD = 64
+MANIFEST_NAME = ".manifest.json"
+
+# Tips in the pending store with these statuses have not been approved
+UNPUBLISHED_STATUSES = ("pending", "processing", "expired")
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "untagged"
+
+
+def _key(*parts) -> str:
+    """Content hash of a page's inputs (plus the renderer version)"""
+    payload = json.dumps([RENDERER_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _tip_key(tip: Dict) -> str:
+    """_key() for a tip page, without the JSON encoding (there is one per tip)"""
+    fields = (RENDERER_VERSION, tip["hash"], tip["headline"], tip["date"], tip["path"], "\x1e".join(tip["tags"]))
+    return hashlib.sha256("\x1f".join(fields).encode()).hexdigest()
+
+
+def _file_hash(name: str, stat: os.stat_result, sources: Dict[str, list], seen: Dict[str, list]) -> str:
+    """sha256 of a tip file, reusing the manifest's hash while size and mtime are unchanged"""
+    cached = sources.get(name)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        digest = cached[2]
+    else:
+        with open(name, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    seen[name] = [stat.st_size, stat.st_mtime_ns, digest]
+    return digest
+
+
+def _unpublished_filenames() -> set:
+    """Filenames still awaiting review (or never approved) in the pending store"""
+    from pending_store import PENDING_FILE, load_pending
+    if not PENDING_FILE.exists():
+        return set()
+    return {
+        entry["tip_data"].get("filename") for entry in load_pending().values()
+        if entry.get("status") in UNPUBLISHED_STATUSES and entry.get("tip_data")
+    }
+
+
+def collect_tips(history_file: Path, tips_dir: Path, sources: Dict[str, list], seen: Dict[str, list]) -> List[Dict]:
+    """
+    Published tips, oldest first
+
+    A tip is published when its history entry's file exists and it is not
+    waiting for review. Each record carries the hash of its file contents.
+    """
+    from tip_generator import load_history
+    from tip_paths import resolve_tip_path
+
+    unpublished = _unpublished_filenames()
+    tips = {}
+    for entry in load_history(str(history_file))["tips"]:
+        if entry.get("filename") in unpublished:
+            continue
+        # Stat the recorded path directly; resolving through pathlib costs more than the stat
+        name = entry.get("path")
+        try:
+            stat = os.stat(name) if name else None
+        except OSError:
+            stat = None
+        if stat is None:
+            path = resolve_tip_path(entry, tips_dir)
+            if not path.exists():
+                continue
+            name, stat = path.as_posix(), path.stat()
+        slug = name.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+        tags = list(entry.get("tags") or [])
+        if entry.get("topic") and entry["topic"] not in tags:
+            tags.append(entry["topic"])
+        tips[slug] = {
+            "slug": slug,
+            "headline": entry["headline"],
+            "date": entry.get("date", ""),
+            "tags": tags,
+            "path": name,
+            "hash": _file_hash(name, stat, sources, seen),
+        }
+    return sorted(tips.values(), key=lambda tip: (tip["date"], tip["slug"]))
+
+
+def _header(root: str) -> str:
+    return (
+        f'<header class="site"><h1><a href="{root}index.html">{html.escape(SITE_TITLE)}</a></h1>'
+        f'<nav><a href="{root}tags/index.html">Tags</a> · <a href="{root}search.html">Search</a> · '
+        f'<a href="{root}feed.xml">RSS</a> · <a href="{root}atom.xml">Atom</a></nav></header>'
+    )
+
+
+def _feed_links(root: str) -> str:
+    return (
+        f'<link rel="alternate" type="application/rss+xml" title="{html.escape(SITE_TITLE)}" href="{root}feed.xml">\n'
+        f'<link rel="alternate" type="application/atom+xml" title="{html.escape(SITE_TITLE)}" href="{root}atom.xml">\n'
+    )
+
+
+def _tip_list(tips: List[Dict], root: str) -> str:
+    items = "\n".join(
+        f'<li><a href="{root}tips/{tip["slug"]}.html">{html.escape(tip["headline"])}</a> '
+        f'<span class="meta">{html.escape(tip["date"][:10])}</span></li>'
+        for tip in tips
+    )
+    return f'<ul class="tips">\n{items}\n</ul>'
+
+
+def _archive_page(chunk: List[Dict], number: int, has_next: bool) -> str:
+    from tip_renderer import render_page
+    links = (f'<a href="page-{number - 1}.html">&larr; Older</a>' if number > 1 else "") + \
+        (f'<a href="page-{number + 1}.html">Newer &rarr;</a>' if has_next else "")
+    return render_page(
+        f"{SITE_TITLE} - page {number}",
+        _header("../") + f"<h2>All tips, page {number}</h2>\n{_tip_list(chunk, '../')}\n"
+        f'<nav class="pages">{links}</nav>',
+        "../style.css", _feed_links("../"),
+    )
+
+
+def _render_tip_pages(site_dir: str, tips: List[Dict]):
+    """Render and write tip pages (runs in worker processes for large rebuilds)"""
+    from tip_renderer import load_tip, render_page, render_tip
+    for tip in tips:
+        doc = load_tip(Path(tip["path"]))
+        doc["headline"] = tip["headline"]
+        body = _header("../") + render_tip(
+            doc, tip["date"], tip["tags"], tag_href=lambda tag: f"../tags/{_slug(tag)}.html"
+        )
+        output = Path(site_dir) / "tips" / f"{tip['slug']}.html"
+        output.write_text(render_page(tip["headline"], body, "../style.css", _feed_links("../")), encoding="utf-8")
+
+
+def _aware(date: str) -> datetime:
+    parsed = datetime.fromisoformat(date) if date else datetime.now()
+    return parsed if parsed.tzinfo else parsed.astimezone()
+
+
+def _feeds(tips: List[Dict]) -> Dict[str, str]:
+    """RSS 2.0 and Atom documents for the newest tips"""
+    from tip_renderer import load_tip, render_text
+    latest = list(reversed(tips[-FEED_ITEMS:]))
+    base = SITE_BASE_URL
+    rss_items, atom_entries = [], []
+    for tip in latest:
+        link = f"{base}/tips/{tip['slug']}.html"
+        summary = render_text(load_tip(Path(tip["path"]))["explanation"])
+        rss_items.append(
+            f"<item><title>{escape(tip['headline'])}</title><link>{escape(link)}</link>"
+            f"<guid isPermaLink=\"true\">{escape(link)}</guid>"
+            f"<pubDate>{format_datetime(_aware(tip['date']))}</pubDate>"
+            f"<description>{escape(summary)}</description></item>"
+        )
+        atom_entries.append(
+            f"<entry><title>{escape(tip['headline'])}</title><id>{escape(link)}</id>"
+            f"<link href=\"{escape(link)}\"/><updated>{_aware(tip['date']).isoformat()}</updated>"
+            f"<summary type=\"html\">{escape(summary)}</summary></entry>"
+        )
+    updated = _aware(latest[0]["date"]) if latest else _aware("")
+    rss = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>'
+        f"<title>{escape(SITE_TITLE)}</title><link>{escape(base)}/</link>"
+        f"<description>{escape(SITE_TITLE)}</description>"
+        f"<lastBuildDate>{format_datetime(updated)}</lastBuildDate>"
+        f"{''.join(rss_items)}</channel></rss>\n"
+    )
+    atom = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+        f"<title>{escape(SITE_TITLE)}</title><id>{escape(base)}/</id>"
+        f"<link href=\"{escape(base)}/atom.xml\" rel=\"self\"/><updated>{updated.isoformat()}</updated>"
+        f"{''.join(atom_entries)}</feed>\n"
+    )
+    return {"feed.xml": rss, "atom.xml": atom}
+
+
+_SEARCH_SCRIPT = """
+<script>
+fetch("search-index.json").then(r => r.json()).then(tips => {
+  const q = document.getElementById("q"), out = document.getElementById("results");
+  const esc = s => s.replace(/[&<>"]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]));
+  const show = () => {
+    const terms = q.value.toLowerCase().split(/\\s+/).filter(Boolean);
+    const hits = tips.filter(t => terms.every(term => (t.h + " " + t.t.join(" ")).toLowerCase().includes(term)));
+    out.innerHTML = hits.slice(0, 200).map(t =>
+      `<li><a href="tips/${t.s}.html">${esc(t.h)}</a> <span class="meta">${t.d}</span></li>`).join("");
+  };
+  q.addEventListener("input", show);
+  show();
+});
+</script>
+"""
+
+
+def build_site(site_dir: Path = SITE_DIR, history_file: Path = Path("tip_history.json"),
+               tips_dir: Path = TIPS_DIR, force: bool = False, workers: int = SITE_WORKERS) -> Dict:
+    """
+    Render the site, skipping pages whose inputs are unchanged
+
+    Every output page has a key: the hash of everything it is rendered from
+    (tip file contents, headlines, dates, tags, the renderer version). The
+    keys are kept in <site>/.manifest.json, so a rebuild renders only pages
+    whose key changed and deletes pages that are no longer produced. Tip
+    pages are rendered in a process pool when many changed.
+
+    Returns:
+        Counts of tips, pages rendered, pages removed, and elapsed seconds
+    """
+    from file_lock import atomic_write_text
+    from tip_renderer import STYLE, render_page
+
+    started = time.perf_counter()
+    site_dir = Path(site_dir)
+    manifest_file = site_dir / MANIFEST_NAME
+    manifest = {"outputs": {}, "sources": {}}
+    if manifest_file.exists() and not force:
+        try:
+            manifest = json.loads(manifest_file.read_text())
+        except ValueError:
+            pass
+    old_outputs = manifest.get("outputs", {})
+
+    seen_sources = {}
+    tips = collect_tips(history_file, tips_dir, manifest.get("sources", {}), seen_sources)
+    outputs: Dict[str, str] = {}
+    dirty_tips: List[Dict] = []
+    pages: Dict[str, Callable[[], str]] = {}
+
+    # One walk of the site instead of an exists() per page
+    existing = set()
+    if site_dir.exists():
+        prefix = len(str(site_dir)) + 1
+        for directory, _, files in os.walk(site_dir):
+            existing.update(os.path.join(directory, name)[prefix:].replace(os.sep, "/") for name in files)
+
+    def want(output: str, key: str, render=None) -> bool:
+        outputs[output] = key
+        if old_outputs.get(output) == key and output in existing:
+            return False
+        if render is not None:
+            pages[output] = render
+        return True
+
+    for tip in tips:
+        if want(f"tips/{tip['slug']}.html", _tip_key(tip)):
+            dirty_tips.append(tip)
+
+    listing = [{key: tip[key] for key in ("slug", "headline", "date")} for tip in tips]
+    page_count = max(1, -(-len(tips) // PAGE_SIZE))
+    latest = list(reversed(listing[-PAGE_SIZE:]))
+    want("index.html", _key("index", latest, page_count), lambda: render_page(
+        SITE_TITLE,
+        _header("") + f"<h2>Latest tips</h2>\n{_tip_list(latest, '')}\n"
+        f'<p><a href="archive/page-{page_count}.html">Browse all {len(tips)} tips</a></p>',
+        "style.css", _feed_links(""),
+    ))
+
+    # Archive pages hold fixed, oldest-first slices, so a new tip only touches the last page
+    for number in range(1, page_count + 1):
+        chunk = listing[(number - 1) * PAGE_SIZE:number * PAGE_SIZE]
+        has_next = number < page_count
+        want(f"archive/page-{number}.html", _key("archive", chunk, number, has_next),
+             lambda chunk=chunk, number=number, has_next=has_next: _archive_page(chunk, number, has_next))
+
+    by_tag: Dict[str, List[Dict]] = {}
+    for tip, item in zip(tips, listing):
+        for tag in tip["tags"]:
+            by_tag.setdefault(tag, []).append(item)
+    for tag, tagged in by_tag.items():
+        newest = list(reversed(tagged))
+        want(f"tags/{_slug(tag)}.html", _key("tag", tag, newest), lambda tag=tag, newest=newest: render_page(
+            f"{SITE_TITLE} - {tag}",
+            _header("../") + f"<h2>Tagged {html.escape(tag)}</h2>\n{_tip_list(newest, '../')}",
+            "../style.css", _feed_links("../"),
+        ))
+    tag_counts = sorted((tag, len(tagged)) for tag, tagged in by_tag.items())
+    want("tags/index.html", _key("tags", tag_counts), lambda: render_page(
+        f"{SITE_TITLE} - tags",
+        _header("../") + "<h2>Tags</h2>\n<ul class=\"tips\">\n" + "\n".join(
+            f'<li><a href="{_slug(tag)}.html">{html.escape(tag)}</a> <span class="meta">{count}</span></li>'
+            for tag, count in tag_counts
+        ) + "\n</ul>",
+        "../style.css", _feed_links("../"),
+    ))
+
+    search_index = [{"s": tip["slug"], "h": tip["headline"], "d": tip["date"][:10], "t": tip["tags"]} for tip in tips]
+    want("search-index.json", _key("search-index", search_index), lambda: json.dumps(search_index, separators=(",", ":")))
+    want("search.html", _key("search"), lambda: render_page(
+        f"{SITE_TITLE} - search",
+        _header("") + '<h2>Search</h2>\n<input id="q" type="search" placeholder="enumerate, dict, generators..." autofocus>'
+        '\n<ul class="tips" id="results"></ul>' + _SEARCH_SCRIPT,
+        "style.css", _feed_links(""),
+    ))
+    want("style.css", _key("style"), lambda: STYLE)
+
+    feed_inputs = [(tip["slug"], tip["headline"], tip["date"], tip["hash"]) for tip in tips[-FEED_ITEMS:]]
+    feed_key = _key("feeds", feed_inputs, SITE_TITLE, SITE_BASE_URL)
+    if want("feed.xml", feed_key) | want("atom.xml", feed_key):
+        documents = _feeds(tips)
+        pages["feed.xml"] = lambda: documents["feed.xml"]
+        pages["atom.xml"] = lambda: documents["atom.xml"]
+
+    for directory in ("tips", "archive", "tags"):
+        (site_dir / directory).mkdir(parents=True, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    if len(dirty_tips) >= PARALLEL_THRESHOLD and workers > 1:
+        size = -(-len(dirty_tips) // (workers * 4))
+        chunks = [dirty_tips[i:i + size] for i in range(0, len(dirty_tips), size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_render_tip_pages, [str(site_dir)] * len(chunks), chunks))
+    else:
+        _render_tip_pages(str(site_dir), dirty_tips)
+
+    for output, render in pages.items():
+        (site_dir / output).write_text(render(), encoding="utf-8")
+
+    removed = 0
+    for output in set(old_outputs) - set(outputs):
+        stale = site_dir / output
+        if stale.exists():
+            stale.unlink()
+            removed += 1
+
+    atomic_write_text(manifest_file, json.dumps({"outputs": outputs, "sources": seen_sources}))
+    return {
+        "tips": len(tips),
+        "rendered": len(dirty_tips) + len(pages),
+        "removed": removed,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    result = build_site(force="--full" in sys.argv)
+    print(f"[OK] {result['tips']} tips: rendered {result['rendered']} page(s), "
+          f"removed {result['removed']} in {result['seconds']}s -> {SITE_DIR}/")
@@ -0,0 +1,232 @@
+"""
+Generation Backends for Python Tip Agent
+Chat completion backends (OpenAI, OpenAI-compatible HTTP, offline synthesizer) selected by TIP_BACKEND
+"""
+
+import json
+import os
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+
+class ChatResult:
+    """Backend-neutral chat completion result"""
+
+    def __init__(self, contents: List[str], prompt_tokens: int = 0, completion_tokens: int = 0):
+        self.contents = contents
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    @property
+    def usage(self) -> Tuple[int, int]:
+        return self.prompt_tokens, self.completion_tokens
+
+
+def _usage(response) -> Tuple[int, int]:
+    """(prompt_tokens, completion_tokens) from an OpenAI-style response"""
+    usage = (response.get("usage") if hasattr(response, "get") else None) or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+class ChatBackend:
+    """
+    Base class for chat completion backends
+
+    Subclasses implement complete(); `billable` backends have their calls
+    recorded in the usage ledger and counted against token budgets.
+    """
+
+    name = "base"
+    billable = False
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @property
+    def available(self) -> bool:
+        """False when the backend is not configured (the fallback catalog is used instead)"""
+        return True
+
+    def complete(self, messages: List[Dict], json_mode: bool, n: int = 1,
+                 max_tokens: int = 500, temperature: float = 0.8) -> ChatResult:
+        raise NotImplementedError
+
+
+class OpenAIBackend(ChatBackend):
+    """OpenAI ChatCompletion API (openai==0.28 module-level client)"""
+
+    name = "openai"
+    billable = True
+
+    def __init__(self, model: str, api_key: Optional[str] = None):
+        super().__init__(model)
+        self.api_key = api_key
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def complete(self, messages, json_mode, n=1, max_tokens=500, temperature=0.8):
+        import openai
+        openai.api_key = self.api_key
+
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+        response = openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            n=n,
+            **extra
+        )
+        contents = [choice.message.content.strip() for choice in response.choices]
+        return ChatResult(contents, *_usage(response))
+
+
+class HTTPBackend(ChatBackend):
+    """
+    Any OpenAI-compatible /chat/completions endpoint over plain HTTP
+
+    Works with local model servers and with the stub server in
+    benchmarks/stub_chat_server.py; needs no client library.
+    """
+
+    name = "http"
+    billable = True
+
+    def __init__(self, model: str, url: Optional[str] = None, api_key: Optional[str] = None,
+                 timeout: float = 60.0):
+        super().__init__(model)
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+
+    @property
+    def available(self) -> bool:
+        return bool(self.url)
+
+    def complete(self, messages, json_mode, n=1, max_tokens=500, temperature=0.8):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "n": n,
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode("utf-8"), headers=headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = json.loads(response.read())
+        contents = [choice["message"]["content"].strip() for choice in body["choices"]]
+        return ChatResult(contents, *_usage(body))
+
+
+class OfflineBackend(ChatBackend):
+    """
+    Deterministic synthesizer built from the fallback catalog
+
+    Needs no network or API key. Choice k of the whole run is catalog entry
+    k mod len(catalog); later passes over the catalog get a "(variation N)"
+    suffix so headlines stay unique. The same seed always produces the same
+    sequence, which makes it suitable for load tests and reproducible runs.
+    """
+
+    name = "offline"
+    billable = False
+
+    def __init__(self, model: str = "offline", seed: int = 0, catalog=None):
+        super().__init__(model)
+        self.seed = seed
+        self.catalog = catalog
+        self._entries = None
+        self._counter = 0
+
+    def _load_entries(self) -> List[Dict[str, str]]:
+        if self._entries is None:
+            catalog = self.catalog
+            if catalog is None:
+                from fallback_catalog import FallbackCatalog
+                catalog = FallbackCatalog()
+            self._entries = list(catalog.iter_entries())
+            if not self._entries:
+                raise ValueError("offline backend needs a non-empty fallback catalog")
+        return self._entries
+
+    def synthesize(self, index: int) -> Dict:
+        """Tip fields for the index-th choice"""
+        from topic_planner import classify
+
+        entries = self._load_entries()
+        position = self.seed + index
+        entry = entries[position % len(entries)]
+        variation = position // len(entries)
+        headline = entry["headline"]
+        if variation:
+            headline = f"{headline} (variation {variation})"
+        topic = classify(entry["shortname"])
+        return {
+            "headline": headline,
+            "explanation": entry["explanation"],
+            "code": entry["code"],
+            "tags": [topic] if topic else ["python"],
+            "complexity": "intermediate",
+        }
+
+    def complete(self, messages, json_mode, n=1, max_tokens=500, temperature=0.8):
+        contents = []
+        for _ in range(n):
+            fields = self.synthesize(self._counter)
+            self._counter += 1
+            if json_mode:
+                contents.append(json.dumps(fields))
+            else:
+                contents.append(f"HEADLINE: {fields['headline']}\n"
+                                f"EXPLANATION: {fields['explanation']}\n"
+                                f"CODE:\n{fields['code']}")
+        # Rough 4-characters-per-token estimate so usage reports stay meaningful
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        completion_tokens = sum(len(content) for content in contents) // 4
+        return ChatResult(contents, prompt_tokens, completion_tokens)
+
+
+BACKENDS = {
+    OpenAIBackend.name: OpenAIBackend,
+    HTTPBackend.name: HTTPBackend,
+    OfflineBackend.name: OfflineBackend,
+}
+
+
+def create_backend(name: Optional[str] = None, model: Optional[str] = None) -> ChatBackend:
+    """
+    Build the backend named by `name` or TIP_BACKEND (default "openai")
+
+    Raises:
+        ValueError for an unknown backend name
+    """
+    name = (name or os.getenv("TIP_BACKEND", "openai")).lower()
+    model = model or os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    if name == "openai":
+        return OpenAIBackend(model, api_key=os.getenv("OPENAI_API_KEY"))
+    if name == "http":
+        return HTTPBackend(
+            model,
+            url=os.getenv("TIP_BACKEND_URL"),
+            api_key=os.getenv("TIP_BACKEND_API_KEY"),
+            timeout=float(os.getenv("TIP_BACKEND_TIMEOUT", "60")),
+        )
+    if name == "offline":
+        return OfflineBackend(seed=int(os.getenv("OFFLINE_BACKEND_SEED", "0")))
+    raise ValueError(f"Unknown TIP_BACKEND '{name}' (expected one of: {', '.join(BACKENDS)})")
+
+
+if __name__ == "__main__":
+    backend = OfflineBackend()
+    result = backend.complete([{"role": "user", "content": "tip please"}], json_mode=True, n=2)
+    for content in result.contents:
+        print(json.loads(content)["headline"])
+    print(f"usage: {result.usage}")
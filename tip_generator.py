@@ -3,13 +3,115 @@ Python Tip Generator Agent
 Generates daily Python tips with code snippets using OpenAI API
 """
 
+import logging
 import os
 import re
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict
-import openai
+
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are a Python expert who creates helpful programming tips."
+
+TEXT_PROMPT = """Generate a unique and useful Python programming tip that includes:
+1. A clear, concise headline (max 10 words)
+2. A brief explanation (2-3 sentences)
+3. A practical code example demonstrating the tip
+4. Comments explaining the code
+
+Format your response as:
+HEADLINE: [headline]
+EXPLANATION: [explanation]
+CODE:
+[code here]
+
+Focus on practical, intermediate-level Python tips that developers find valuable."""
+
+JSON_PROMPT = """Generate a unique and useful Python programming tip.
+
+Respond with a single JSON object and nothing else, with exactly these keys:
+  "headline": a clear, concise headline (max 10 words)
+  "explanation": a brief explanation (2-3 sentences)
+  "code": a practical code example with comments explaining it
+  "tags": a list of 1-5 short lowercase tags
+  "complexity": one of "beginner", "intermediate", "advanced"
+
+Focus on practical, intermediate-level Python tips that developers find valuable."""
+
+COMPLEXITY_LEVELS = ("beginner", "intermediate", "advanced")
+
+MAX_COMPLETION_TOKENS = 500
+
+
+def parse_tip_json(content: str) -> Dict:
+    """
+    Parse and validate a JSON-mode tip response
+    
+    Raises:
+        ValueError describing the first problem found
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON ({e.msg} at position {e.pos})")
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    
+    fields = {}
+    for key in ("headline", "explanation", "code"):
+        value = data.get(key)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f'"{key}" must be a non-empty string')
+        fields[key] = value.strip()
+    
+    tags = data.get("tags", [])
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError('"tags" must be a list of strings')
+    fields["tags"] = [tag.strip().lower() for tag in tags if tag.strip()][:5]
+    
+    complexity = data.get("complexity", "intermediate")
+    if complexity not in COMPLEXITY_LEVELS:
+        raise ValueError(f'"complexity" must be one of {", ".join(COMPLEXITY_LEVELS)}')
+    fields["complexity"] = complexity
+    return fields
+
+
+def parse_tip_text(content: str) -> Dict[str, str]:
+    """Parse a HEADLINE:/EXPLANATION:/CODE: formatted response"""
+    lines = content.split('\n')
+    headline = ""
+    explanation = ""
+    code_lines = []
+    current_section = None
+    
+    for line in lines:
+        if line.startswith("HEADLINE:"):
+            headline = line.replace("HEADLINE:", "").strip()
+            current_section = "headline"
+        elif line.startswith("EXPLANATION:"):
+            explanation = line.replace("EXPLANATION:", "").strip()
+            current_section = "explanation"
+        elif line.startswith("CODE:"):
+            current_section = "code"
+        elif current_section == "code":
+            code_lines.append(line)
+        elif current_section == "explanation" and line.strip():
+            explanation += " " + line.strip()
+    
+    return {"headline": headline, "explanation": explanation, "code": "\n".join(code_lines).strip()}
+
+
+def load_history(history_file: str = "tip_history.json") -> Dict:
+    """Load history of generated tips"""
+    path = Path(history_file)
+    if path.exists():
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {"tips": []}
 
 
 class TipGenerator:
@@ -20,24 +122,54 @@ class TipGenerator:
         self.tips_directory.mkdir(exist_ok=True)
         self.history_file = Path(history_file)
         self.history = self._load_history()
+        # Shortname set for constant-time duplicate checks; kept in sync by save_tip
+        self._shortnames = {tip.get("shortname") for tip in self.history["tips"]}
+        # Names of tip files in every shard, scanned on first use and kept in sync by save_tip
+        self._tip_filenames = None
+        # Topic coverage counts, computed on first use and kept in sync by save_tip
+        self._topic_counts = None
         
-        # Initialize OpenAI API
+        # OpenAI API key; the client library is imported on first API call
         self.api_key = os.getenv("OPENAI_API_KEY")
-        if self.api_key:
-            openai.api_key = self.api_key
+        
+        self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        
+        # Chat backend: "openai", "http" (OpenAI-compatible endpoint) or "offline" (see tip_backends.py)
+        self.backend_name = os.getenv("TIP_BACKEND", "openai").lower()
+        self._backend = None
+        
+        # "json" asks for a schema-constrained JSON object; "text" uses HEADLINE:/CODE: prefixes
+        self.output_format = os.getenv("TIP_OUTPUT_FORMAT", "json").lower()
+        
+        # Best-of-N: request this many candidates per call and keep the best-scoring one
+        self.candidates = max(1, int(os.getenv("TIP_CANDIDATES", "3")))
+        
+        # Steer the prompt toward under-covered topics (see topic_planner.py)
+        self.use_topic_planner = os.getenv("TOPIC_PLANNER", "True").lower() == "true"
+    
+    @property
+    def backend(self):
+        if self._backend is None:
+            from tip_backends import create_backend
+            self._backend = create_backend(self.backend_name, self.model)
+        return self._backend
     
     def _load_history(self) -> Dict:
         """Load history of generated tips"""
-        if self.history_file.exists():
-            with open(self.history_file, 'r') as f:
-                return json.load(f)
-        return {"tips": []}
+        return load_history(self.history_file)
     
     def _save_history(self):
         """Save history of generated tips"""
         with open(self.history_file, 'w') as f:
             json.dump(self.history, f, indent=2)
     
+    def _coverage(self):
+        """Topic coverage of history and tips directory (see topic_planner.coverage)"""
+        if self._topic_counts is None:
+            from topic_planner import coverage
+            self._topic_counts = coverage(self.history, self.tips_directory)
+        return self._topic_counts
+    
     def _slugify(self, text: str) -> str:
         """Convert text to a slug format"""
         # Convert to lowercase and replace spaces with underscores
@@ -51,79 +183,214 @@ class TipGenerator:
     def _is_duplicate(self, shortname: str) -> bool:
         """Check if a tip with this shortname already exists"""
         # Check in history
-        for tip in self.history["tips"]:
-            if tip.get("shortname") == shortname:
-                return True
+        if shortname in self._shortnames:
+            return True
         
-        # Check if file exists
-        filename = f"Python_tip_{shortname}.ipynb"
-        return (self.tips_directory / filename).exists()
+        # Check for a file of that name in the flat directory or any month's shard,
+        # which catches tips whose history entry is missing
+        if self._tip_filenames is None:
+            from tip_paths import iter_tip_files
+            self._tip_filenames = {path.name for path in iter_tip_files(self.tips_directory)}
+        return f"Python_tip_{shortname}.ipynb" in self._tip_filenames
+    
+    def estimated_call_tokens(self) -> int:
+        """Upper-bound token estimate for one generation call, used for budgeting"""
+        prompt_estimate = 400
+        return prompt_estimate + MAX_COMPLETION_TOKENS * self.candidates
     
-    def generate_tip(self) -> Optional[Dict[str, str]]:
+    def generate_tip(self, use_api: bool = True) -> Optional[Dict[str, str]]:
         """
-        Generate a new Python tip using OpenAI API
+        Generate a new Python tip using the configured chat backend
+        
+        Args:
+            use_api: False forces the fallback catalog (e.g. token budget exhausted)
+        
         Returns: Dict with 'headline', 'shortname', 'content', 'filename'
         """
-        if not self.api_key:
-            # Fallback to predefined tips if no API key
+        if not use_api or not self.backend.available:
+            # Fallback to predefined tips if the backend is not configured
             return self._generate_fallback_tip()
         
         try:
-            prompt = """Generate a unique and useful Python programming tip that includes:
-1. A clear, concise headline (max 10 words)
-2. A brief explanation (2-3 sentences)
-3. A practical code example demonstrating the tip
-4. Comments explaining the code
-
-Format your response as:
-HEADLINE: [headline]
-EXPLANATION: [explanation]
-CODE:
-[code here]
+            json_mode = self.output_format == "json"
+            prompt = JSON_PROMPT if json_mode else TEXT_PROMPT
 
-Focus on practical, intermediate-level Python tips that developers find valuable."""
+            topic = None
+            if self.use_topic_planner:
+                from topic_planner import TopicPlanner
+                planner = TopicPlanner(self.history, self.tips_directory, counts=self._coverage())
+                topic = planner.choose_topic()
+                prompt += "\n\n" + planner.prompt_addendum(topic)
 
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a Python expert who creates helpful programming tips."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,
-                max_tokens=500
-            )
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+            # One request returns all N candidates, so best-of-N costs one round trip
+            result = self._chat(messages, json_mode, n=self.candidates)
+            prompt_tokens, completion_tokens = result.usage
+            
+            candidates, repair_usage = self._parse_candidates(messages, result.contents, json_mode)
+            prompt_tokens += repair_usage[0]
+            completion_tokens += repair_usage[1]
+            candidates = self._validate_candidates(candidates)
             
-            content = response.choices[0].message.content.strip()
-            return self._parse_api_response(content)
+            from tip_scoring import rank_candidates
+            scores, fields = rank_candidates(candidates, self.history)[0]
+            tip_data = self._build_tip(**fields, scores=scores)
+            self._record_generation(tip_data, topic, prompt_tokens, completion_tokens)
+            return tip_data
             
         except Exception as e:
-            print(f"Error generating tip with API: {e}")
+            logger.warning("Error generating tip with API (%s); using the fallback catalog", e)
             return self._generate_fallback_tip()
     
+    def _chat(self, messages, json_mode: bool, n: int = 1, purpose: str = "generate"):
+        """Single chat completion call, optionally returning n choices"""
+        started = time.perf_counter()
+        result = self.backend.complete(
+            messages,
+            json_mode,
+            n=n,
+            max_tokens=MAX_COMPLETION_TOKENS,
+            temperature=0.8
+        )
+        if self.backend.billable:
+            from usage_ledger import record_call
+            record_call(self.backend.model, purpose, *result.usage, time.perf_counter() - started)
+        return result
+    
+    def _parse_candidates(self, messages, contents, json_mode: bool):
+        """
+        Parse every returned choice, keeping the valid ones
+        
+        In JSON mode a repair request is only made when no choice is valid.
+        
+        Returns:
+            (list of parsed fields, (repair prompt tokens, repair completion tokens))
+        """
+        if not json_mode:
+            return [parse_tip_text(content) for content in contents], (0, 0)
+        
+        from generation_stats import record_parse
+        
+        candidates, invalid = [], []
+        for content in contents:
+            try:
+                candidates.append(parse_tip_json(content))
+                record_parse("json", failed=False)
+            except ValueError:
+                invalid.append(content)
+        
+        if candidates:
+            for _ in invalid:
+                record_parse("json", failed=True)
+            return candidates, (0, 0)
+        
+        for _ in invalid[1:]:
+            record_parse("json", failed=True)
+        fields, repair_usage = self._parse_json_with_repair(messages, invalid[0])
+        return [fields], repair_usage
+    
+    def _validate_candidates(self, candidates):
+        """
+        Run the AST validation gate over parsed candidates
+        
+        Leftover markdown fences are repaired in place. In strict mode
+        candidates with errors are dropped before anything is written or
+        emailed; in warn mode they are kept and the errors printed.
+        
+        Raises:
+            ValueError if no candidate passes
+        """
+        from code_validator import CODE_VALIDATION, validate_code
+        from generation_stats import record_validation
+        
+        if CODE_VALIDATION == "off":
+            return candidates
+        
+        passed = []
+        for fields in candidates:
+            result = validate_code(fields["code"])
+            record_validation(result)
+            fields["code"] = result["code"]
+            fields["validation"] = {
+                "imports": result["imports"],
+                "min_python": result["min_python"],
+                "warnings": result["warnings"] + result["repairs"] + result["errors"],
+            }
+            if result["errors"]:
+                logger.warning("Generated code failed validation: %s", "; ".join(result["errors"]))
+                if CODE_VALIDATION == "strict":
+                    continue
+            passed.append(fields)
+        
+        if not passed:
+            raise ValueError("no candidate passed code validation")
+        return passed
+    
+    def _parse_json_with_repair(self, messages, content: str):
+        """
+        Parse a JSON-mode response, asking the model once to fix it on failure
+        
+        Returns:
+            (validated fields, (repair prompt tokens, repair completion tokens))
+        
+        Raises:
+            ValueError if the repaired response is still invalid
+        """
+        from generation_stats import record_parse
+        
+        try:
+            fields = parse_tip_json(content)
+            record_parse("json", failed=False)
+            return fields, (0, 0)
+        except ValueError as e:
+            error = e
+        
+        logger.warning("Invalid JSON response (%s), requesting repair", error)
+        repair_messages = messages + [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": f"That reply was not valid: {error}. "
+                                        "Reply with only the corrected JSON object using the required keys."}
+        ]
+        repair = self._chat(repair_messages, True, purpose="repair")
+        repair_usage = repair.usage
+        try:
+            fields = parse_tip_json(repair.contents[0])
+        except ValueError:
+            record_parse("json", failed=True, repaired=False, repair_tokens=sum(repair_usage))
+            raise
+        record_parse("json", failed=True, repaired=True, repair_tokens=sum(repair_usage))
+        return fields, repair_usage
+    
+    def _record_generation(self, tip_data: Dict[str, str], topic: Optional[str],
+                           prompt_tokens: int, completion_tokens: int):
+        """Record whether a paid completion was a repeat, and what it cost"""
+        from topic_planner import classify
+        from generation_stats import record_generation
+        
+        # Only a real repeat counts: _build_tip renamed the shortname because
+        # the same headline (or one slugifying identically) already exists.
+        # Landing in an already-covered topic is not a repeat; counting it
+        # would push the rate toward 100% as coverage grows.
+        tip_topic = classify(tip_data["shortname"])
+        duplicate = tip_data["shortname"] != self._slugify(tip_data["headline"])
+        tip_data["topic"] = tip_topic or topic or ""
+        
+        record_generation(
+            "planned" if topic else "unplanned",
+            duplicate,
+            prompt_tokens,
+            completion_tokens
+        )
+    
     def _parse_api_response(self, content: str) -> Dict[str, str]:
         """Parse the API response into structured format"""
-        lines = content.split('\n')
-        headline = ""
-        explanation = ""
-        code_lines = []
-        current_section = None
-        
-        for line in lines:
-            if line.startswith("HEADLINE:"):
-                headline = line.replace("HEADLINE:", "").strip()
-                current_section = "headline"
-            elif line.startswith("EXPLANATION:"):
-                explanation = line.replace("EXPLANATION:", "").strip()
-                current_section = "explanation"
-            elif line.startswith("CODE:"):
-                current_section = "code"
-            elif current_section == "code":
-                code_lines.append(line)
-            elif current_section == "explanation" and line.strip():
-                explanation += " " + line.strip()
-        
-        code = "\n".join(code_lines).strip()
-        
+        return self._build_tip(**parse_tip_text(content))
+    
+    def _build_tip(self, headline: str, explanation: str, code: str, **extra) -> Dict[str, str]:
+        """Build the tip dict and notebook for parsed fields"""
         # Generate shortname and check for duplicates
         shortname = self._slugify(headline)
         counter = 1
@@ -134,46 +401,12 @@ Focus on practical, intermediate-level Python tips that developers find valuable
         
         filename = f"Python_tip_{shortname}.ipynb"
         
-        # Create Jupyter notebook content
-        notebook_content = {
-            "cells": [
-                {
-                    "cell_type": "markdown",
-                    "metadata": {},
-                    "source": [
-                        f"# Python Tip: {headline}\n",
-                        "\n",
-                        f"{explanation}\n",
-                        "\n",
-                        f"**Generated on:** {datetime.now().strftime('%Y-%m-%d')}"
-                    ]
-                },
-                {
-                    "cell_type": "code",
-                    "execution_count": None,
-                    "metadata": {},
-                    "outputs": [],
-                    "source": code.split('\n')
-                }
-            ],
-            "metadata": {
-                "kernelspec": {
-                    "display_name": "Python 3",
-                    "language": "python",
-                    "name": "python3"
-                },
-                "language_info": {
-                    "name": "python",
-                    "version": "3.12.0"
-                }
-            },
-            "nbformat": 4,
-            "nbformat_minor": 4
-        }
-        
-        full_content = json.dumps(notebook_content, indent=2)
+        # Canonical nbformat text: identical tips serialize to identical bytes,
+        # and the generation date lives in tip_history.json, not the notebook
+        from notebook_format import build_notebook, serialize_notebook
+        full_content = serialize_notebook(build_notebook(headline, explanation, code))
         
-        return {
+        tip_data = {
             "headline": headline,
             "shortname": shortname,
             "content": full_content,
@@ -182,194 +415,50 @@ Focus on practical, intermediate-level Python tips that developers find valuable
             "code": code,
             "explanation": explanation
         }
+        tip_data.update(extra)
+        return tip_data
     
-    def _generate_fallback_tip(self) -> Dict[str, str]:
-        """Generate a fallback tip when API is not available"""
-        tips = [
-            {
-                "headline": "Using enumerate for index and value",
-                "explanation": "Instead of using range(len()), use enumerate() to get both index and value when iterating over a sequence. This is more Pythonic and readable.",
-                "code": '''# Bad approach
-items = ['apple', 'banana', 'cherry']
-for i in range(len(items)):
-    print(f"{i}: {items[i]}")
-
-# Better approach with enumerate
-items = ['apple', 'banana', 'cherry']
-for index, item in enumerate(items):
-    print(f"{index}: {item}")
-
-# Start counting from 1 instead of 0
-for index, item in enumerate(items, start=1):
-    print(f"{index}: {item}")'''
-            },
-            {
-                "headline": "Dictionary get method with default value",
-                "explanation": "Use the get() method to safely retrieve dictionary values with a default fallback, avoiding KeyError exceptions.",
-                "code": '''# Without get() - may raise KeyError
-user = {'name': 'Alice', 'age': 30}
-# email = user['email']  # This would raise KeyError
-
-# With get() - returns None if key doesn't exist
-email = user.get('email')
-print(f"Email: {email}")  # Email: None
-
-# With get() and custom default value
-email = user.get('email', 'not provided')
-print(f"Email: {email}")  # Email: not provided'''
-            },
-            {
-                "headline": "List comprehension for cleaner code",
-                "explanation": "Use list comprehensions instead of loops for creating lists. They are more concise, readable, and often faster.",
-                "code": '''# Traditional approach with loop
-squares = []
-for i in range(10):
-    squares.append(i ** 2)
-
-# Better approach with list comprehension
-squares = [i ** 2 for i in range(10)]
-
-# With conditional filtering
-even_squares = [i ** 2 for i in range(10) if i % 2 == 0]
-print(even_squares)  # [0, 4, 16, 36, 64]'''
-            },
-            {
-                "headline": "Using f-strings for formatting",
-                "explanation": "F-strings (formatted string literals) provide a concise and readable way to embed expressions inside string literals. They're faster and more readable than older formatting methods.",
-                "code": '''name = "Alice"
-age = 30
-city = "Paris"
-
-# Old way with %
-message = "My name is %s, I'm %d years old, from %s" % (name, age, city)
-
-# Better with .format()
-message = "My name is {}, I'm {} years old, from {}".format(name, age, city)
-
-# Best with f-strings (Python 3.6+)
-message = f"My name is {name}, I'm {age} years old, from {city}"
-print(message)
-
-# F-strings can include expressions
-print(f"Next year I'll be {age + 1} years old")'''
-            },
-            {
-                "headline": "Context managers with statement",
-                "explanation": "Use context managers (with statement) to ensure resources are properly managed and cleaned up, even if exceptions occur. Most commonly used with file operations.",
-                "code": '''# Without context manager (bad practice)
-file = open('example.txt', 'r')
-data = file.read()
-file.close()  # What if an error occurs before this?
-
-# With context manager (recommended)
-with open('example.txt', 'r') as file:
-    data = file.read()
-    # File automatically closes when leaving the block
-
-# Multiple context managers
-with open('input.txt', 'r') as infile, open('output.txt', 'w') as outfile:
-    for line in infile:
-        outfile.write(line.upper())'''
-            },
-            {
-                "headline": "Using *args and **kwargs",
-                "explanation": "*args allows a function to accept any number of positional arguments, while **kwargs allows any number of keyword arguments. These make functions more flexible.",
-                "code": '''# *args for variable positional arguments
-def sum_all(*args):
-    return sum(args)
-
-print(sum_all(1, 2, 3))  # 6
-print(sum_all(1, 2, 3, 4, 5))  # 15
-
-# **kwargs for variable keyword arguments
-def print_info(**kwargs):
-    for key, value in kwargs.items():
-        print(f"{key}: {value}")
-
-print_info(name="Alice", age=30, city="Paris")
-
-# Combining regular args with *args and **kwargs
-def flexible_function(required, *args, default="yes", **kwargs):
-    print(f"Required: {required}")
-    print(f"Args: {args}")
-    print(f"Default: {default}")
-    print(f"Kwargs: {kwargs}")
-
-flexible_function("must have", 1, 2, 3, default="no", extra="data")'''
-            }
-        ]
-        
-        # Select a tip that hasn't been used yet
-        for tip_template in tips:
-            shortname = self._slugify(tip_template["headline"])
-            if not self._is_duplicate(shortname):
-                filename = f"Python_tip_{shortname}.ipynb"
-                
-                # Create Jupyter notebook content
-                notebook_content = {
-                    "cells": [
-                        {
-                            "cell_type": "markdown",
-                            "metadata": {},
-                            "source": [
-                                f"# Python Tip: {tip_template['headline']}\n",
-                                "\n",
-                                f"{tip_template['explanation']}\n",
-                                "\n",
-                                f"**Generated on:** {datetime.now().strftime('%Y-%m-%d')}"
-                            ]
-                        },
-                        {
-                            "cell_type": "code",
-                            "execution_count": None,
-                            "metadata": {},
-                            "outputs": [],
-                            "source": tip_template["code"].split('\n')
-                        }
-                    ],
-                    "metadata": {
-                        "kernelspec": {
-                            "display_name": "Python 3",
-                            "language": "python",
-                            "name": "python3"
-                        },
-                        "language_info": {
-                            "name": "python",
-                            "version": "3.12.0"
-                        }
-                    },
-                    "nbformat": 4,
-                    "nbformat_minor": 4
-                }
-                
-                full_content = json.dumps(notebook_content, indent=2)
-                
-                return {
-                    "headline": tip_template["headline"],
-                    "shortname": shortname,
-                    "content": full_content,
-                    "filename": filename,
-                    "date": datetime.now().isoformat(),
-                    "code": tip_template["code"],
-                    "explanation": tip_template["explanation"]
-                }
-        
-        return None
+    def _generate_fallback_tip(self) -> Optional[Dict[str, str]]:
+        """Generate a fallback tip from the offline catalog when API is not available"""
+        from fallback_catalog import FallbackCatalog
+        entry = FallbackCatalog().next_unused(self._is_duplicate)
+        if entry is None:
+            return None
+        return self._build_tip(entry["headline"], entry["explanation"], entry["code"])
     
     def save_tip(self, tip_data: Dict[str, str]) -> Path:
-        """Save the tip to a file and update history"""
-        filepath = self.tips_directory / tip_data["filename"]
+        """Save the tip to a file (tips/YYYY/MM/ in the sharded layout) and update history"""
+        from tip_paths import tip_path
+        filepath = tip_path(tip_data, self.tips_directory)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        tip_data["path"] = filepath.as_posix()
         
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(tip_data["content"])
+        if self._tip_filenames is not None:
+            self._tip_filenames.add(filepath.name)
         
         # Update history
-        self.history["tips"].append({
+        entry = {
             "headline": tip_data["headline"],
             "shortname": tip_data["shortname"],
             "filename": tip_data["filename"],
+            "path": tip_data["path"],
             "date": tip_data["date"]
-        })
+        }
+        for key in ("topic", "tags", "complexity", "scores", "validation"):
+            if tip_data.get(key):
+                entry[key] = tip_data[key]
+        if entry["shortname"] in self._shortnames:
+            # Saving the same tip again (a resumed run) only rewrites the file
+            return filepath
+        self.history["tips"].append(entry)
+        self._shortnames.add(entry["shortname"])
+        if self._topic_counts is not None:
+            from topic_planner import classify
+            topic = entry.get("topic") if entry.get("topic") in self._topic_counts else classify(entry["shortname"])
+            if topic:
+                self._topic_counts[topic] += 1
         self._save_history()
         
         return filepath
@@ -377,6 +466,8 @@ flexible_function("must have", 1, 2, 3, default="no", extra="data")'''
 
 if __name__ == "__main__":
     # Test the tip generator
+    from agent_logging import setup_logging
+    setup_logging()
     generator = TipGenerator()
     tip = generator.generate_tip()
     
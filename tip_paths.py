@@ -0,0 +1,140 @@
+"""
+Tip File Layout for Python Tip Agent
+Maps tips to sharded tips/YYYY/MM/ paths, resolves files in either layout, and migrates flat directories
+"""
+
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator
+
+
+TIPS_DIR = Path(os.getenv("TIPS_DIR", "tips"))
+
+# "sharded" puts new tips in tips/YYYY/MM/; "flat" keeps everything in tips/
+TIPS_LAYOUT = os.getenv("TIPS_LAYOUT", "sharded").lower()
+
+TIP_SUFFIXES = (".ipynb", ".py")
+
+_SHARD_PART = re.compile(r"^\d{4}$|^\d{2}$")
+_DATE_PREFIX = re.compile(r"^(\d{4})(\d{2})\d{2}_")
+_TIP_FILENAME = re.compile(r"^(?:\d{8}_)?Python_tip_(.+?)(?:\.ipynb|\.py)$")
+
+logger = logging.getLogger(__name__)
+
+
+def shard_for(date: str) -> str:
+    """'YYYY/MM' shard for an ISO date or datetime string"""
+    return f"{date[:4]}/{date[5:7]}"
+
+
+def tip_shortname(filename: str) -> str:
+    """Shortname a tip filename encodes, with or without a YYYYMMDD_ prefix"""
+    match = _TIP_FILENAME.match(filename)
+    return match.group(1) if match else Path(filename).stem
+
+
+def tip_path(tip_data: Dict, tips_dir: Path = TIPS_DIR, layout: str = None) -> Path:
+    """Where a new tip should be written under the configured layout"""
+    if (layout or TIPS_LAYOUT) == "sharded" and tip_data.get("date"):
+        return Path(tips_dir) / shard_for(tip_data["date"]) / tip_data["filename"]
+    return Path(tips_dir) / tip_data["filename"]
+
+
+def resolve_tip_path(tip_data: Dict, tips_dir: Path = TIPS_DIR) -> Path:
+    """
+    Find a tip's file in either layout
+
+    Checks the recorded "path" first, then the date shard, then the flat
+    directory. If none exists, returns the path the tip would be written to
+    so callers can report it.
+    """
+    candidates = []
+    if tip_data.get("path"):
+        candidates.append(Path(tip_data["path"]))
+    if tip_data.get("date"):
+        candidates.append(Path(tips_dir) / shard_for(tip_data["date"]) / tip_data["filename"])
+    candidates.append(Path(tips_dir) / tip_data["filename"])
+    for candidate in candidates:
+        if candidate.exists():
+            return candidate
+    return candidates[0]
+
+
+def iter_tip_files(tips_dir: Path = TIPS_DIR) -> Iterator[Path]:
+    """
+    Every tip file in the flat directory and in YYYY/MM shards
+
+    Uses os.scandir and only descends into shard-shaped directories, so it
+    skips __pycache__ and friends and avoids a full recursive glob.
+    """
+    tips_dir = Path(tips_dir)
+    if not tips_dir.exists():
+        return
+    stack = [(tips_dir, 0)]
+    while stack:
+        directory, depth = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if depth < 2 and _SHARD_PART.match(entry.name):
+                        stack.append((Path(entry.path), depth + 1))
+                elif entry.name.endswith(TIP_SUFFIXES):
+                    yield Path(entry.path)
+
+
+def _migration_date(path: Path, history_dates: Dict[str, str]) -> str:
+    """Date used to shard a flat file: history entry, YYYYMMDD_ prefix, then mtime"""
+    if path.name in history_dates:
+        return history_dates[path.name]
+    match = _DATE_PREFIX.match(path.name)
+    if match:
+        return f"{match.group(1)}-{match.group(2)}-01"
+    return datetime.fromtimestamp(path.stat().st_mtime).isoformat()
+
+
+def migrate_to_sharded(tips_dir: Path = TIPS_DIR, history_file: Path = Path("tip_history.json"),
+                       dry_run: bool = False) -> int:
+    """
+    Move flat tip files into tips/YYYY/MM/ and record their paths in history
+
+    Safe to run repeatedly; files already in shards are left alone.
+
+    Returns:
+        Number of files moved (or that would be moved with dry_run)
+    """
+    tips_dir = Path(tips_dir)
+    history_file = Path(history_file)
+    history = {"tips": []}
+    if history_file.exists():
+        with open(history_file, 'r') as f:
+            history = json.load(f)
+    history_dates = {tip["filename"]: tip["date"] for tip in history["tips"] if tip.get("date")}
+
+    moves = {}
+    if tips_dir.exists():
+        with os.scandir(tips_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(TIP_SUFFIXES):
+                    source = Path(entry.path)
+                    moves[entry.name] = (source, tips_dir / shard_for(_migration_date(source, history_dates)) / entry.name)
+
+    for name, (source, target) in sorted(moves.items()):
+        logger.info("%s %s -> %s", "Would move" if dry_run else "Moving", source, target)
+        if not dry_run:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, target)
+
+    # Record the new path of every history entry whose file moved
+    changed = False
+    for tip in history["tips"]:
+        if tip.get("filename") in moves:
+            tip["path"] = moves[tip["filename"]][1].as_posix()
+            changed = True
+    if changed and not dry_run:
+        from file_lock import atomic_write_text
+        atomic_write_text(history_file, json.dumps(history, indent=2))
+    return len(moves)
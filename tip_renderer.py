@@ -0,0 +1,238 @@
+"""
+Tip Renderer for Python Tip Agent
+Parses tip notebooks/scripts and renders them to HTML with highlighted code (shared by the site and previews)
+"""
+
+import builtins
+import html
+import io
+import json
+import keyword
+import re
+import tokenize
+from pathlib import Path
+from typing import Dict, Optional
+
+
+# Bump when the markup or styles change so cached and published pages are re-rendered
+RENDERER_VERSION = "1"
+
+_HEADER = re.compile(r"^(?:#\s*)?Python Tip:\s*(.+)$")
+_GENERATED = re.compile(r"^(?:\*\*)?Generated on:(?:\*\*)?\s*(\S+)")
+_DOCSTRING = re.compile(r'^\s*("""|\'\'\')(.*?)\1\s*', re.S)
+_INLINE_CODE = re.compile(r"`([^`]+)`")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+# Pygments short token classes; the stdlib fallback emits the same ones
+STYLE = """
+body { font-family: -apple-system, 'Segoe UI', Roboto, sans-serif; max-width: 860px; margin: 0 auto;
+       padding: 24px; color: #24292e; line-height: 1.6; background: #fafbfc; }
+a { color: #5a67d8; }
+header.site { display: flex; justify-content: space-between; align-items: baseline;
+              border-bottom: 1px solid #e1e4e8; margin-bottom: 24px; }
+header.site h1 { font-size: 22px; margin: 12px 0; }
+article.tip { background: white; border-radius: 8px; padding: 8px 24px 24px; box-shadow: 0 1px 3px rgba(0,0,0,.08); }
+.meta { color: #6a737d; font-size: 14px; }
+.tag { display: inline-block; background: #eef0ff; color: #5a67d8; border-radius: 10px;
+       padding: 0 8px; margin-right: 4px; font-size: 13px; text-decoration: none; }
+ul.tips { list-style: none; padding: 0; }
+ul.tips li { padding: 6px 0; border-bottom: 1px solid #eaecef; }
+code { background: #eef0f3; padding: 1px 5px; border-radius: 3px; font-family: 'SFMono-Regular', Consolas, monospace; }
+pre.highlight { background: #282c34; color: #abb2bf; padding: 16px; border-radius: 8px; overflow-x: auto;
+                font-size: 14px; line-height: 1.5; }
+pre.highlight code { background: none; padding: 0; }
+.highlight [class^="k"], .highlight .ow { color: #c678dd; }
+.highlight [class^="s"] { color: #98c379; }
+.highlight [class^="c"] { color: #7f848e; font-style: italic; }
+.highlight [class^="m"] { color: #d19a66; }
+.highlight .nb, .highlight .bp { color: #56b6c2; }
+.highlight .nf, .highlight .nc { color: #61afef; }
+.highlight .nd { color: #e5c07b; }
+.highlight .o { color: #56b6c2; }
+nav.pages a { margin-right: 8px; }
+input#q { width: 100%; padding: 8px; font-size: 16px; border: 1px solid #d1d5da; border-radius: 6px; }
+"""
+
+_pygments = None
+
+
+def _pygments_highlighter():
+    """(highlight, lexer, formatter) if Pygments is installed, else False"""
+    global _pygments
+    if _pygments is None:
+        try:
+            from pygments import highlight
+            from pygments.formatters import HtmlFormatter
+            from pygments.lexers import PythonLexer
+            _pygments = (highlight, PythonLexer(), HtmlFormatter(nowrap=True))
+        except ImportError:
+            _pygments = False
+    return _pygments
+
+
+def _token_class(token: tokenize.TokenInfo, previous: Optional[tokenize.TokenInfo]) -> Optional[str]:
+    if token.type == tokenize.NAME:
+        if keyword.iskeyword(token.string):
+            return "k"
+        if previous is not None and previous.string in ("def", "class"):
+            return "nf" if previous.string == "def" else "nc"
+        if token.string in ("self", "cls"):
+            return "bp"
+        if hasattr(builtins, token.string):
+            return "nb"
+        return None
+    return {
+        tokenize.STRING: "s", tokenize.COMMENT: "c1", tokenize.NUMBER: "m", tokenize.OP: "o",
+    }.get(token.type)
+
+
+def _highlight_stdlib(code: str) -> str:
+    """Span-per-token highlighting with the tokenize module, for installs without Pygments"""
+    lines = code.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    parts = []
+    position = 0
+    previous = None
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type == tokenize.ENDMARKER or not token.string:
+                continue
+            start = offsets[token.start[0] - 1] + token.start[1]
+            end = offsets[token.end[0] - 1] + token.end[1]
+            if start < position:
+                continue
+            parts.append(html.escape(code[position:start]))
+            css = _token_class(token, previous)
+            text = html.escape(code[start:end])
+            parts.append(f'<span class="{css}">{text}</span>' if css else text)
+            position = end
+            if token.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT):
+                previous = token
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Incomplete code: keep what was highlighted and escape the rest
+        pass
+    parts.append(html.escape(code[position:]))
+    return "".join(parts)
+
+
+def highlight_code(code: str) -> str:
+    """Highlighted <pre> block for Python source"""
+    highlighter = _pygments_highlighter()
+    if highlighter:
+        highlight, lexer, formatter = highlighter
+        body = highlight(code, lexer, formatter)
+    else:
+        body = _highlight_stdlib(code)
+    return f'<pre class="highlight"><code>{body}</code></pre>'
+
+
+def _read_header(text: str, doc: Dict[str, str]) -> str:
+    """Fill headline/generated from header lines and return the remaining explanation"""
+    explanation = []
+    for line in text.splitlines():
+        header, generated = _HEADER.match(line), _GENERATED.match(line)
+        if header and not doc["headline"]:
+            doc["headline"] = header.group(1).strip()
+        elif generated:
+            doc["generated"] = generated.group(1)
+        else:
+            explanation.append(line)
+    return "\n".join(explanation).strip()
+
+
+def parse_tip(content: str, filename: str) -> Dict[str, str]:
+    """
+    Headline, explanation, generation date and code from a tip file's text
+
+    Notebooks are read cell by cell (header markdown, then code cells);
+    scripts take the header from their module docstring.
+    """
+    doc = {"headline": "", "explanation": "", "generated": "", "code": ""}
+    if not filename.endswith(".ipynb"):
+        docstring = _DOCSTRING.match(content)
+        if docstring:
+            doc["explanation"] = _read_header(docstring.group(2), doc)
+            content = content[docstring.end():]
+        doc["code"] = content.strip("\n")
+        return doc
+
+    from notebook_format import source_text
+    explanation, code = [], []
+    for cell in json.loads(content).get("cells", []):
+        text = source_text(cell.get("source", ""))
+        if cell.get("cell_type") == "code":
+            code.append(text)
+        else:
+            explanation.append(_read_header(text, doc))
+    doc["explanation"] = "\n\n".join(part for part in explanation if part)
+    doc["code"] = "\n\n".join(code)
+    return doc
+
+
+def load_tip(path: Path) -> Dict[str, str]:
+    """parse_tip() for a file on disk"""
+    path = Path(path)
+    return parse_tip(path.read_text(encoding="utf-8"), path.name)
+
+
+def render_text(text: str) -> str:
+    """Explanation text to paragraphs, with `code` and **bold** spans"""
+    paragraphs = [block.strip() for block in re.split(r"\n\s*\n", text) if block.strip()]
+    rendered = []
+    for block in paragraphs:
+        escaped = html.escape(block)
+        escaped = _INLINE_CODE.sub(r"<code>\1</code>", escaped)
+        escaped = _BOLD.sub(r"<strong>\1</strong>", escaped)
+        rendered.append(f"<p>{escaped.replace(chr(10), '<br>')}</p>")
+    return "\n".join(rendered)
+
+
+def render_tip(doc: Dict[str, str], date: str = "", tags=(), tag_href=None) -> str:
+    """
+    <article> for one tip
+
+    Args:
+        doc: Output of parse_tip(); headline may be overridden by the caller
+        date: Date shown in the byline (falls back to the notebook's own)
+        tags: Tag names to list
+        tag_href: Optional callable mapping a tag to its page URL
+    """
+    date = (date or doc.get("generated") or "")[:10]
+    tag_links = "".join(
+        f'<a class="tag" href="{html.escape(tag_href(tag))}">{html.escape(tag)}</a>' if tag_href
+        else f'<span class="tag">{html.escape(tag)}</span>'
+        for tag in tags
+    )
+    return (
+        '<article class="tip">\n'
+        f"<h2>{html.escape(doc['headline'])}</h2>\n"
+        f'<p class="meta">{html.escape(date)} {tag_links}</p>\n'
+        f"{render_text(doc['explanation'])}\n"
+        f"{highlight_code(doc['code'])}\n"
+        "</article>"
+    )
+
+
+def render_page(title: str, body: str, stylesheet: Optional[str] = None, head: str = "") -> str:
+    """
+    Complete HTML document
+
+    Args:
+        stylesheet: URL of a shared style.css; the styles are inlined when None
+        head: Extra markup for <head> (feed links, scripts)
+    """
+    style = f'<link rel="stylesheet" href="{html.escape(stylesheet)}">' if stylesheet else f"<style>{STYLE}</style>"
+    return (
+        "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+        '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+        f"<title>{html.escape(title)}</title>\n{style}\n{head}</head>\n<body>\n{body}\n</body>\n</html>\n"
+    )
+
+
+if __name__ == "__main__":
+    import sys
+    for name in sys.argv[1:]:
+        doc = load_tip(Path(name))
+        print(render_page(doc["headline"] or name, render_tip(doc)))
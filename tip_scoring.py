@@ -0,0 +1,91 @@
+"""
+Candidate Scoring for Python Tip Agent
+Ranks generated tip candidates locally by novelty, code length and validity
+"""
+
+import re
+import warnings
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+WEIGHTS = {"novelty": 0.5, "compiles": 0.3, "length": 0.2}
+
+# Code examples in this many lines read best in an email and a notebook cell
+IDEAL_CODE_LINES = (8, 30)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "the", "for", "and", "or", "to", "of", "in", "with", "using", "use", "python", "your"}
+
+
+def _words(text: str) -> Set[str]:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS}
+
+
+def novelty_score(headline: str, history_word_sets: Iterable[Set[str]]) -> float:
+    """1 minus the highest Jaccard similarity to any past headline"""
+    words = _words(headline)
+    if not words:
+        return 0.0
+    closest = 0.0
+    for past in history_word_sets:
+        if past:
+            closest = max(closest, len(words & past) / len(words | past))
+    return 1.0 - closest
+
+
+def length_score(code: str) -> float:
+    """1.0 inside IDEAL_CODE_LINES, decaying linearly outside it"""
+    lines = sum(1 for line in code.splitlines() if line.strip())
+    low, high = IDEAL_CODE_LINES
+    if low <= lines <= high:
+        return 1.0
+    if lines < low:
+        return lines / low
+    return max(0.0, 1.0 - (lines - high) / high)
+
+
+def compiles(code: str) -> bool:
+    """True if the code is syntactically valid Python"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            compile(code, "<tip>", "exec")
+        return True
+    except (SyntaxError, ValueError):
+        return False
+
+
+def score_candidate(fields: Dict, history_word_sets: List[Set[str]]) -> Dict:
+    """Score one parsed candidate"""
+    scores = {
+        "novelty": novelty_score(fields["headline"], history_word_sets),
+        "length": length_score(fields["code"]),
+        "compiles": compiles(fields["code"]),
+    }
+    scores["total"] = sum(WEIGHTS[name] * float(value) for name, value in scores.items())
+    return {name: round(value, 3) if isinstance(value, float) else value for name, value in scores.items()}
+
+
+def rank_candidates(candidates: List[Dict], history: Dict) -> List[Tuple[Dict, Dict]]:
+    """
+    Rank parsed candidates best-first
+
+    Returns:
+        List of (scores, fields); scores include the candidate count and rank
+    """
+    history_word_sets = [_words(tip.get("headline", "")) for tip in history.get("tips", [])]
+    scored = [(score_candidate(fields, history_word_sets), fields) for fields in candidates]
+    scored.sort(key=lambda item: item[0]["total"], reverse=True)
+    for rank, (scores, _) in enumerate(scored, start=1):
+        scores["rank"] = rank
+        scores["candidates"] = len(scored)
+    return scored
+
+
+def format_scores(scores: Dict) -> str:
+    """One-line summary for emails and logs"""
+    text = (f"score {scores['total']:.2f} (novelty {scores['novelty']:.2f}, "
+            f"length {scores['length']:.2f}, compiles {'yes' if scores['compiles'] else 'no'})")
+    if scores.get("candidates", 1) > 1:
+        text += f", best of {scores['candidates']}"
+    return text
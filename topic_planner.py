@@ -0,0 +1,157 @@
+"""
+Topic Coverage Planner for Python Tip Agent
+Steers tip generation toward topics that haven't been covered yet
+"""
+
+import random
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# topic -> (label used in prompts, keywords matched against tip slugs)
+TAXONOMY: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "enumerate": ("enumerate()", ("enumerate",)),
+    "zip": ("zip() and parallel iteration", ("zip",)),
+    "comprehensions": ("list/dict/set comprehensions", ("comprehension", "comprehensions")),
+    "generators": ("generators and generator expressions", ("generator", "generators", "yield", "lazy")),
+    "defaultdict": ("collections.defaultdict", ("defaultdict", "default_dictionary", "default_values")),
+    "counter": ("collections.Counter", ("counter", "counting")),
+    "namedtuple": ("namedtuple", ("namedtuple",)),
+    "dataclasses": ("dataclasses", ("dataclass", "dataclasses")),
+    "deque": ("collections.deque", ("deque",)),
+    "fstrings": ("f-strings and string formatting", ("f_strings", "fstring", "formatting")),
+    "string_join": ("str.join and string building", ("join", "concatenation", "concatenate")),
+    "pathlib": ("pathlib", ("pathlib",)),
+    "context_managers": ("context managers and the with statement", ("context", "with_statement", "contextlib")),
+    "any_all": ("any() and all()", ("any", "all")),
+    "sets": ("sets and membership testing", ("set", "sets", "membership")),
+    "dict_methods": ("dict.get, merging and dict methods", ("get_method", "merge", "dictionaries", "dictionary")),
+    "mutation_pitfalls": ("mutable defaults and mutating while iterating", ("mutable", "mutating", "modifying")),
+    "args_kwargs": ("*args and **kwargs", ("args", "kwargs")),
+    "unpacking": ("iterable unpacking and starred assignment", ("unpack", "unpacking", "starred")),
+    "itertools": ("itertools", ("itertools", "chain", "groupby", "islice", "product", "permutations")),
+    "functools": ("functools (lru_cache, partial, reduce)", ("functools", "lru_cache", "cache", "partial", "reduce")),
+    "decorators": ("decorators", ("decorator", "decorators")),
+    "typing": ("type hints and typing", ("typing", "type_hints", "annotations", "typeddict", "protocol")),
+    "enum": ("enum.Enum", ("enum", "enums")),
+    "walrus": ("assignment expressions (walrus operator)", ("walrus", "assignment_expression")),
+    "match": ("structural pattern matching", ("match", "pattern_matching")),
+    "exceptions": ("exception handling", ("exception", "exceptions", "try", "except", "raise")),
+    "logging": ("logging", ("logging", "logger")),
+    "asyncio": ("asyncio and async/await", ("asyncio", "async", "await", "coroutine")),
+    "slicing": ("slicing and sequence tricks", ("slice", "slicing", "reverse")),
+    "sorting": ("sorting with key functions", ("sort", "sorted", "sorting", "key_function")),
+    "heapq_bisect": ("heapq and bisect", ("heapq", "heap", "bisect")),
+    "properties": ("properties and descriptors", ("property", "properties", "descriptor")),
+    "slots": ("__slots__ and memory-efficient classes", ("slots",)),
+    "dunder": ("dunder methods and operator overloading", ("dunder", "magic_methods", "repr", "operator_overloading")),
+    "lambda_map_filter": ("lambda, map() and filter()", ("lambda", "map", "filter")),
+    "datetime": ("datetime and time zones", ("datetime", "timezone", "timedelta")),
+    "json": ("json serialization", ("json", "serialize", "serialization")),
+    "regex": ("regular expressions", ("regex", "regular_expression", "re_module")),
+    "subprocess": ("subprocess and shell commands", ("subprocess", "shell")),
+    "testing": ("testing with unittest/pytest", ("pytest", "unittest", "testing", "mock")),
+    "argparse": ("command-line parsing with argparse", ("argparse", "cli", "command_line")),
+    "concurrency": ("threads and process pools", ("thread", "threading", "multiprocessing", "concurrent", "executor")),
+    "timing": ("timing and profiling code", ("timeit", "profile", "profiling", "execution_time", "perf_counter")),
+}
+
+_TIP_PREFIX = re.compile(r"^(?:\d{8}_)?Python_tip_")
+
+
+def _slug_words(slug: str) -> List[str]:
+    return [word for word in slug.lower().split("_") if word]
+
+
+def classify(slug: str) -> Optional[str]:
+    """
+    Map a tip shortname or headline slug to a taxonomy topic
+
+    Multi-word keywords (e.g. 'f_strings') match as substrings of the slug;
+    single words must match a whole slug word. The first topic with the most
+    keyword hits wins.
+    """
+    slug = slug.lower()
+    words = set(_slug_words(slug))
+    best, best_hits = None, 0
+    for topic, (_, keywords) in TAXONOMY.items():
+        hits = sum(1 for keyword in keywords if (keyword in slug if "_" in keyword else keyword in words))
+        if hits > best_hits:
+            best, best_hits = topic, hits
+    return best
+
+
+def _shortnames_from_tips(tips_directory: Path) -> Iterable[str]:
+    from tip_paths import iter_tip_files
+    return [_TIP_PREFIX.sub("", path.stem) for path in iter_tip_files(tips_directory) if "_tip_" in path.name]
+
+
+def coverage(history: Dict, tips_directory: Path = Path("tips")) -> Counter:
+    """
+    Count how many distinct tips fall under each topic
+
+    A topic recorded in the history entry wins over classifying the
+    shortname, so a planned tip counts under the topic it was written for
+    even when its headline doesn't name it.
+    """
+    topics = {shortname: classify(shortname) for shortname in _shortnames_from_tips(Path(tips_directory))}
+    for tip in history.get("tips", []):
+        shortname = tip.get("shortname", "")
+        topics[shortname] = tip.get("topic") if tip.get("topic") in TAXONOMY else classify(shortname)
+    counts = Counter({topic: 0 for topic in TAXONOMY})
+    for topic in topics.values():
+        if topic:
+            counts[topic] += 1
+    return counts
+
+
+class TopicPlanner:
+    """Chooses an under-covered topic and builds the prompt steering text"""
+
+    def __init__(self, history: Dict, tips_directory: Path = Path("tips"),
+                 max_excluded: int = 12, rng: Optional[random.Random] = None,
+                 counts: Optional[Counter] = None):
+        # Callers that track coverage incrementally pass `counts` to skip the rescan
+        self.counts = coverage(history, tips_directory) if counts is None else counts
+        self.max_excluded = max_excluded
+        self.rng = rng or random.Random()
+
+    def choose_topic(self) -> str:
+        """Pick randomly among the least-covered topics"""
+        lowest = min(self.counts.values())
+        candidates = [topic for topic, count in self.counts.items() if count == lowest]
+        return self.rng.choice(candidates)
+
+    def excluded_topics(self) -> List[str]:
+        """Most-covered topics, compact enough to put in a prompt"""
+        covered = [(count, topic) for topic, count in self.counts.items() if count > 0]
+        covered.sort(reverse=True)
+        return [topic for _, topic in covered[:self.max_excluded]]
+
+    def prompt_addendum(self, topic: str) -> str:
+        """Text appended to the generation prompt"""
+        excluded = ", ".join(TAXONOMY[name][0] for name in self.excluded_topics())
+        lines = [f"Topic for this tip: {TAXONOMY[topic][0]}."]
+        if excluded:
+            lines.append(f"Do NOT write about these already-covered topics: {excluded}.")
+        return "\n".join(lines)
+
+
+def print_report(history: Dict, tips_directory: Path = Path("tips")):
+    """Print topic coverage"""
+    planner = TopicPlanner(history, tips_directory)
+    print("\n" + "="*60)
+    print("Topic Coverage")
+    print("="*60)
+    for topic, count in sorted(planner.counts.items(), key=lambda item: (-item[1], item[0])):
+        print(f"  {TAXONOMY[topic][0]:<48} {count}")
+    uncovered = sum(1 for count in planner.counts.values() if count == 0)
+    print(f"\n{uncovered} of {len(TAXONOMY)} topics not yet covered")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    from tip_generator import load_history
+    print_report(load_history())
@@ -0,0 +1,163 @@
+"""
+Token Usage Ledger for Python Tip Agent
+Records per-call token usage and keeps incremental daily/monthly aggregates
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from file_lock import FileLock, atomic_write_text
+
+
+LEDGER_FILE = Path(os.getenv("USAGE_LEDGER_FILE", "usage_ledger.jsonl"))
+SUMMARY_FILE = LEDGER_FILE.with_name(LEDGER_FILE.stem + "_summary.json")
+LOCK_FILE = LEDGER_FILE.with_name(LEDGER_FILE.name + ".lock")
+
+# USD per 1K tokens, defaulting to gpt-3.5-turbo pricing
+PROMPT_PRICE_PER_1K = float(os.getenv("PROMPT_TOKEN_PRICE_PER_1K", "0.0005"))
+COMPLETION_PRICE_PER_1K = float(os.getenv("COMPLETION_TOKEN_PRICE_PER_1K", "0.0015"))
+
+
+def _empty_bucket() -> Dict:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0}
+
+
+def _empty_summary() -> Dict:
+    return {"ledger_offset": 0, "daily": {}, "monthly": {}}
+
+
+def _fold(summary: Dict, record: Dict):
+    """Add one ledger record to the daily and monthly aggregates"""
+    day = record["ts"][:10]
+    for period, key in (("daily", day), ("monthly", day[:7])):
+        bucket = summary[period].setdefault(key, _empty_bucket())
+        bucket["calls"] += 1
+        bucket["prompt_tokens"] += record["prompt_tokens"]
+        bucket["completion_tokens"] += record["completion_tokens"]
+        bucket["latency_ms"] = round(bucket["latency_ms"] + record["latency_ms"], 1)
+
+
+def _catch_up(summary: Dict) -> Dict:
+    """
+    Fold any ledger lines written after the summary's offset
+
+    Normally the summary is updated with every record, so this only reads
+    a tail (or nothing); after a lost summary it rebuilds from the ledger.
+    """
+    if not LEDGER_FILE.exists():
+        return summary
+    size = LEDGER_FILE.stat().st_size
+    if summary["ledger_offset"] > size:
+        # Ledger was truncated or replaced; start over
+        summary = _empty_summary()
+    if summary["ledger_offset"] == size:
+        return summary
+    with open(LEDGER_FILE, 'rb') as f:
+        f.seek(summary["ledger_offset"])
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # partial line from a concurrent writer; pick it up next time
+            _fold(summary, json.loads(line))
+            summary["ledger_offset"] += len(line)
+    return summary
+
+
+def load_summary() -> Dict:
+    """Load the aggregates, folding in any records not yet summarized"""
+    summary = _empty_summary()
+    if SUMMARY_FILE.exists():
+        with open(SUMMARY_FILE, 'r') as f:
+            summary = json.load(f)
+    return _catch_up(summary)
+
+
+def record_call(model: str, purpose: str, prompt_tokens: int, completion_tokens: int,
+                latency_seconds: float, when: Optional[datetime] = None):
+    """Append one API call to the ledger and update the aggregates"""
+    record = {
+        "ts": (when or datetime.now()).isoformat(timespec="seconds"),
+        "model": model,
+        "purpose": purpose,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "latency_ms": round(latency_seconds * 1000, 1),
+    }
+    with FileLock(LOCK_FILE):
+        summary = load_summary()
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        with open(LEDGER_FILE, 'ab') as f:
+            f.write(line)
+        _fold(summary, record)
+        summary["ledger_offset"] += len(line)
+        atomic_write_text(SUMMARY_FILE, json.dumps(summary, separators=(",", ":")))
+
+
+def tokens_used(summary: Dict, when: Optional[datetime] = None) -> Tuple[int, int]:
+    """(tokens used today, tokens used this month)"""
+    day = (when or datetime.now()).strftime("%Y-%m-%d")
+    daily = summary["daily"].get(day, _empty_bucket())
+    monthly = summary["monthly"].get(day[:7], _empty_bucket())
+    return (daily["prompt_tokens"] + daily["completion_tokens"],
+            monthly["prompt_tokens"] + monthly["completion_tokens"])
+
+
+def check_budget(estimated_tokens: int = 0) -> Tuple[bool, str]:
+    """
+    Check DAILY_TOKEN_BUDGET / MONTHLY_TOKEN_BUDGET (0 or unset = unlimited)
+
+    Returns:
+        (allowed, reason) where reason explains a refusal
+    """
+    daily_budget = int(os.getenv("DAILY_TOKEN_BUDGET", "0"))
+    monthly_budget = int(os.getenv("MONTHLY_TOKEN_BUDGET", "0"))
+    if not daily_budget and not monthly_budget:
+        return True, ""
+    today, month = tokens_used(load_summary())
+    if daily_budget and today + estimated_tokens > daily_budget:
+        return False, f"daily token budget reached ({today}/{daily_budget} used, next call needs ~{estimated_tokens})"
+    if monthly_budget and month + estimated_tokens > monthly_budget:
+        return False, f"monthly token budget reached ({month}/{monthly_budget} used, next call needs ~{estimated_tokens})"
+    return True, ""
+
+
+def cost(bucket: Dict) -> float:
+    """Estimated USD cost of an aggregate bucket"""
+    return (bucket["prompt_tokens"] * PROMPT_PRICE_PER_1K
+            + bucket["completion_tokens"] * COMPLETION_PRICE_PER_1K) / 1000
+
+
+def print_report(days: int = 7, months: int = 6):
+    """Print recent daily and monthly usage"""
+    summary = load_summary()
+    print("\n" + "="*60)
+    print("OpenAI Token Usage")
+    print("="*60)
+    if not summary["daily"]:
+        print("No API calls recorded yet")
+        print("="*60 + "\n")
+        return
+
+    header = f"  {'period':<10} {'calls':>6} {'prompt':>9} {'completion':>11} {'avg ms':>8} {'cost $':>8}"
+    for title, period, limit in (("Daily", "daily", days), ("Monthly", "monthly", months)):
+        print(f"\n{title}:")
+        print(header)
+        for key in sorted(summary[period])[-limit:]:
+            bucket = summary[period][key]
+            avg_latency = bucket["latency_ms"] / bucket["calls"] if bucket["calls"] else 0
+            print(f"  {key:<10} {bucket['calls']:>6} {bucket['prompt_tokens']:>9} "
+                  f"{bucket['completion_tokens']:>11} {avg_latency:>8.0f} {cost(bucket):>8.4f}")
+
+    today, month = tokens_used(summary)
+    daily_budget = int(os.getenv("DAILY_TOKEN_BUDGET", "0"))
+    monthly_budget = int(os.getenv("MONTHLY_TOKEN_BUDGET", "0"))
+    print("\nBudget:")
+    print(f"  today       {today} / {daily_budget or 'unlimited'}")
+    print(f"  this month  {month} / {monthly_budget or 'unlimited'}")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    print_report()
@@ -0,0 +1,15 @@
+"""
+WSGI Entry Point for the Approval Server
+Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from approval_server import app
+from metrics import start_flusher
+from pending_store import start_pruner
+
+# Each worker expires stale tokens in the background; pruning is idempotent
+start_pruner()
+# ...and leaves a metrics snapshot for /metrics to merge (see gunicorn.conf.py)
+start_flusher()
+
+__all__ = ["app"]